@@ -4,56 +4,197 @@ import json
 import random
 import logging
 import sys
-from copy import deepcopy
-from datetime import datetime
-from time import sleep, time
+import threading
+import heapq
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from functools import partial
+from email.utils import parsedate_to_datetime
+from time import monotonic, sleep, time
 from statistics import median
-from typing import Union
+from typing import TYPE_CHECKING, Iterable, Union
+import lxml.etree as etree
+import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from core.compression import COMPRESSION_SUFFIXES, open_compressed
+
+if TYPE_CHECKING:
+    from core.etl import ResponseExtractor
+
+# For 64 bit integer arithmetic in _mix
+_MASK_64 = (1 << 64) - 1
+
+
+def _mix(value: int, seed: int, round_n: int) -> int:
+    """Pseudorandom 64 bit hash of a value, seed and round number.
+
+    Uses the splitmix64 finalizer, so results don't depend on Python's
+    hash randomization or version.
+    """
+    z = (value * 0x9E3779B97F4A7C15 + seed * 0xBF58476D1CE4E5B9
+         + round_n * 0x94D049BB133111EB) & _MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return z ^ (z >> 31)
+
+
+def _permute(position: int, n: int, seed: int, rounds: int = 4) -> int:
+    """Map a position to its place in a seeded pseudorandom order of range(n).
+
+    A Feistel network is a bijection on integers of a fixed number of bits.
+    Values that land outside range(n) are fed through again ("cycle
+    walking") until they land inside, which makes this a bijection on
+    range(n). So any single position can be looked up without generating
+    or storing the whole shuffled order.
+
+    Args:
+        position (int): Position in range(n).
+        n (int): Number of values being shuffled.
+        seed (int): Seed determining the order.
+        rounds (int, optional): Feistel rounds. Defaults to 4.
+
+    Returns:
+        int: Value in range(n) at that position in the shuffled order.
+    """
+    # Split the smallest even number of bits that covers n into two halves,
+    # so at most 3/4 of values are out of range and cycle walking is short.
+    half_bits = max((n - 1).bit_length() + 1, 2) // 2
+    mask = (1 << half_bits) - 1
+    x = position
+    while True:
+        left, right = x >> half_bits, x & mask
+        for round_n in range(rounds):
+            left, right = right, left ^ (_mix(right, seed, round_n) & mask)
+        x = (left << half_bits) | right
+        if x < n:
+            return x
 
 
 class Retriever:
     """Class for handling board game data retrieval.
 
     Initialize with a directory path for saving data.
-    Call Retriever.retrieve_all to get all board game data.
+    Call Retriever.retrieve_all to get all board game data, or
+    Retriever.refresh to update a previous crawl.
+    Retriever.discover_max_id finds the current max id to download up to.
     Retriever.api_request and Retriever.generate_game_uri are provided as lower
     level methods.
     Retriever.remove_progress_file is a convenience method for deleting
     progress files generated by Retriever.retrieve_all.
     """
-    # Approximate highest ID on BGG website.
-    # Get by probing https://boardgamegeek.com/boardgameaccessory/<id>/
-    # until you have problems.
+    # Approximate highest ID on BGG website as of Sept 2022.
+    # Starting point for discover_max_id, which finds the current one.
     MAX_ID = 362383
     # Possible values progress objects
     PROGRESS_STATUS_COMPLETE = 'complete'
     PROGRESS_STATUS_INCOMPLETE = 'incomplete'
     PROGRESS_STATUS_QUEUED = 'queued'
+    # Field keys for progress objects
+    PROGRESS_KEY_VERSION = "version"
+    PROGRESS_KEY_ID_SOURCE = "id_source"
+    PROGRESS_KEY_BATCH_SIZE = "batch_size"
+    PROGRESS_KEY_BATCHES = "batches"
+    PROGRESS_KEY_BATCH_BOUNDS = "batch_bounds"
+    PROGRESS_VERSION = 2
     # Field keys for individual batches in progress objects
     PROGRESS_KEY_IDS = "ids"
     PROGRESS_KEY_STATUS = "status"
     PROGRESS_KEY_LAST_ACCESSED = "last_accessed"
+    # Id sources for progress objects, i.e. how to get the ids of each batch.
+    # Ids 1 to max_id in order, ids 1 to max_id in a seeded pseudorandom
+    # order, or an explicit list of ids.
+    ID_SOURCE_KEY_KIND = "kind"
+    ID_SOURCE_KEY_MAX_ID = "max_id"
+    ID_SOURCE_KEY_SEED = "seed"
+    ID_SOURCE_RANGE = "range"
+    ID_SOURCE_SHUFFLED = "shuffled"
+    ID_SOURCE_LIST = "list"
+    # Format of batch last accessed times
+    LAST_ACCESSED_FORMAT = '%Y-%b-%d %H:%M:%S.%f'
+    # Thing type of base board games in extracted general data
+    BASE_GAME_TYPE = "boardgame"
     # BGG API root
     BASE_API = "https://boardgamegeek.com/xmlapi2/thing?"
     # Save directory sub folders/file strings
     PATH_XML_DIR = 'xml'
     PATH_PROGRESS_FILE = 'progress.json'
+    PATH_PROGRESS_JOURNAL = 'progress.journal'
     PATH_LOG_FILE = 'retriever.log'
+    PATH_MAX_ID_CACHE = 'max_id.json'
+    PATH_ID_INDEX = 'id_index.bin'
+    # Number of journaled batch updates before the progress file is
+    # rewritten and the journal cleared
+    PROGRESS_JOURNAL_COMPACT_EVERY = 100
     # Wait time before trying again if there's no internet
     PAUSE_TIME_NO_CONNECTION = 60
-
-    def __init__(self, save_dir: str) -> None:
+    # Max id discovery: ids per probe request, seconds between probes,
+    # attempts per probe, and how long a discovered max id is cached for
+    PROBE_SIZE = 100
+    PROBE_COOLDOWN = 5
+    PROBE_ATTEMPTS = 5
+    MAX_ID_CACHE_AGE = 7*24*60*60
+    # Seconds to wait when a 502 response asks to try again in 30 seconds
+    RETRY_AFTER_TRY_AGAIN = 30
+    # Content encodings the server may use to compress responses,
+    # which requests decodes transparently.
+    ACCEPT_ENCODING = 'gzip, deflate'
+    # Bytes read from a response at a time when writing it to disk
+    WRITE_CHUNK_SIZE = 64 * 1024
+
+    def __init__(
+            self,
+            save_dir: str,
+            pool_size: int = 10,
+            connect_timeout: float = 10,
+            read_timeout: float = 120,
+            compression: str = None,
+            extractor: 'ResponseExtractor' = None,
+            archive_xml: bool = True) -> None:
         """Initialize Retriever with a dir for saving data.
 
+        Requests are made through a keep-alive session (self.session) that
+        pools connections, so they are reused between batches and between
+        concurrent workers instead of being reopened for every request.
+
         Args:
             save_dir (str): directory path for saving downloaded data,
                 log files, progress tracking files, etc.
+            pool_size (int, optional): Max number of connections kept open
+                to the server. Should be at least the number of concurrent
+                workers. Defaults to 10.
+            connect_timeout (float, optional): Seconds to wait to establish a
+                connection. Defaults to 10.
+            read_timeout (float, optional): Seconds to wait for the server to
+                send data. Defaults to 120.
+            compression (str of 'gzip'|'zstd', optional): Compress downloaded
+                xml files on disk, e.g. as '0.xml.gz' or '0.xml.zst'. zstd
+                requires the zstandard package. Defaults to None, i.e. plain
+                '0.xml' files.
+            extractor (core.etl.ResponseExtractor, optional): Hand each
+                downloaded batch to this extractor as it arrives, so it is
+                extracted to parquet during the crawl. Batches are then read
+                into memory rather than streamed to disk, and only count as
+                complete once extracted. The caller closes the extractor.
+                Defaults to None, i.e. only save xml files.
+            archive_xml (bool, optional): With an extractor, whether to
+                still save the xml files. Defaults to True.
 
         Raises:
             FileNotFoundError: if save_dir doesn't exist
             NotADirectoryError: if save_dir isn't a directory
+            ValueError: if compression is not accepted, or if archive_xml
+                is False without an extractor
         """
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(
+                f"compression param not in {list(COMPRESSION_SUFFIXES)}.")
+        if extractor is None and not archive_xml:
+            raise ValueError(
+                "archive_xml can only be False with an extractor.")
+        self.compression = compression
+        self.extractor = extractor
+        self.archive_xml = archive_xml
         save_dir = Path(save_dir)
         if not save_dir.exists():
             raise FileNotFoundError(f"Dir {str(save_dir)} does not exist.")
@@ -65,8 +206,48 @@ class Retriever:
         self.xml_dir = str(xml_dir)
         progress_path = save_dir / self.PATH_PROGRESS_FILE
         self.progress_path = str(progress_path)
+        journal_path = save_dir / self.PATH_PROGRESS_JOURNAL
+        self.journal_path = str(journal_path)
+        self._journal_entries = 0
         log_file_path = save_dir / self.PATH_LOG_FILE
         self.log_file_path = str(log_file_path)
+        max_id_cache_path = save_dir / self.PATH_MAX_ID_CACHE
+        self.max_id_cache_path = str(max_id_cache_path)
+        # Which ids have been requested and which returned items,
+        # kept up to date as batches are downloaded (see IdIndex).
+        id_index_path = save_dir / self.PATH_ID_INDEX
+        self.id_index_path = str(id_index_path)
+        if id_index_path.exists():
+            self.id_index = IdIndex.load(self.id_index_path)
+        else:
+            self.id_index = IdIndex()
+        # Guards the progress object and file during concurrent retrieval
+        self._progress_lock = threading.Lock()
+        # Pooled keep-alive session.
+        # All requests go to the one BGG host, so a single per-host pool
+        # (pool_connections) is enough; pool_maxsize is the number of
+        # connections kept open to that host, which is what concurrent
+        # workers need.
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers['Accept-Encoding'] = self.ACCEPT_ENCODING
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        # Counts from pools that have since been evicted or closed
+        self._retired_pool_stats = {'requests': 0, 'connections': 0}
+        self._stats_lock = threading.Lock()
+        pools = adapter.poolmanager.pools
+        dispose_pool = pools.dispose_func
+
+        def retire_pool(pool) -> None:
+            with self._stats_lock:
+                self._retired_pool_stats['requests'] += pool.num_requests
+                self._retired_pool_stats['connections'] += \
+                    pool.num_connections
+            if dispose_pool is not None:
+                dispose_pool(pool)
+        pools.dispose_func = retire_pool
 
     def retrieve_all(
             self,
@@ -75,7 +256,15 @@ class Retriever:
             batch_size: int = 500,
             shuffle: bool = True,
             random_seed: int = None,
-            max_id: int = None) -> None:
+            max_id: int = None,
+            workers: int = 1,
+            rate: float = None,
+            burst: int = 1,
+            min_cooldown: float = 1,
+            queued_retry_delay: float = 60,
+            queued_max_polls: int = 5,
+            ids: list[int] = None,
+            id_index_path: str = None) -> None:
         """Retrieve all board games from Board Game Geek.
 
         By default, gets board games in randomized batches.
@@ -85,8 +274,11 @@ class Retriever:
         of board game ids should they choose to terminate the operation early.
 
         Cooldown periods between batches help prevent server overloading.
-        As well a longer cooldown period can be applied should the user
-        encounter a server error. These errors could be a result of getting
+        The cooldown adapts to how the server is behaving (see
+        AdaptiveCooldown): it starts at batch_cooldown and shrinks towards
+        min_cooldown while batches succeed. Should the user encounter a server
+        error, it backs off exponentially, up to server_cooldown, honoring any
+        Retry-After header. These errors could be a result of getting
         blocked by the server for too many requests, or the server being down
         due to maintenance. This generic strategy is used as the server error
         codes/reasons do not appear to be publicly documented.
@@ -96,26 +288,39 @@ class Retriever:
         that the server has queued the request for later processing. Of the
         other responses, there is at least a 502 response that includes a
         message saying that there is a server error and that you can try again
-        in 30 seconds. In this 502 case, the longer cooldown period is skipped,
-        and the next batch is requested.
+        in 30 seconds. This 502 case is treated as a Retry-After of 30 seconds.
+
+        Batches queued by the server are requested again after
+        queued_retry_delay seconds within the same run, interleaved with
+        fresh batches, up to queued_max_polls times each (see BatchQueue).
 
         200, 202, and other responses are marked in a 'progress.json' file as
-        'complete', 'queued', and 'incomplete', respectively. The number of
+        'complete', 'queued', and 'incomplete', respectively. Rather than
+        rewriting 'progress.json' for every batch, status changes are appended
+        to a 'progress.journal' file, which is folded back into
+        'progress.json' periodically and at the end of the run. The number of
         batches of each status (as well as retrieval run events) is logged to
         'retriever.log'. If the number of 'queued' and 'incomplete' statuses is
         not zero, running retrieve_all with a Retriever object instantiated
         with the same save_dir will load that 'progress.json' file and request
         only the unfinished batches.
 
+        By default, batches are requested one at a time with the cooldown
+        between them. Setting workers above 1 or providing a rate
+        switches to concurrent mode, where up to `workers` batches are in
+        flight at once and a shared token bucket rate limiter (see
+        TokenBucket) replaces the cooldown between batches. On a server error,
+        all workers are paused for the backed off cooldown.
+
         References:
         1) https://boardgamegeek.com/wiki/page/BGG_XML_API2
 
         Args:
-            batch_cooldown (int, optional): Seconds to cooldown between
-                batches. Defaults to 10*60, i.e. 10 min.
-            server_cooldown (int, optional): Seconds to cooldown on
-                encountering a server response error code. Defaults to
-                12*60*60, i.e. 12 hours.
+            batch_cooldown (int, optional): Initial seconds to cooldown
+                between batches. Defaults to 5*60, i.e. 5 min.
+            server_cooldown (int, optional): Max seconds to cooldown when
+                backing off from server response error codes. Defaults to
+                3*60*60, i.e. 3 hours.
             batch_size (int, optional): Number of 'thing' ids to request in one
                 batch. Defaults to 5000. Note: 500 seems to be a good size to
                 avoid server errors and server blocking, when requesting board
@@ -123,19 +328,47 @@ class Retriever:
                 comprise only about a third of all ids.
             shuffle (bool, optional): Whether ids should be requested in a
                 randomized order. Defaults to True.
-            random_seed (int, optional): Seed for randomizing order, supplied
-                to random.seed(). Defaults to None.
-            max_id (int, optional): Provide a max_id to download up to,
-                otherwise uses preset self.MAX_ID.
+            random_seed (int, optional): Seed for randomizing order, stored
+                in the progress file so the order can be reproduced.
+                Defaults to None, i.e. a random seed.
+            max_id (int, optional): Provide a max_id to download up to.
+                Defaults to None, i.e. discovered with discover_max_id.
+            workers (int, optional): Number of batches that can be in flight
+                at once. Defaults to 1.
+            rate (float, optional): Max batch requests per second in
+                concurrent mode. Defaults to None, i.e. one request per
+                batch_cooldown, in which case extra workers give no speed-up.
+            burst (int, optional): Max number of requests that can be made
+                in a burst above the rate in concurrent mode. Defaults to 1.
+            min_cooldown (float, optional): Seconds the cooldown between
+                batches can shrink to while batches succeed. Defaults to 1.
+            queued_retry_delay (float, optional): Seconds to wait before
+                requesting a batch queued by the server again. Defaults to 60.
+            queued_max_polls (int, optional): Max number of times to request
+                a queued batch again in the same run. Defaults to 5.
+            ids (list[int], optional): Request only these ids, in this order,
+                instead of 1 to max_id. shuffle, random_seed and max_id are
+                then ignored. Defaults to None.
+            id_index_path (str, optional): Id index ('id_index.bin') from the
+                save dir of a previous crawl. Ids it knows to be empty are
+                left out of the batches, so each request carries more board
+                games. Its ids are also added to this crawl's index. Defaults
+                to None, i.e. request every id.
+
+        Raises:
+            ValueError: if workers is less than 1.
         """
-        # Set max_id if not provided
-        if max_id is None:
-            max_id = self.MAX_ID
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
 
         # RetrieverLogger is a helper class that tracks
         # relevant retrieval statistics while logging.
         log = RetrieverLogger(self.log_file_path)
         log.log_run_start()
+        cooldown = AdaptiveCooldown(
+            initial_delay=batch_cooldown,
+            min_delay=min_cooldown,
+            max_delay=server_cooldown)
         # Resume from an existing progress file
         # or create new progress object and batches.
         if self._check_progress_file_exists():
@@ -143,106 +376,244 @@ class Retriever:
             progress = self._load_progress_file()
         else:
             log.log_new_progress_file()
-            ids = [i for i in range(1, max_id + 1)]
-            if shuffle:
-                random.seed(random_seed)
-                random.shuffle(ids)
-            progress = self._create_progress_object(ids, batch_size=batch_size)
+            if ids is None and max_id is None:
+                max_id = self.discover_max_id()
+                log.log_max_id_discovered(max_id)
+            skip_known_empty = ids is None and id_index_path is not None
+            if skip_known_empty:
+                self.id_index.update(IdIndex.load(id_index_path))
+                n_skipped = sum(map(
+                    self.id_index.is_known_empty, range(1, max_id + 1)))
+                log.log_known_empty_ids_skipped(n_skipped, max_id)
+            if ids is not None:
+                id_source = {
+                    self.ID_SOURCE_KEY_KIND: self.ID_SOURCE_LIST,
+                    self.PROGRESS_KEY_IDS: list(ids)}
+            elif shuffle:
+                if random_seed is None:
+                    random_seed = random.randrange(2**32)
+                id_source = {
+                    self.ID_SOURCE_KEY_KIND: self.ID_SOURCE_SHUFFLED,
+                    self.ID_SOURCE_KEY_MAX_ID: max_id,
+                    self.ID_SOURCE_KEY_SEED: random_seed}
+            else:
+                id_source = {
+                    self.ID_SOURCE_KEY_KIND: self.ID_SOURCE_RANGE,
+                    self.ID_SOURCE_KEY_MAX_ID: max_id}
+            progress = self._create_progress_object(
+                id_source, batch_size=batch_size,
+                skip_known_empty=skip_known_empty)
             self._save_progress_file(progress)  # Initial save
 
-        # Loop progress object, ignoring already complete batches.
-        # Defensively deepcopy since we're mutating during iteration.
-        log.log_total_batches(progress)
-        for idx, batch in enumerate(deepcopy(progress)):
+        # Note which batches still need downloading,
+        # ignoring already complete batches.
+        log.log_total_batches(progress[self.PROGRESS_KEY_BATCHES])
+        pending = []
+        for idx, batch in enumerate(progress[self.PROGRESS_KEY_BATCHES]):
             if batch[self.PROGRESS_KEY_STATUS] == \
                     self.PROGRESS_STATUS_COMPLETE:
                 log.log_batch_already_complete(idx)
-                continue
             else:
-                # Try the request, but pause if no internet
-                while True:
-                    try:
-                        log.log_batch_start(idx)
-                        uri = self.generate_game_uri(
-                            batch[self.PROGRESS_KEY_IDS]
-                            )
-                        r = self.api_request(uri)
-                        break
-                    except requests.ConnectionError:
-                        print(f"Unable to connect to internet, "
-                              f"pausing {self.PAUSE_TIME_NO_CONNECTION}"
-                              f" seconds.")
-                        self._countdown(self.PAUSE_TIME_NO_CONNECTION)
-                        continue
-                # First, no matter the result, save the access time
-                batch[self.PROGRESS_KEY_LAST_ACCESSED] = \
-                    datetime.now().strftime('%Y-%b-%d %H:%M:%S.%f')
-                # If its 200, save the file, change status to complete
-                # If it's 202, mark it as queued.
-                # Anything else, could mean server blocking or down,
-                # so wait a while, then try again.
-                if r.status_code == 200:
-                    batch[self.PROGRESS_KEY_STATUS] = \
-                        self.PROGRESS_STATUS_COMPLETE
-                    progress[idx] = batch
-                    self._write_response(r, self.xml_dir + f'/{idx}.xml')
-                    self._save_progress_file(progress)
-                    log.log_batch_downloaded(idx, r, batch_cooldown)
-                elif r.status_code == 202:
-                    batch[self.PROGRESS_KEY_STATUS] = \
-                        self.PROGRESS_STATUS_QUEUED
-                    progress[idx] = batch
-                    self._save_progress_file(progress)
-                    log.log_batch_queued(idx)
-                else:
-                    will_cooldown = True
-                    # There is a 502 condition where the server error
-                    # recommends trying again in 30 seconds.
-                    # In that case, skip long server cooldown,
-                    # but move onto the next batch.
-                    if (r.status_code == 502) and \
-                       (r.text.find("try again in 30 seconds") != 1):
-                        will_cooldown = False
-                    log.log_batch_error(idx, r)
-
-                    batch[self.PROGRESS_KEY_STATUS] = \
-                        self.PROGRESS_STATUS_INCOMPLETE
-                    progress[idx] = batch
-                    self._save_progress_file(progress)
-
-                    # For all other error codes,
-                    # cooldown a longer time in case it means
-                    # the server is doing some sort of blocking
-                    # without explicitly notifying us.
-                    if will_cooldown:
-                        log.log_cooldown_start(server_cooldown, 'server')
-                        self._countdown(server_cooldown)
-            # Cooldown between batches to not overload
-            # or get blocked by server.
-            log.log_cooldown_start(batch_cooldown, 'batch')
-            self._countdown(batch_cooldown)
+                pending.append(idx)
+
+        batches = BatchQueue(
+            pending,
+            retry_delay=queued_retry_delay,
+            max_polls=queued_max_polls)
+        try:
+            self._retrieve_batches(
+                batches, progress, log, cooldown,
+                batch_cooldown, workers, rate, burst)
+            if self.extractor is not None:
+                # Batches are only complete once extracted
+                self.extractor.wait()
+        finally:
+            # Fold the journal into the progress file,
+            # even if the run is interrupted.
+            with self._progress_lock:
+                self._save_progress_file(progress)
 
         # End of run logging
         log.log_run_complete_summary(
-            progress,
+            progress[self.PROGRESS_KEY_BATCHES],
             self.PROGRESS_KEY_STATUS,
             [self.PROGRESS_STATUS_COMPLETE,
              self.PROGRESS_STATUS_QUEUED,
-             self.PROGRESS_STATUS_INCOMPLETE]
+             self.PROGRESS_STATUS_INCOMPLETE],
+            self.connection_stats()
             )
 
+    def refresh(
+            self,
+            general_data_path: str,
+            previous_save_dir: str = None,
+            max_id: int = None,
+            **kwargs) -> None:
+        """Re-download known board games and new ids since a previous crawl.
+
+        Rather than requesting every id from 1 to max_id, only requests ids
+        that a previous crawl found to be base board games, plus a sweep of
+        the ids above the previous crawl's max id. Ids are requested stalest
+        first: new ids (never requested), then known board games in order of
+        when their batch was last accessed in the previous crawl.
+
+        Use a new save_dir for the refresh, as batch files are numbered from
+        0 again. As with retrieve_all, an interrupted refresh is resumed by
+        running it again with the same save_dir.
+
+        Args:
+            general_data_path (str): Parquet file of general data extracted
+                from the previous crawl (see core.etl), with 'id' and 'type'
+                columns.
+            previous_save_dir (str, optional): save_dir of the previous crawl.
+                Its progress file gives the previous max id and when each id
+                was last accessed. Defaults to None, i.e. the max known id,
+                and known ids in id order.
+            max_id (int, optional): Max id to sweep new ids up to. Defaults
+                to None, i.e. discovered with discover_max_id.
+            **kwargs: Passed on to retrieve_all.
+        """
+        if max_id is None:
+            max_id = self.discover_max_id()
+        general_data = pd.read_parquet(
+            general_data_path, columns=['id', 'type'])
+        is_base_game = general_data['type'] == self.BASE_GAME_TYPE
+        known_ids = sorted({int(i) for i in
+                            general_data.loc[is_base_game, 'id']})
+        previous_max_id = max(known_ids, default=0)
+        last_accessed = {}
+        if previous_save_dir is not None:
+            previous_save_dir = Path(previous_save_dir)
+            progress = self._load_progress_file(
+                str(previous_save_dir / self.PATH_PROGRESS_FILE),
+                str(previous_save_dir / self.PATH_PROGRESS_JOURNAL))
+            # Batches that skipped known empty ids need the index they
+            # were made with
+            id_index_path = previous_save_dir / self.PATH_ID_INDEX
+            id_index = IdIndex.load(str(id_index_path)) \
+                if id_index_path.exists() else IdIndex()
+            for idx, batch in enumerate(progress[self.PROGRESS_KEY_BATCHES]):
+                accessed = batch[self.PROGRESS_KEY_LAST_ACCESSED]
+                if accessed:
+                    accessed = datetime.strptime(
+                        accessed, self.LAST_ACCESSED_FORMAT)
+                else:
+                    accessed = datetime.min
+                for i in self._batch_ids(progress, idx, id_index):
+                    last_accessed[i] = accessed
+            previous_max_id = max([previous_max_id, *last_accessed])
+        # sorted is stable, so equally stale ids stay in id order
+        known_ids.sort(key=lambda i: last_accessed.get(i, datetime.min))
+        new_ids = range(previous_max_id + 1, max_id + 1)
+        self.retrieve_all(ids=[*new_ids, *known_ids], **kwargs)
+
+    def discover_max_id(
+            self,
+            probe_size: int = PROBE_SIZE,
+            use_cache: bool = True) -> int:
+        """Find the current max thing id by probing the API.
+
+        Each probe requests a window of probe_size consecutive ids, of any
+        thing type. Starting from self.MAX_ID, windows are probed at
+        exponentially growing steps until one comes back empty, then the
+        boundary between the last non-empty and the empty window is binary
+        searched. This takes a couple dozen requests, and tolerates gaps of
+        unused ids up to probe_size long.
+
+        The result is cached with a timestamp in the save dir
+        ('max_id.json'), and reused for MAX_ID_CACHE_AGE seconds.
+
+        Args:
+            probe_size (int, optional): Number of ids per probe, i.e. the
+                longest gap of unused ids that is skipped over. Defaults to
+                PROBE_SIZE.
+            use_cache (bool, optional): Return a cached max id if it's recent
+                enough. Defaults to True.
+
+        Raises:
+            requests.HTTPError: if a probe fails PROBE_ATTEMPTS times.
+
+        Returns:
+            int: The largest id found to be in use.
+        """
+        if use_cache and os.path.isfile(self.max_id_cache_path):
+            with open(self.max_id_cache_path, 'r') as f:
+                cache = json.load(f)
+            if time() - cache['timestamp'] < self.MAX_ID_CACHE_AGE:
+                return cache['max_id']
+
+        # Largest id seen so far, i.e. from the highest non-empty window
+        found_max_id = 0
+
+        def probe(start: int) -> bool:
+            """Whether any ids in the window from start are in use."""
+            nonlocal found_max_id
+            ids = self._probe_ids(range(start, start + probe_size))
+            found_max_id = max([found_max_id, *ids])
+            return len(ids) > 0
+
+        # Exponential search for an empty window above a non-empty one.
+        # Id 0 is never used, so lo = 0 is a safe lower bound.
+        lo, hi = 0, self.MAX_ID
+        step = probe_size
+        while probe(hi):
+            lo = hi
+            hi += step
+            step *= 2
+        # Binary search for the boundary, until the non-empty window at lo
+        # reaches the empty window at hi.
+        while hi - lo > probe_size:
+            mid = (lo + hi) // 2
+            if probe(mid):
+                lo = mid
+            else:
+                hi = mid
+
+        with open(self.max_id_cache_path, 'w') as f:
+            json.dump({'max_id': found_max_id, 'timestamp': time()}, f)
+        return found_max_id
+
     def api_request(self, uri: str) -> requests.Response:
         """Make a request for board game geek data.
 
+        Uses the pooled session, so the connection is reused if one is open.
+        The body is streamed, i.e. only downloaded as it is read, so it can
+        be written to disk in chunks (see _write_response). The connection
+        goes back to the pool once the body is read.
+
         Args:
             uri (str): String URI for accessing the API.
 
         Returns:
             requests.models.Response: response from the HTTP request.
         """
-        r = requests.get(uri)
+        r = self.session.get(uri, timeout=self.timeout, stream=True)
         return r
 
+    def connection_stats(self) -> dict:
+        """Tally requests made and connections opened by self.session.
+
+        Includes pools that have been evicted or closed since.
+
+        Returns:
+            dict: with 'requests' and 'connections' counts, and 'reused',
+                the number of requests that reused an open connection.
+        """
+        with self._stats_lock:
+            n_requests = self._retired_pool_stats['requests']
+            n_connections = self._retired_pool_stats['connections']
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                n_requests += pool.num_requests
+                n_connections += pool.num_connections
+        return {'requests': n_requests,
+                'connections': n_connections,
+                'reused': max(n_requests - n_connections, 0)}
+
     def generate_game_uri(
         self,
         ids: list = None,
@@ -298,56 +669,569 @@ class Retriever:
         return uri
 
     def remove_progress_file(self) -> None:
-        """Deletes the progress file at the save path.
+        """Deletes the progress file and journal at the save path.
 
-        Does not error if file is missing.
+        Does not error if files are missing.
         """
         Path(self.progress_path).unlink(missing_ok=True)
+        Path(self.journal_path).unlink(missing_ok=True)
+
+    def _retrieve_batch(
+            self,
+            idx: int,
+            progress: dict,
+            log: 'RetrieverLogger',
+            batch_cooldown: int,
+            limiter: 'TokenBucket' = None,
+            cancel: threading.Event = None) -> requests.Response | None:
+        """Request one batch, then record the result in the progress object.
+
+        Safe to call from multiple threads, as updates to the progress object
+        and progress file are made while holding self._progress_lock.
+        In concurrent mode, pass the shared limiter so that losing the
+        connection pauses all workers, and retries go through the limiter.
+
+        Args:
+            idx (int): Batch index in the progress object.
+            progress (dict): Progress object from _create_progress_object.
+            log (RetrieverLogger): Logger for the current run.
+            batch_cooldown (int): Seconds of cooldown between batches,
+                used for estimating the remaining time.
+            limiter (TokenBucket, optional): Rate limiter shared between
+                concurrent workers. Defaults to None, i.e. serial mode.
+            cancel (threading.Event, optional): Stop waiting on the limiter
+                if set. Defaults to None.
+
+        Returns:
+            requests.Response | None: The batch response, or None if
+                cancelled before a response was received.
+        """
+        with self._progress_lock:
+            ids = self._batch_ids(progress, idx)
+        # Try the request, but pause if no internet
+        while True:
+            try:
+                log.log_batch_start(idx)
+                uri = self.generate_game_uri(ids)
+                r = self.api_request(uri)
+                break
+            except requests.ConnectionError:
+                if limiter is None:
+                    print(f"Unable to connect to internet, "
+                          f"pausing {self.PAUSE_TIME_NO_CONNECTION}"
+                          f" seconds.")
+                    self._countdown(self.PAUSE_TIME_NO_CONNECTION)
+                    continue
+                # Pause every worker, then wait for a token like any
+                # other request so retries don't bypass the rate limit.
+                log.log_no_connection(idx, self.PAUSE_TIME_NO_CONNECTION)
+                limiter.pause(self.PAUSE_TIME_NO_CONNECTION)
+                if not limiter.acquire(cancel=cancel):
+                    return None
+                continue
+        # First, no matter the result, save the access time
+        last_accessed = datetime.now().strftime(self.LAST_ACCESSED_FORMAT)
+        # If its 200, save the file, change status to complete
+        # If it's 202, mark it as queued.
+        # Anything else, could mean server blocking or down,
+        # so mark it incomplete to try again later.
+        occupied_ids = None
+        if r.status_code == 200:
+            status = self.PROGRESS_STATUS_COMPLETE
+            suffix = COMPRESSION_SUFFIXES[self.compression]
+            out_path = self.xml_dir + f'/{idx}.xml{suffix}'
+            if self.extractor is None:
+                # Item ids are parsed from the chunks as they're written
+                item_id_parser = ItemIdParser()
+                n_bytes = self._write_response(r, out_path, item_id_parser)
+                occupied_ids = item_id_parser.close()
+            else:
+                # Pipeline mode: hand the response to the extractor in
+                # memory rather than rereading it from disk later. The
+                # batch is only complete once extracted, when the extractor
+                # reports its item ids, so a failed extraction leaves it
+                # to be requested again on resuming.
+                try:
+                    content = r.content
+                finally:
+                    r.close()
+                n_bytes = len(content)
+                if self.archive_xml:
+                    self._write_chunks([content], out_path)
+                status = None
+                self.extractor.submit(
+                    f'{idx}.xml', content,
+                    partial(self._complete_batch, progress, idx, ids))
+            log.log_batch_downloaded(idx, n_bytes, batch_cooldown)
+        elif r.status_code == 202:
+            status = self.PROGRESS_STATUS_QUEUED
+            # Read the (short) streamed body so the connection is released
+            # back to the pool rather than dropped.
+            _ = r.content
+            log.log_batch_queued(idx)
+        else:
+            status = self.PROGRESS_STATUS_INCOMPLETE
+            log.log_batch_error(idx, r)
+        with self._progress_lock:
+            batch = progress[self.PROGRESS_KEY_BATCHES][idx]
+            batch[self.PROGRESS_KEY_LAST_ACCESSED] = last_accessed
+            if status is not None:
+                batch[self.PROGRESS_KEY_STATUS] = status
+            if occupied_ids is not None:
+                self.id_index.record(ids, occupied_ids)
+            self._record_batch_progress(progress, idx)
+        return r
+
+    def _complete_batch(
+            self,
+            progress: dict,
+            idx: int,
+            ids: list[int],
+            occupied_ids: list[int]) -> None:
+        """Record a batch as complete, once the extractor has extracted it.
+
+        Called from the extractor's background thread.
+
+        Args:
+            progress (dict): Progress object from _create_progress_object.
+            idx (int): Batch index.
+            ids (list[int]): Ids requested in the batch.
+            occupied_ids (list[int]): Ids of the items in the response.
+        """
+        with self._progress_lock:
+            batch = progress[self.PROGRESS_KEY_BATCHES][idx]
+            batch[self.PROGRESS_KEY_STATUS] = self.PROGRESS_STATUS_COMPLETE
+            self.id_index.record(ids, occupied_ids)
+            self._record_batch_progress(progress, idx)
+
+    def _retrieve_batches(
+            self,
+            batches: 'BatchQueue',
+            progress: dict,
+            log: 'RetrieverLogger',
+            cooldown: 'AdaptiveCooldown',
+            batch_cooldown: int,
+            workers: int,
+            rate: float,
+            burst: int) -> None:
+        """Request batches from the queue in serial or concurrent mode.
+
+        See Retriever.retrieve_all for the args.
+        """
+        if workers == 1 and rate is None:
+            # Serial mode, with adaptive cooldowns between batches.
+            while (idx := batches.next()) is not None:
+                r = self._retrieve_batch(idx, progress, log, cooldown.delay)
+                if r.status_code == 202:
+                    self._requeue_batch(idx, batches, log)
+                # Cooldown between batches to not overload
+                # or get blocked by server. For error codes, this backs off
+                # in case it means the server is doing some sort of blocking
+                # without explicitly notifying us.
+                delay = cooldown.record(r.status_code, self._retry_after(r))
+                cooldown_type = 'server' \
+                    if cooldown.should_back_off(r.status_code) else 'batch'
+                log.log_cooldown_start(delay, cooldown_type)
+                self._countdown(delay)
+        else:
+            # Concurrent mode, with a shared rate limiter instead
+            # of cooldowns between batches.
+            if rate is None:
+                rate = 1 / max(batch_cooldown, 1)
+                if workers > 1:
+                    log.log_rate_defaulted(workers, batch_cooldown)
+            log.log_concurrency(workers, rate, burst)
+            self._retrieve_concurrently(
+                batches,
+                progress,
+                log,
+                workers,
+                TokenBucket(rate, burst),
+                cooldown)
+
+    def _requeue_batch(
+            self,
+            idx: int,
+            batches: 'BatchQueue',
+            log: 'RetrieverLogger') -> None:
+        """Schedule a batch queued by the server to be requested again.
+
+        Args:
+            idx (int): Batch index.
+            batches (BatchQueue): Batches still to be requested this run.
+            log (RetrieverLogger): Logger for the current run.
+        """
+        if batches.requeue(idx):
+            log.log_batch_repoll_scheduled(
+                idx, batches.retry_delay, batches.polls[idx])
+        else:
+            log.log_batch_repolls_exhausted(idx, batches.max_polls)
+
+    def _probe_ids(self, ids: range) -> list[int]:
+        """Request a window of ids, returning those that are in use.
+
+        Responses other than 200 are retried, waiting as long as the server
+        asks, or PROBE_COOLDOWN seconds.
+
+        Args:
+            ids (range): Ids to request.
+
+        Raises:
+            requests.HTTPError: if the probe fails PROBE_ATTEMPTS times.
+
+        Returns:
+            list[int]: Ids of items in the response.
+        """
+        uri = self.generate_game_uri(
+            ids, filter_basegame=False, stats=False)
+        for _ in range(self.PROBE_ATTEMPTS):
+            r = self.api_request(uri)
+            if r.status_code == 200:
+                root = etree.fromstring(r.content)
+                sleep(self.PROBE_COOLDOWN)
+                return [int(item.get('id')) for item in root.findall('item')]
+            retry_after = self._retry_after(r)
+            sleep(self.PROBE_COOLDOWN if retry_after is None else retry_after)
+        raise requests.HTTPError(
+            f"Probe for ids {ids.start} to {ids.stop - 1} failed with"
+            f" {r.status_code}.", response=r)
+
+    def _retry_after(self, response: requests.Response) -> float | None:
+        """Return seconds the server asks us to wait, if it says so.
+
+        Reads the Retry-After header, given either in seconds or as an HTTP
+        date. There is also a 502 condition where the server error recommends
+        trying again in 30 seconds, which is treated the same way.
+
+        Args:
+            response (requests.Response): Response for a batch request.
+
+        Returns:
+            float | None: Seconds to wait, or None if not specified.
+        """
+        value = response.headers.get('Retry-After')
+        if value is not None:
+            try:
+                return max(float(value), 0.)
+            except ValueError:
+                pass
+            try:
+                retry_time = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                retry_time = None
+            if retry_time is not None:
+                if retry_time.tzinfo is None:
+                    retry_time = retry_time.replace(tzinfo=timezone.utc)
+                seconds = retry_time - datetime.now(timezone.utc)
+                return max(seconds.total_seconds(), 0.)
+        if (response.status_code == 502) and \
+           (response.text.find("try again in 30 seconds") != -1):
+            return self.RETRY_AFTER_TRY_AGAIN
+        return None
+
+    def _retrieve_concurrently(
+            self,
+            batches: 'BatchQueue',
+            progress: dict,
+            log: 'RetrieverLogger',
+            workers: int,
+            limiter: 'TokenBucket',
+            cooldown: 'AdaptiveCooldown') -> None:
+        """Retrieve pending batches using a pool of worker threads.
+
+        Each worker takes the next batch index from the queue and waits on the
+        shared rate limiter before making its request. A server error pauses
+        the limiter, and therefore all workers, for the backed off cooldown.
+
+        Args:
+            batches (BatchQueue): Batches still to be requested.
+            progress (dict): Progress object from _create_progress_object.
+            log (RetrieverLogger): Logger for the current run.
+            workers (int): Number of batches that can be in flight at once.
+            limiter (TokenBucket): Rate limiter shared between workers.
+            cooldown (AdaptiveCooldown): Shared cooldown controller, giving
+                how long to pause all workers on encountering a server error.
+        """
+        # Set if the main thread is interrupted, so workers stop
+        # picking up new batches.
+        stop = threading.Event()
+
+        def work() -> None:
+            while not stop.is_set():
+                idx = batches.next(cancel=stop)
+                if idx is None:
+                    return
+                if not limiter.acquire(cancel=stop):
+                    return
+                r = self._retrieve_batch(
+                    idx, progress, log, 0, limiter=limiter, cancel=stop)
+                if r is None:
+                    return
+                if r.status_code == 202:
+                    self._requeue_batch(idx, batches, log)
+                delay = cooldown.record(r.status_code, self._retry_after(r))
+                if cooldown.should_back_off(r.status_code):
+                    log.log_cooldown_start(delay, 'server')
+                    limiter.pause(delay)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(work) for _ in range(workers)]
+            try:
+                # Return as soon as any worker fails, rather than waiting
+                # on workers in order, so the others can be stopped early.
+                done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+            except BaseException:
+                stop.set()
+                raise
 
     def _create_progress_object(
             self,
-            ids: list,
-            batch_size: int = 1000) -> list:
-        """Batchify list of ids, returning progress object with statuses per batch.
+            id_source: dict,
+            batch_size: int = 1000,
+            skip_known_empty: bool = False) -> dict:
+        """Batchify ids, returning progress object with statuses per batch.
+
+        Ids aren't stored per batch. Instead, batch i covers positions
+        i*batch_size up to (i+1)*batch_size of the id source, and its ids are
+        worked out by Retriever._batch_ids. This keeps progress objects small
+        no matter how many ids there are.
+
+        When skipping ids the id index knows to be empty, batches cover
+        uneven ranges of positions instead, each holding up to batch_size
+        ids that aren't known to be empty. The start position of each batch
+        is stored, plus the end of the last.
 
         Args:
-            ids (list): BGG thing ids e.g. board games.
+            id_source (dict): Where ids come from. Has a 'kind' of
+                ID_SOURCE_RANGE (ids 1 to 'max_id'), ID_SOURCE_SHUFFLED
+                (ids 1 to 'max_id' shuffled by 'seed'), or ID_SOURCE_LIST
+                (an explicit list of 'ids').
             batch_size (int, optional): Defaults to 1000.
+            skip_known_empty (bool, optional): Leave out ids self.id_index
+                knows to be empty. Defaults to False.
 
         Returns:
-            list: of dicts containing batches of ids and status info
+            dict: containing the id source, batch size, and a list of dicts
+                with status info for each batch.
         """
-
-        progress = [
-            {self.PROGRESS_KEY_IDS: ids[i: i+batch_size],
-             self.PROGRESS_KEY_STATUS: self.PROGRESS_STATUS_INCOMPLETE,
+        n_ids = self._id_source_len(id_source)
+        progress = {
+            self.PROGRESS_KEY_VERSION: self.PROGRESS_VERSION,
+            self.PROGRESS_KEY_ID_SOURCE: id_source,
+            self.PROGRESS_KEY_BATCH_SIZE: batch_size}
+        if skip_known_empty:
+            bounds = [0]
+            n_batch_ids = 0
+            source_ids = self._source_ids(id_source, range(n_ids))
+            for position, i in enumerate(source_ids):
+                if self.id_index.is_known_empty(i):
+                    continue
+                if n_batch_ids == batch_size:
+                    bounds.append(position)
+                    n_batch_ids = 0
+                n_batch_ids += 1
+            if n_batch_ids:
+                bounds.append(n_ids)
+            progress[self.PROGRESS_KEY_BATCH_BOUNDS] = bounds
+            n_batches = len(bounds) - 1
+        else:
+            n_batches = -(-n_ids // batch_size)
+        progress[self.PROGRESS_KEY_BATCHES] = [
+            {self.PROGRESS_KEY_STATUS: self.PROGRESS_STATUS_INCOMPLETE,
              self.PROGRESS_KEY_LAST_ACCESSED: ''}
-            for i in range(0, len(ids), batch_size)]
+            for _ in range(n_batches)]
 
         return progress
 
-    def _save_progress_file(self, progress: list) -> None:
-        """Saves a progress object to self's save path."""
-        with open(self.progress_path, 'w') as f:
-            json.dump(progress, f, indent=4)
+    def _id_source_len(self, id_source: dict) -> int:
+        """Number of ids in an id source."""
+        if id_source[self.ID_SOURCE_KEY_KIND] == self.ID_SOURCE_LIST:
+            return len(id_source[self.PROGRESS_KEY_IDS])
+        return id_source[self.ID_SOURCE_KEY_MAX_ID]
+
+    def _batch_ids(
+            self,
+            progress: dict,
+            idx: int,
+            id_index: 'IdIndex' = None) -> list[int]:
+        """Return the ids of a batch in a progress object.
+
+        Args:
+            progress (dict): Progress object from _create_progress_object.
+            idx (int): Batch index.
+            id_index (IdIndex, optional): Index of the crawl the progress
+                object belongs to, for leaving out known empty ids. Defaults
+                to None, i.e. self.id_index.
+
+        Returns:
+            list[int]: BGG thing ids in the batch.
+        """
+        id_source = progress[self.PROGRESS_KEY_ID_SOURCE]
+        bounds = progress.get(self.PROGRESS_KEY_BATCH_BOUNDS)
+        if bounds is None:
+            batch_size = progress[self.PROGRESS_KEY_BATCH_SIZE]
+            n_ids = self._id_source_len(id_source)
+            positions = range(idx * batch_size,
+                              min((idx + 1) * batch_size, n_ids))
+            return self._source_ids(id_source, positions)
+        # Ids only become known empty once their batch is downloaded, so
+        # filtering gives the same ids as when the batches were made.
+        if id_index is None:
+            id_index = self.id_index
+        positions = range(bounds[idx], bounds[idx + 1])
+        return [i for i in self._source_ids(id_source, positions)
+                if not id_index.is_known_empty(i)]
+
+    def _source_ids(self, id_source: dict, positions: range) -> list[int]:
+        """Return the ids at a range of positions of an id source.
+
+        Args:
+            id_source (dict): Id source of a progress object.
+            positions (range): Positions of the ids.
+
+        Returns:
+            list[int]: BGG thing ids at those positions.
+        """
+        n_ids = self._id_source_len(id_source)
+        match id_source[self.ID_SOURCE_KEY_KIND]:
+            case self.ID_SOURCE_RANGE:
+                return [i + 1 for i in positions]
+            case self.ID_SOURCE_SHUFFLED:
+                seed = id_source[self.ID_SOURCE_KEY_SEED]
+                return [_permute(i, n_ids, seed) + 1 for i in positions]
+            case self.ID_SOURCE_LIST:
+                ids = id_source[self.PROGRESS_KEY_IDS]
+                return [ids[i] for i in positions]
+        raise ValueError(
+            f"Unknown id source {id_source[self.ID_SOURCE_KEY_KIND]}.")
+
+    def _save_progress_file(self, progress: dict) -> None:
+        """Saves a progress object to self's save path, clearing the journal.
+
+        The file is written to a temporary path and then moved into place,
+        so a crash mid-write can't leave a torn progress file. The journal
+        is only cleared after, so replaying it on top is always safe.
+        The id index is saved alongside.
+        """
+        tmp_path = self.progress_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(progress, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.progress_path)
+        self.id_index.save(self.id_index_path)
+        Path(self.journal_path).unlink(missing_ok=True)
+        self._journal_entries = 0
+
+    def _record_batch_progress(self, progress: dict, idx: int) -> None:
+        """Append a batch's status to the progress journal.
+
+        Each line of the journal is a JSON object with the batch index and
+        its status fields. Once PROGRESS_JOURNAL_COMPACT_EVERY lines have
+        been written, the progress file is rewritten instead.
 
-    def _load_progress_file(self) -> dict:
-        """Returns a dict from 'progress.json' file in self's save path."""
-        with open(self.progress_path, 'r') as f:
+        Args:
+            progress (dict): Progress object from _create_progress_object.
+            idx (int): Index of the batch that changed.
+        """
+        self._journal_entries += 1
+        if self._journal_entries >= self.PROGRESS_JOURNAL_COMPACT_EVERY:
+            self._save_progress_file(progress)
+            return
+        batch = progress[self.PROGRESS_KEY_BATCHES][idx]
+        entry = {'idx': idx,
+                 self.PROGRESS_KEY_STATUS: batch[self.PROGRESS_KEY_STATUS],
+                 self.PROGRESS_KEY_LAST_ACCESSED:
+                     batch[self.PROGRESS_KEY_LAST_ACCESSED]}
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_progress_file(
+            self,
+            progress_path: str = None,
+            journal_path: str = None) -> dict:
+        """Returns progress from 'progress.json' in self's save path.
+
+        Batch updates in the progress journal are replayed on top. A torn
+        last line, from a crash mid-append, is ignored. Progress files from
+        before id sources, i.e. a list of batches each with their ids, are
+        converted to an ID_SOURCE_LIST progress object.
+
+        Args:
+            progress_path (str, optional): Load this progress file instead,
+                e.g. from a previous crawl. Defaults to None, i.e.
+                self.progress_path.
+            journal_path (str, optional): Journal of progress_path. Defaults
+                to None, i.e. self.journal_path.
+        """
+        if progress_path is None:
+            progress_path = self.progress_path
+        if journal_path is None:
+            journal_path = self.journal_path
+        with open(progress_path, 'r') as f:
             progress = json.load(f)
+        if isinstance(progress, list):
+            progress = self._convert_legacy_progress(progress)
+        if not os.path.isfile(journal_path):
+            return progress
+        with open(journal_path, 'r') as f:
+            lines = f.read().split('\n')
+        for i, line in enumerate(lines):
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                if i == len(lines) - 1:
+                    break
+                raise
+            batch = progress[self.PROGRESS_KEY_BATCHES][entry.pop('idx')]
+            batch.update(entry)
+        return progress
+
+    def _convert_legacy_progress(self, legacy: list[dict]) -> dict:
+        """Convert a list of batches with explicit ids to a progress object.
+
+        Args:
+            legacy (list[dict]): Batches with ids, status and last accessed.
+
+        Returns:
+            dict: Progress object with an ID_SOURCE_LIST id source.
+        """
+        # All batches but the last are full
+        batch_size = max(len(legacy[0][self.PROGRESS_KEY_IDS]), 1) \
+            if legacy else 1
+        ids = []
+        batches = []
+        for batch in legacy:
+            ids.extend(batch.pop(self.PROGRESS_KEY_IDS))
+            batches.append(batch)
+        progress = {
+            self.PROGRESS_KEY_VERSION: self.PROGRESS_VERSION,
+            self.PROGRESS_KEY_ID_SOURCE: {
+                self.ID_SOURCE_KEY_KIND: self.ID_SOURCE_LIST,
+                self.PROGRESS_KEY_IDS: ids},
+            self.PROGRESS_KEY_BATCH_SIZE: batch_size,
+            self.PROGRESS_KEY_BATCHES: batches}
         return progress
 
     def _check_progress_file_exists(self) -> bool:
         """True if 'progress.json' file already exists."""
         return os.path.isfile(self.progress_path)
 
-    def _countdown(self, time_to_sleep: int) -> None:
+    def _countdown(self, time_to_sleep: float) -> None:
         """Prints a countdown timer.
 
         Args:
-            time_to_sleep (int): in seconds.
+            time_to_sleep (float): in seconds.
         """
-        # Defensive int coercion
+        # Sleep off any fraction of a second first,
+        # then count down whole seconds.
+        sleep(max(time_to_sleep - int(time_to_sleep), 0))
         time_to_sleep = int(time_to_sleep)
         for i in range(time_to_sleep, 0, -1):
             h = i // 3600
@@ -361,15 +1245,434 @@ class Retriever:
     def _write_response(
             self,
             response: requests.Response,
-            out_path: str) -> None:
-        """Write the content of a response to a file.
+            out_path: str,
+            item_id_parser: 'ItemIdParser' = None) -> int:
+        """Stream the content of a response to a file.
+
+        Content is written in chunks, so a whole batch is never held in
+        memory, and compressed with self.compression (see
+        core.compression). It is written to a temporary file first, so an
+        interrupted download never leaves a partial file at out_path.
 
         Args:
             response (requests.Response): Response object
             out_path (str): location to write the file
+            item_id_parser (ItemIdParser, optional): Fed each chunk as it's
+                written. Defaults to None.
+
+        Returns:
+            int: Number of (uncompressed) bytes written.
+        """
+        try:
+            return self._write_chunks(
+                response.iter_content(self.WRITE_CHUNK_SIZE), out_path,
+                item_id_parser)
+        finally:
+            response.close()
+
+    def _write_chunks(
+            self,
+            chunks: Iterable[bytes],
+            out_path: str,
+            item_id_parser: 'ItemIdParser' = None) -> int:
+        """Write chunks of bytes to a file, via a temporary file.
+
+        See _write_response.
+
+        Args:
+            chunks (Iterable[bytes]): Content to write.
+            out_path (str): location to write the file
+            item_id_parser (ItemIdParser, optional): Fed each chunk as it's
+                written. Defaults to None.
+
+        Returns:
+            int: Number of (uncompressed) bytes written.
+        """
+        n_bytes = 0
+        tmp_path = out_path + '.part'
+        with open_compressed(tmp_path, 'wb', self.compression) as f:
+            for chunk in chunks:
+                f.write(chunk)
+                n_bytes += len(chunk)
+                if item_id_parser is not None:
+                    item_id_parser.feed(chunk)
+        os.replace(tmp_path, out_path)
+        return n_bytes
+
+
+class ItemIdParser:
+    """Incrementally parses the ids of the items in streamed xml.
+
+    Fed a response's chunks as they're written to disk, so the ids of its
+    items are known without reading the file back. Each item is cleared
+    once parsed, so memory use stays bounded however large the batch.
+    """
+    def __init__(self) -> None:
+        self.ids = []
+        self._parser = etree.XMLPullParser(events=('start', 'end'))
+        # Number of elements open, i.e. 1 inside the root
+        self._depth = 0
+        self._valid = True
+
+    def feed(self, chunk: bytes) -> None:
+        """Parse the next chunk of xml."""
+        if not self._valid:
+            return
+        try:
+            self._parser.feed(chunk)
+            self._read_events()
+        except etree.XMLSyntaxError:
+            self._valid = False
+
+    def close(self) -> list[int] | None:
+        """Finish parsing.
+
+        Returns:
+            list[int] | None: Ids of the <item> children of the root, or
+                None if the xml isn't valid.
+        """
+        if self._valid:
+            try:
+                self._parser.close()
+                self._read_events()
+            except etree.XMLSyntaxError:
+                self._valid = False
+        return self.ids if self._valid else None
+
+    def _read_events(self) -> None:
+        """Collect item ids from parsed elements, then free the items."""
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if self._depth == 1 and elem.tag == 'item':
+                    self.ids.append(int(elem.get('id')))
+                self._depth += 1
+                continue
+            self._depth -= 1
+            if self._depth == 1:
+                elem.clear(keep_tail=True)
+                parent = elem.getparent()
+                while elem.getprevious() is not None:
+                    del parent[0]
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter.
+
+    Tokens are refilled continuously at `rate` tokens per second, up to a
+    maximum of `burst` tokens. Each request consumes one token, so over time
+    requests are limited to `rate` per second, while up to `burst` requests
+    can be made back to back.
+    """
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        """Initialize with a full bucket.
+
+        Args:
+            rate (float): Tokens added per second.
+            burst (int, optional): Bucket capacity. Defaults to 1.
+
+        Raises:
+            ValueError: if rate is not positive or burst is less than 1.
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        if burst < 1:
+            raise ValueError("burst must be at least 1.")
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._time_last_refill = monotonic()
+        self._time_paused_until = 0.
+        self._lock = threading.Lock()
+
+    def acquire(self, cancel: threading.Event = None) -> bool:
+        """Block until a token is available, then consume it.
+
+        Args:
+            cancel (threading.Event, optional): Stop waiting if this event
+                is set. Defaults to None.
+
+        Returns:
+            bool: True if a token was consumed, False if cancelled.
+        """
+        while True:
+            with self._lock:
+                now = monotonic()
+                self._refill(now)
+                if now < self._time_paused_until:
+                    wait = self._time_paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            if cancel is None:
+                sleep(wait)
+            elif cancel.wait(wait):
+                return False
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no tokens for the next `seconds`, and empty the bucket.
+
+        Refilling restarts when the pause ends, so requests resume at the
+        rate rather than with a burst.
+        """
+        with self._lock:
+            self._time_paused_until = max(
+                self._time_paused_until, monotonic() + seconds)
+            self._tokens = 0.
+            self._time_last_refill = self._time_paused_until
+
+    def _refill(self, now: float) -> None:
+        """Add tokens accumulated since the last refill."""
+        # Nothing accumulates during a pause
+        if now <= self._time_last_refill:
+            return
+        elapsed = now - self._time_last_refill
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._time_last_refill = now
+
+
+class IdIndex:
+    """Bitmaps of which ids have been requested, and which returned items.
+
+    Bit i of `requested` is set once id i was part of a downloaded batch,
+    and bit i of `occupied` if that batch's response included an item with
+    id i. Ids that were requested but not occupied are known to be empty,
+    i.e. not in use or not board games, and can be left out of later crawls.
+
+    Saved as the requested bitmap followed by the occupied bitmap, both of
+    the same length. Not thread-safe, callers should hold a lock.
+    """
+    def __init__(self, max_id: int = 0) -> None:
+        """Initialize with no ids recorded.
+
+        Args:
+            max_id (int, optional): Max id to allocate room for. The bitmaps
+                grow as needed. Defaults to 0.
+        """
+        self.requested = bytearray(max_id // 8 + 1)
+        self.occupied = bytearray(max_id // 8 + 1)
+
+    @classmethod
+    def load(cls, path: str) -> 'IdIndex':
+        """Load an IdIndex saved with IdIndex.save."""
+        data = Path(path).read_bytes()
+        index = cls()
+        half = len(data) // 2
+        index.requested = bytearray(data[:half])
+        index.occupied = bytearray(data[half:])
+        return index
+
+    def save(self, path: str) -> None:
+        """Save to path, via a temporary file so it's never left torn."""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.requested)
+            f.write(self.occupied)
+        os.replace(tmp_path, path)
+
+    def record(
+            self,
+            requested_ids: list[int],
+            occupied_ids: list[int]) -> None:
+        """Record the ids of a downloaded batch, and those that had items.
+
+        Args:
+            requested_ids (list[int]): Ids requested in the batch.
+            occupied_ids (list[int]): Ids of the items in the response.
+        """
+        self._grow(max([0, *requested_ids, *occupied_ids]))
+        for i in requested_ids:
+            self.requested[i >> 3] |= 1 << (i & 7)
+        for i in occupied_ids:
+            self.occupied[i >> 3] |= 1 << (i & 7)
+
+    def update(self, other: 'IdIndex') -> None:
+        """Add the ids recorded in another IdIndex."""
+        self._grow(len(other.requested) * 8 - 1)
+        for n, byte in enumerate(other.requested):
+            self.requested[n] |= byte
+        for n, byte in enumerate(other.occupied):
+            self.occupied[n] |= byte
+
+    def is_known_empty(self, i: int) -> bool:
+        """Whether id i was requested before without returning an item."""
+        if (i >> 3) >= len(self.requested):
+            return False
+        bit = 1 << (i & 7)
+        return bool(self.requested[i >> 3] & bit) and \
+            not self.occupied[i >> 3] & bit
+
+    def _grow(self, max_id: int) -> None:
+        """Extend the bitmaps to fit max_id."""
+        extra = max_id // 8 + 1 - len(self.requested)
+        if extra > 0:
+            self.requested.extend(bytes(extra))
+            self.occupied.extend(bytes(extra))
+
+
+class BatchQueue:
+    """Thread-safe queue of batch indices still to be requested in a run.
+
+    Batches queued by the server (202 response) can be put back with
+    BatchQueue.requeue, to be handed out again once retry_delay seconds have
+    passed. Ready re-polls are handed out before fresh batches, so they are
+    interleaved with them rather than left until the end of the run.
+    """
+    def __init__(
+            self,
+            pending: list[int],
+            retry_delay: float = 60,
+            max_polls: int = 5) -> None:
+        """Initialize with the batches to request.
+
+        Args:
+            pending (list[int]): Batch indices, in request order.
+            retry_delay (float, optional): Seconds before a requeued batch
+                is handed out again. Defaults to 60.
+            max_polls (int, optional): Max number of times each batch can be
+                requeued. Defaults to 5.
+        """
+        self.retry_delay = retry_delay
+        self.max_polls = max_polls
+        self.polls = {}  # batch index -> times requeued
+        self._fresh = list(reversed(pending))  # pop from the end
+        self._repolls = []  # heap of (ready time, batch index)
+        self._condition = threading.Condition()
+
+    def next(self, cancel: threading.Event = None) -> int | None:
+        """Return the next batch index to request.
+
+        If only re-polls that aren't ready yet are left, blocks until the
+        first one is ready.
+
+        Args:
+            cancel (threading.Event, optional): Stop waiting if this event
+                is set. Defaults to None.
+
+        Returns:
+            int | None: Batch index, or None if there are no batches left
+                or if cancelled.
+        """
+        with self._condition:
+            while True:
+                now = monotonic()
+                if self._repolls and self._repolls[0][0] <= now:
+                    return heapq.heappop(self._repolls)[1]
+                if self._fresh:
+                    return self._fresh.pop()
+                if not self._repolls:
+                    return None
+                if cancel is not None and cancel.is_set():
+                    return None
+                # Wake up when the first re-poll is ready, or earlier if
+                # another batch is requeued, to check for cancellation.
+                self._condition.wait(min(self._repolls[0][0] - now, 1))
+
+    def requeue(self, idx: int) -> bool:
+        """Schedule a batch to be handed out again after retry_delay.
+
+        Args:
+            idx (int): Batch index.
+
+        Returns:
+            bool: True if scheduled, False if it has used up its max_polls.
+        """
+        with self._condition:
+            if self.polls.get(idx, 0) >= self.max_polls:
+                return False
+            self.polls[idx] = self.polls.get(idx, 0) + 1
+            heapq.heappush(
+                self._repolls, (monotonic() + self.retry_delay, idx))
+            self._condition.notify_all()
+            return True
+
+
+class AdaptiveCooldown:
+    """AIMD-style controller for the cooldown between batch requests.
+
+    The request rate (one over the cooldown) is increased additively while
+    batches succeed, so the cooldown shrinks towards min_delay. On rate
+    limiting (429), server errors (5xx) and other error codes, the cooldown is
+    multiplied by backoff_factor, i.e. backs off exponentially while errors
+    continue, with random jitter so retries don't line up. A Retry-After
+    longer than the backed off cooldown is honored. The cooldown never
+    exceeds max_delay.
+    """
+    def __init__(
+            self,
+            initial_delay: float,
+            min_delay: float = 1,
+            max_delay: float = 3*60*60,
+            rate_increase: float = 0.01,
+            backoff_factor: float = 2,
+            jitter: float = 0.1,
+            random_seed: int = None) -> None:
+        """Initialize with the starting cooldown.
+
+        Args:
+            initial_delay (float): Starting cooldown in seconds.
+            min_delay (float, optional): Smallest cooldown in seconds.
+                Defaults to 1.
+            max_delay (float, optional): Largest cooldown in seconds.
+                Defaults to 3*60*60, i.e. 3 hours.
+            rate_increase (float, optional): Requests per second added to the
+                request rate for each successful batch. Defaults to 0.01.
+            backoff_factor (float, optional): Cooldown multiplier on errors.
+                Defaults to 2.
+            jitter (float, optional): Backed off cooldowns are randomly
+                scaled by up to this fraction either way. Defaults to 0.1.
+            random_seed (int, optional): Seed for the jitter.
+                Defaults to None.
+
+        Raises:
+            ValueError: if min_delay is not positive or backoff_factor is
+                less than 1.
         """
-        with open(out_path, 'wb') as f:
-            f.write(response.content)
+        if min_delay <= 0:
+            raise ValueError("min_delay must be positive.")
+        if backoff_factor < 1:
+            raise ValueError("backoff_factor must be at least 1.")
+        self.min_delay = min(min_delay, max_delay)
+        self.max_delay = max_delay
+        self.rate_increase = rate_increase
+        self.backoff_factor = backoff_factor
+        self.jitter = jitter
+        self.delay = self._clamp(initial_delay)
+        self._random = random.Random(random_seed)
+        self._lock = threading.Lock()
+
+    def should_back_off(self, status_code: int) -> bool:
+        """True for response codes other than 200 (done) or 202 (queued)."""
+        return status_code not in (200, 202)
+
+    def record(self, status_code: int, retry_after: float = None) -> float:
+        """Update the cooldown from a batch response.
+
+        Args:
+            status_code (int): Response status code.
+            retry_after (float, optional): Seconds the server asked to wait,
+                e.g. from a Retry-After header. Defaults to None.
+
+        Returns:
+            float: Seconds to cooldown before the next request.
+        """
+        with self._lock:
+            if status_code == 200:
+                rate = 1 / self.delay + self.rate_increase
+                self.delay = self._clamp(1 / rate)
+            elif self.should_back_off(status_code):
+                delay = self.delay * self.backoff_factor
+                delay *= self._random.uniform(1 - self.jitter, 1 + self.jitter)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                self.delay = self._clamp(delay)
+            # 202 leaves the cooldown as is
+            return self.delay
+
+    def _clamp(self, delay: float) -> float:
+        """Keep delay between min_delay and max_delay."""
+        return min(max(delay, self.min_delay), self.max_delay)
 
 
 class RetrieverLogger:
@@ -383,9 +1686,14 @@ class RetrieverLogger:
         self.time_start = None
         self.time_end = None
         self.total_batches = None
-        self.time_current_batch_start = None
+        self.time_batch_starts = {}  # batch index -> start time
         self.batch_times = []  # in seconds rounded to one decimal
         self.batch_sizes = []  # in bytes
+        # Concurrency settings, for estimating remaining time
+        self.workers = 1
+        self.rate = None
+        # Batches may be logged from multiple threads
+        self._lock = threading.Lock()
 
         # It might be unlikely that client code starts more than
         # one instance of RetrieverLogger.
@@ -442,19 +1750,87 @@ class RetrieverLogger:
         """Log when creating a new progress file."""
         self.logger.info("Creating new progress file.")
 
-    def log_total_batches(self, progress: list[dict]) -> None:
+    def log_total_batches(self, batches: list[dict]) -> None:
         """Log total batches progress file created/loaded."
 
         Args:
-            progress (dict): a progress object, which is a list of dicts
+            batches (list[dict]): the batches of a progress object
                 from Retriever._create_progress_object()
         """
-        self.total_batches = len(progress)
+        self.total_batches = len(batches)
         self.logger.info(f"Starting run of {self.total_batches} batches.")
 
+    def log_concurrency(
+            self,
+            workers: int,
+            rate: float,
+            burst: int) -> None:
+        """Log concurrent mode settings.
+
+        Args:
+            workers (int): Number of batches that can be in flight at once.
+            rate (float): Max requests per second.
+            burst (int): Max requests in a burst.
+        """
+        self.workers = workers
+        self.rate = rate
+        message = f"Concurrent mode with {workers} workers,"
+        message += f" rate {round(rate, 4)} requests/s, burst {burst}."
+        self.logger.info(message)
+
+    def log_rate_defaulted(
+            self,
+            workers: int,
+            batch_cooldown: int) -> None:
+        """Warn when concurrent mode has no rate, so workers can't speed up.
+
+        Args:
+            workers (int): Number of batches that can be in flight at once.
+            batch_cooldown (int): Seconds between batches the rate defaults
+                to.
+        """
+        message = f"No rate given for {workers} workers, defaulting to one"
+        message += f" request per {max(batch_cooldown, 1)} seconds."
+        message += " Set a rate to download faster than serial mode."
+        self.logger.warning(message)
+
+    def log_max_id_discovered(self, max_id: int) -> None:
+        """Log the max id found by Retriever.discover_max_id.
+
+        Args:
+            max_id (int): Largest id in use.
+        """
+        message = f"Downloading up to max id {max_id}."
+        self.logger.info(message)
+
+    def log_known_empty_ids_skipped(self, n_skipped: int, max_id: int) -> None:
+        """Log how many ids an id index let us skip.
+
+        Args:
+            n_skipped (int): Number of ids known to be empty.
+            max_id (int): Max id being downloaded.
+        """
+        message = f"Skipping {n_skipped} of {max_id} ids known to be empty."
+        self.logger.info(message)
+
+    def log_no_connection(
+            self,
+            idx: int,
+            pause: int) -> None:
+        """Log when a batch request can't connect to the server.
+
+        Args:
+            idx (int): Batch index.
+            pause (int): Seconds all workers will pause for.
+        """
+        message = f"Unable to connect for batch {idx+1},"
+        message += f" pausing all workers {pause} seconds."
+        self.logger.warning(message)
+
     def log_batch_start(self, idx):
         """Log at the start of a batch request attempt."""
-        self.time_current_batch_start = time()
+        with self._lock:
+            self.time_batch_starts[idx] = time()
         message = f"- Attempting batch {idx+1} of {self.total_batches}..."
         self.logger.info(message)
 
@@ -465,33 +1841,36 @@ class RetrieverLogger:
     def log_batch_downloaded(
             self,
             idx: int,
-            r: requests.Response,
+            batch_size: int,
             batch_cooldown: int) -> None:
         """Log upon successful batch data download.
 
         Args:
             idx (int): Batch index.
-            r (requests.Response): Request response for that batch.
+            batch_size (int): Size of the batch data in bytes.
             batch_cooldown (int): Upcoming batch cooldown duration in seconds.
         """
         # Batch number
         batch_n = idx + 1
-        # Time in seconds
-        batch_time = round(time() - self.time_current_batch_start, 1)
-        # Size in bytes
-        batch_size = len(r.content)
+        with self._lock:
+            # Time in seconds
+            batch_time = round(time() - self.time_batch_starts.pop(idx), 1)
+            # Update and calculate cumulative times/sizes
+            self.batch_times.append(batch_time)
+            self.batch_sizes.append(batch_size)
+            time_per_batch = median(self.batch_times) + batch_cooldown
+            cumu_data_size = sum(self.batch_sizes)
         message = f"--- Batch {batch_n} of {self.total_batches} downloaded"
         message += f" {batch_size/(10**3)} KB"
         message += f" in {batch_time} seconds."
         self.logger.info(message)
-        # Update and calculate cumulative times/sizes
-        self.batch_times.append(batch_time)
+        # Concurrent batches overlap, but can't beat the rate limit
+        time_per_batch /= self.workers
+        if self.rate is not None:
+            time_per_batch = max(time_per_batch, 1 / self.rate)
         remaining_batches = self.total_batches - (batch_n)
         time_elapsed = time() - self.time_start
-        time_remaining = (median(self.batch_times) + batch_cooldown) \
-            * remaining_batches
-        self.batch_sizes.append(batch_size)
-        cumu_data_size = sum(self.batch_sizes)
+        time_remaining = time_per_batch * remaining_batches
         message = f"--- Elapsed: {self._seconds_to_time(time_elapsed)}"
         message += f" | Remaining: {self._seconds_to_time(time_remaining)}"
         self.logger.info(message)
@@ -499,6 +1878,33 @@ class RetrieverLogger:
         message += f"{round(cumu_data_size/(10**6), 1)} MB."
         self.logger.info(message)
 
+    def log_batch_repoll_scheduled(
+            self,
+            idx: int,
+            delay: float,
+            poll_n: int) -> None:
+        """Log when a queued batch is scheduled to be requested again.
+
+        Args:
+            idx (int): Batch index.
+            delay (float): Seconds until it is requested again.
+            poll_n (int): How many times it has been requeued this run.
+        """
+        message = f"Batch {idx+1} will be requested again in"
+        message += f" {int(delay)} seconds (re-poll {poll_n})."
+        self.logger.info(message)
+
+    def log_batch_repolls_exhausted(self, idx: int, max_polls: int) -> None:
+        """Log when a queued batch won't be requested again this run.
+
+        Args:
+            idx (int): Batch index.
+            max_polls (int): Max re-polls per batch.
+        """
+        message = f"Batch {idx+1} still queued after {max_polls} re-polls,"
+        message += " leaving it for the next run."
+        self.logger.info(message)
+
     def log_batch_queued(self, idx: int) -> None:
         """Log when a batch is queued on the server.
 
@@ -542,18 +1948,21 @@ class RetrieverLogger:
 
     def log_run_complete_summary(
             self,
-            progress: list,
+            batches: list,
             status_key: str,
-            statuses: list) -> None:
+            statuses: list,
+            connection_stats: dict = None) -> None:
         """Log summary upon completion of a retrieval run.
 
         Args:
-            progress (dict): A progress object from
+            batches (list): The batches of a progress object from
                 Retriever._create_progress_object.
             status_key (str): Field key for progress object.
                 batch statuses i.e. Retriever.PROGRESS_KEY_STATUS
             statuses (list): List of statuses to be tallied.
                 i.e. Retriever.PROGRESS* constants.
+            connection_stats (dict, optional): Connection reuse counts from
+                Retriever.connection_stats. Defaults to None.
         """
         # Total time elapsed
         self.time_end = time()
@@ -567,7 +1976,7 @@ class RetrieverLogger:
         tallies = {}
         for status in statuses:
             tallies[status] = 0
-        for batch in progress:
+        for batch in batches:
             if batch[status_key] in statuses:
                 tallies[batch[status_key]] += 1
         for key in tallies.keys():
@@ -586,6 +1995,11 @@ class RetrieverLogger:
         message = "Total data transferred: "
         message += f"{round(sum(self.batch_sizes)/(10**6), 2)} MB"
         self.logger.info(message)
+        if connection_stats is not None:
+            message = f"Connections opened: {connection_stats['connections']}"
+            message += f" for {connection_stats['requests']} requests"
+            message += f" ({connection_stats['reused']} reused)."
+            self.logger.info(message)
         self.logger.info("***ENDING RETRIEVER RUN***")
 
     def _seconds_to_time(self, seconds: Union[int, float]) -> str:
@@ -0,0 +1,73 @@
+import gzip
+from pathlib import Path
+from typing import IO, Literal
+
+# zstandard is optional, only needed for zstd compressed files.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+# File suffix appended for each compression
+COMPRESSION_SUFFIXES = {None: '', GZIP: '.gz', ZSTD: '.zst'}
+# Globs matching xml files, compressed or not
+XML_GLOBS = [f'*.xml{suffix}' for suffix in COMPRESSION_SUFFIXES.values()]
+
+
+def compression_from_path(path: str) -> Literal['gzip', 'zstd'] | None:
+    """Return the compression of a file, going by its suffix.
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        str | None: 'gzip', 'zstd', or None if uncompressed.
+    """
+    suffix = Path(path).suffix
+    for compression, compression_suffix in COMPRESSION_SUFFIXES.items():
+        if compression is not None and suffix == compression_suffix:
+            return compression
+    return None
+
+
+def open_compressed(
+        path: str,
+        mode: Literal['rb', 'wb'] = 'rb',
+        compression: str = 'infer') -> IO[bytes]:
+    """Open a file in binary mode, (de)compressing going by its suffix.
+
+    Args:
+        path (str): File path, e.g. '0.xml', '0.xml.gz' or '0.xml.zst'.
+        mode (str of 'rb'|'wb', optional): Read or write. Defaults to 'rb'.
+        compression (str of 'infer'|'gzip'|'zstd'|None, optional):
+            Compression of the file. Defaults to 'infer', i.e. going by the
+            path suffix.
+
+    Raises:
+        ValueError: If mode or compression is not accepted.
+        ImportError: If the file is zstd compressed but zstandard isn't
+            installed.
+
+    Returns:
+        IO[bytes]: File object reading or writing uncompressed bytes.
+    """
+    mode_vals = ['rb', 'wb']
+    if mode not in mode_vals:
+        raise ValueError(f"mode param not in {mode_vals}.")
+    if compression == 'infer':
+        compression = compression_from_path(path)
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f"compression param not in {list(COMPRESSION_SUFFIXES)}.")
+    match compression:
+        case 'gzip':
+            return gzip.open(path, mode)
+        case 'zstd':
+            if zstandard is None:
+                raise ImportError(
+                    "zstandard is required for zstd compressed files.")
+            return zstandard.open(path, mode)
+        case _:
+            return open(path, mode)
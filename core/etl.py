@@ -1,22 +1,125 @@
+import hashlib
+import io
+import json
 import lxml.etree as etree
+import os
+import queue
+import threading
+import numpy as np
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from collections import deque
+from contextlib import nullcontext
 from html import unescape
-from typing import Literal
+from typing import IO, Callable, Iterator, Literal
+from core.compression import XML_GLOBS, open_compressed
 
 KEY_GENERAL_DATA = 'general_data'
 KEY_LINK_DATA = 'link_data'
 KEY_POLL_DATA = 'poll_data'
+KEY_LINK_ENTITIES = 'link_entities'
+KEY_DESCRIPTION_DATA = 'description_data'
+DESCRIPTIONS_VALUES = ['unescape', 'raw', 'skip']
+# Fixed schema of numeric columns for each type of data, as extracted by
+# ItemExtractor with default keys. All other columns are kept as objects.
+INT_COLUMNS = {
+    KEY_GENERAL_DATA: (
+        'id', 'year_published', 'players_min', 'players_max', 'playtime',
+        'playtime_min', 'playtime_max', 'age_min', 'ratings_n',
+        'ratings_owned', 'ratings_trading', 'ratings_wanting',
+        'ratings_wishing', 'ratings_comments_n', 'ratings_weights_n'),
+    KEY_LINK_DATA: ('boardgame_id', 'link_id'),
+    KEY_POLL_DATA: (
+        'boardgame_id', 'poll_totalvotes', 'results_numplayers',
+        'result_numvotes', 'result_level'),
+    KEY_DESCRIPTION_DATA: ('boardgame_id',)}
+FLOAT_COLUMNS = {
+    KEY_GENERAL_DATA: (
+        'ratings_mean', 'ratings_bayes_average', 'ratings_stddev',
+        'ratings_median', 'ratings_weights_average')}
+# Decimal places float columns are rounded to, as with
+# ItemExtractor.RATINGS_VALUE_CONVERTERS, when extracted as strings.
+ROUND_COLUMNS = {
+    KEY_GENERAL_DATA: {
+        'ratings_mean': 3, 'ratings_bayes_average': 3, 'ratings_stddev': 4,
+        'ratings_median': 1, 'ratings_weights_average': 3}}
+# Bool columns, which can have missing values.
+BOOL_COLUMNS = {
+    KEY_POLL_DATA: ('results_numplayers_plus',)}
+# Id columns, narrowed to int32 as BGG ids are far below 2**31.
+ID_COLUMNS = {
+    KEY_GENERAL_DATA: ('id',),
+    KEY_LINK_DATA: ('boardgame_id', 'link_id'),
+    KEY_POLL_DATA: ('boardgame_id',),
+    KEY_DESCRIPTION_DATA: ('boardgame_id',)}
+# String columns with values repeated over many rows, kept as pandas
+# categories / arrow dictionaries rather than a string per row.
+CATEGORY_COLUMNS = {
+    KEY_LINK_DATA: ('type', 'value'),
+    KEY_POLL_DATA: ('poll_name', 'poll_title', 'result_value')}
+# All columns for each type of data, in order, for fixed schemas when
+# writing files in parts (see write_xml_folder_to_parquet).
+COLUMNS = {
+    KEY_GENERAL_DATA: (
+        'id', 'type', 'name', 'description', 'year_published',
+        'players_min', 'players_max', 'playtime', 'playtime_min',
+        'playtime_max', 'age_min', 'ratings_n', 'ratings_mean',
+        'ratings_bayes_average', 'ratings_stddev', 'ratings_median',
+        'ratings_owned', 'ratings_trading', 'ratings_wanting',
+        'ratings_wishing', 'ratings_comments_n', 'ratings_weights_n',
+        'ratings_weights_average'),
+    KEY_LINK_DATA: ('boardgame_id', 'type', 'value', 'link_id'),
+    KEY_POLL_DATA: (
+        'boardgame_id', 'poll_name', 'poll_title', 'poll_totalvotes',
+        'results_numplayers', 'results_numplayers_plus', 'result_value',
+        'result_numvotes', 'result_level'),
+    KEY_DESCRIPTION_DATA: ('boardgame_id', 'description')}
+# Hive partitioned datasets (see write_dataframes_to_parquet_dataset): the
+# column each type of data is partitioned by, and the column rows are
+# sorted by, so row group statistics of ids are narrow.
+YEAR_BUCKET_COLUMN = 'year_published_bucket'
+PARTITION_COLUMNS = {
+    KEY_GENERAL_DATA: YEAR_BUCKET_COLUMN,
+    KEY_LINK_DATA: 'type',
+    KEY_POLL_DATA: 'poll_name',
+    KEY_LINK_ENTITIES: 'type'}
+SORT_COLUMNS = {
+    KEY_GENERAL_DATA: 'id',
+    KEY_LINK_DATA: 'boardgame_id',
+    KEY_POLL_DATA: 'boardgame_id',
+    KEY_DESCRIPTION_DATA: 'boardgame_id',
+    KEY_LINK_ENTITIES: 'link_id'}
 
 
 def flatten_xml_folder_to_dataframe(
         dir_path: str,
         get_general_data: bool = True,
         get_link_data: bool = True,
-        get_poll_data: bool = True
-        ) -> dict[pd.DataFrame]:
+        get_poll_data: bool = True,
+        workers: int = 1,
+        as_dataset: bool = False,
+        descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape',
+        split_descriptions: bool = False,
+        columns: list[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None
+        ) -> dict[pd.DataFrame] | dict[ds.Dataset]:
     """Given a folder of xml files, return its data in pandas dataframes.
 
+    Compressed xml files ('.xml.gz', '.xml.zst') are read as well.
+    Files are extracted in order of their batch index (e.g. '0.xml' before
+    '10.xml'), so the output is the same whatever the number of workers.
+    The data of all files is accumulated into one set of column buffers per
+    type of data (see ColumnAccumulator), and each table is built once at
+    the end.
+
     Args:
         dir_path (str): Location of the folder of xml files.
         get_general_data (bool, optional): Return general data.
@@ -26,49 +129,89 @@ def flatten_xml_folder_to_dataframe(
             Defaults to True.
         get_poll_data (bool, optional): Return poll data for each boardgame.
             Defaults to True.
+        workers (int, optional): Number of processes extracting files in
+            parallel. Defaults to 1, i.e. extract in this process.
+        as_dataset (bool, optional): Return pyarrow datasets instead of
+            dataframes. These are only read into pandas when asked, e.g.
+            with .to_table(columns=[...]).to_pandas(), so columns and rows
+            can be selected first. Defaults to False.
+        descriptions (str of 'unescape'|'raw'|'skip', optional): Extract
+            game descriptions html unescaped, raw (i.e. still escaped once,
+            see unescape_descriptions), or not at all.
+            Defaults to 'unescape'.
+        split_descriptions (bool, optional): Put descriptions in their own
+            table, keyed by KEY_DESCRIPTION_DATA, rather than in general
+            data. Defaults to False.
+        columns (list[str], optional): General data columns to extract,
+            e.g. ['id', 'year_published', 'ratings_mean'], in the order of
+            COLUMNS[KEY_GENERAL_DATA]. Other fields aren't looked up at
+            all. Defaults to None, i.e. all columns.
+        link_types (list[str], optional): Only extract links of these
+            types, e.g. ['boardgamemechanic']. Defaults to None, i.e. all
+            links.
+        poll_names (list[str], optional): Only extract polls with these
+            names, e.g. ['suggested_numplayers']. Defaults to None, i.e. all
+            polls.
 
     Raises:
         NotADirectoryError: if the directory doesn't exist or isn't a
             directory.
+        ValueError: if workers is less than 1, descriptions is not
+            accepted, or columns has unknown columns.
 
     Returns:
-        dict[pd.DataFrame]: Contains the requested dataframes.
+        dict[pd.DataFrame] | dict[ds.Dataset]: Contains the requested
+            dataframes, or datasets if as_dataset.
     """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    _check_descriptions(descriptions)
+    _check_columns(columns)
     # Get all the xml files in the dir.
     p = Path(dir_path)
     if not p.is_dir():
         raise NotADirectoryError(f"{dir_path} is not a directory.")
-    xml_paths = list(p.glob('*.xml'))
-    # Convert each xml file to a DataFrame, then concatenate together
-    out = {}
-    if get_general_data:
-        out[KEY_GENERAL_DATA] = []
-    if get_link_data:
-        out[KEY_LINK_DATA] = []
-    if get_poll_data:
-        out[KEY_POLL_DATA] = []
+    xml_paths = [xml_path for glob in XML_GLOBS for xml_path in p.glob(glob)]
+    xml_paths.sort(key=_file_index)
+    # Extract each xml file into the same column buffers
+    keys = _requested_keys(get_general_data, get_link_data, get_poll_data,
+                           descriptions, split_descriptions, columns)
+    general_columns = _general_columns(columns, descriptions, keys)
+    accumulators = _make_accumulators(keys)
 
     total_len = len(xml_paths)
-    for i, xml_path in enumerate(xml_paths):
-        print(f"Extracting file {i+1} of {total_len}")
-        dfs_dict = flatten_xml_file_to_dataframes(
-                       xml_path,
-                       get_general_data=get_general_data,
-                       get_link_data=get_link_data,
-                       get_poll_data=get_poll_data)
-        out[KEY_GENERAL_DATA].append(dfs_dict[KEY_GENERAL_DATA])
-        out[KEY_LINK_DATA].append(dfs_dict[KEY_LINK_DATA])
-        out[KEY_POLL_DATA].append(dfs_dict[KEY_POLL_DATA])
-    if get_general_data:
-        print("Concatenating general data...")
-        out[KEY_GENERAL_DATA] = pd.concat(out[KEY_GENERAL_DATA],
-                                          ignore_index=True)
-    if get_link_data:
-        print("Concatenating link data...")
-        out[KEY_LINK_DATA] = pd.concat(out[KEY_LINK_DATA], ignore_index=True)
-    if get_poll_data:
-        print("Concatenating poll data...")
-        out[KEY_POLL_DATA] = pd.concat(out[KEY_POLL_DATA], ignore_index=True)
+    if workers == 1:
+        for i, xml_path in enumerate(xml_paths):
+            print(f"Extracting file {i+1} of {total_len}")
+            _extract_file_into(xml_path, accumulators, descriptions,
+                               general_columns, link_types=link_types,
+                               poll_names=poll_names)
+    else:
+        extract = partial(_extract_file_buffers, keys=keys,
+                          descriptions=descriptions,
+                          general_columns=general_columns,
+                          link_types=link_types, poll_names=poll_names)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Results come back in file order
+            results = executor.map(
+                extract, xml_paths,
+                chunksize=max(total_len // (workers * 4), 1))
+            try:
+                for i, buffers in enumerate(results):
+                    print(f"Extracting file {i+1} of {total_len}")
+                    for key in keys:
+                        accumulators[key].extend_buffers(*buffers[key])
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    out = {}
+    for key in keys:
+        print(f"Building {key.replace('_', ' ')}...")
+        if as_dataset:
+            out[key] = ds.dataset(accumulators.pop(key).to_arrow())
+        else:
+            out[key] = accumulators.pop(key).to_dataframe()
 
     return out
 
@@ -77,7 +220,12 @@ def flatten_xml_file_to_dataframes(
         file_path: str,
         get_general_data: bool = True,
         get_link_data: bool = True,
-        get_poll_data: bool = True
+        get_poll_data: bool = True,
+        descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape',
+        split_descriptions: bool = False,
+        columns: list[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None
         ) -> dict[pd.DataFrame]:
     """Given a single xml file, return its data in pandas DataFrames.
 
@@ -90,38 +238,40 @@ def flatten_xml_file_to_dataframes(
             Defaults to True.
         get_poll_data (bool, optional): Return poll data for each boardgame.
             Defaults to True.
+        descriptions (str of 'unescape'|'raw'|'skip', optional): Extract
+            game descriptions html unescaped, raw (i.e. still escaped once,
+            see unescape_descriptions), or not at all.
+            Defaults to 'unescape'.
+        split_descriptions (bool, optional): Put descriptions in their own
+            table, keyed by KEY_DESCRIPTION_DATA, rather than in general
+            data. Defaults to False.
+        columns (list[str], optional): General data columns to extract,
+            e.g. ['id', 'year_published', 'ratings_mean'], in the order of
+            COLUMNS[KEY_GENERAL_DATA]. Other fields aren't looked up at
+            all. Defaults to None, i.e. all columns.
+        link_types (list[str], optional): Only extract links of these
+            types, e.g. ['boardgamemechanic']. Defaults to None, i.e. all
+            links.
+        poll_names (list[str], optional): Only extract polls with these
+            names, e.g. ['suggested_numplayers']. Defaults to None, i.e. all
+            polls.
+
+    Raises:
+        ValueError: if descriptions is not accepted, or columns has unknown
+            columns.
 
     Returns:
         dict[pd.DataFrame]: Contains the requested dataframes.
     """
-    # Initialize
-    out = {}
-    if get_general_data:
-        out[KEY_GENERAL_DATA] = []
-    if get_link_data:
-        out[KEY_LINK_DATA] = []
-    if get_poll_data:
-        out[KEY_POLL_DATA] = []
-
-    # Extract data.
-    # Link and poll data are lists of dicts themselves,
-    # hence extend not append.
-    root = _read_xml_file(file_path)
-    for item in root:
-        extractor = ItemExtractor(item)
-        if get_general_data:
-            out[KEY_GENERAL_DATA].append(extractor.extract_general_data())
-        if get_link_data:
-            out[KEY_LINK_DATA].extend(extractor.extract_link_data())
-        if get_poll_data:
-            out[KEY_POLL_DATA].extend(extractor.extract_poll_data())
-
-    # Convert to pandas DataFrames
-    out[KEY_GENERAL_DATA] = pd.DataFrame(out[KEY_GENERAL_DATA])
-    out[KEY_LINK_DATA] = pd.DataFrame(out[KEY_LINK_DATA])
-    out[KEY_POLL_DATA] = pd.DataFrame(out[KEY_POLL_DATA])
-
-    return out
+    _check_descriptions(descriptions)
+    _check_columns(columns)
+    keys = _requested_keys(get_general_data, get_link_data, get_poll_data,
+                           descriptions, split_descriptions, columns)
+    general_columns = _general_columns(columns, descriptions, keys)
+    accumulators = _make_accumulators(keys)
+    _extract_file_into(file_path, accumulators, descriptions, general_columns,
+                       link_types=link_types, poll_names=poll_names)
+    return {key: accumulators[key].to_dataframe() for key in keys}
 
 
 def write_dataframes_to_csv(
@@ -171,6 +321,449 @@ def write_dataframes_to_parquet(
     )
 
 
+def write_dataframes_to_parquet_dataset(
+        dict_of_dataframes: dict[pd.DataFrame],
+        save_dir_path: str,
+        save_file_prefix: str,
+        row_group_size: int = 100_000,
+        year_bucket_size: int = 10
+        ) -> None:
+    """Write a dict of pandas dataframes to hive partitioned parquet datasets.
+
+    Each dataframe is written to a folder, e.g. '{save_file_prefix}_link_data',
+    partitioned by its column in PARTITION_COLUMNS, e.g.
+    'type=boardgamemechanic/'. General data is partitioned by year
+    published, in buckets of year_bucket_size years, e.g.
+    'year_published_bucket=1990/' for 1990 to 1999. Rows are sorted by their
+    column in SORT_COLUMNS, and written with min/max statistics per row
+    group. Queries filtering on the partition column, e.g.
+    pd.read_parquet(path, filters=[('type', '==', 'boardgamemechanic')]),
+    then only read matching partitions, and filters on ids skip row groups.
+
+    Partitions being written replace any already in the folders.
+
+    Args:
+        dict_of_dataframes (dict[pd.DataFrame]): Dict of dataframes, as
+            returned from e.g. `flatten_xml_folder_to_dataframe".
+        save_dir_path (str): Folder where dataset folders will be written.
+        save_file_prefix (str): Prefix for the dataset folders.
+        row_group_size (int, optional): Rows per row group, bar the last
+            of each partition. Defaults to 100_000.
+        year_bucket_size (int, optional): Years per partition of general
+            data. Defaults to 10.
+
+    Raises:
+        NotADirectoryError: If the save directory doesn't exist or isn't a
+            directory.
+        ValueError: If row_group_size or year_bucket_size is less than 1.
+    """
+    p = Path(save_dir_path)
+    if not p.is_dir():
+        raise NotADirectoryError(f"{save_dir_path} is not a directory.")
+    if row_group_size < 1:
+        raise ValueError("row_group_size must be at least 1.")
+    if year_bucket_size < 1:
+        raise ValueError("year_bucket_size must be at least 1.")
+    file_options = ds.ParquetFileFormat().make_write_options(
+        write_statistics=True)
+
+    for key, df in dict_of_dataframes.items():
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sort_column = SORT_COLUMNS.get(key)
+        if sort_column in table.column_names:
+            table = table.sort_by(sort_column)
+        if key == KEY_GENERAL_DATA and 'year_published' in table.column_names:
+            table = table.append_column(
+                YEAR_BUCKET_COLUMN,
+                _year_buckets(table['year_published'], year_bucket_size))
+        partition_column = PARTITION_COLUMNS.get(key)
+        partitioning = None
+        if partition_column in table.column_names:
+            # Partition values are plain strings in the folder names
+            field = table.schema.field(partition_column)
+            if pa.types.is_dictionary(field.type):
+                table = table.set_column(
+                    table.schema.get_field_index(partition_column),
+                    partition_column,
+                    table[partition_column].cast(field.type.value_type))
+            partitioning = ds.partitioning(
+                pa.schema([table.schema.field(partition_column)]),
+                flavor='hive')
+        ds.write_dataset(
+            table,
+            p / f"{save_file_prefix}_{key}",
+            format='parquet',
+            partitioning=partitioning,
+            file_options=file_options,
+            basename_template='part-{i}.parquet',
+            min_rows_per_group=row_group_size,
+            max_rows_per_group=row_group_size,
+            existing_data_behavior='delete_matching',
+            preserve_order=True)
+
+
+def write_xml_folder_to_parquet(
+        dir_path: str,
+        save_dir_path: str,
+        save_file_prefix: str,
+        get_general_data: bool = True,
+        get_link_data: bool = True,
+        get_poll_data: bool = True,
+        workers: int = 1,
+        descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape',
+        split_descriptions: bool = False,
+        columns: list[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None
+        ) -> None:
+    """Extract a folder of xml files straight to parquet files.
+
+    Unlike flatten_xml_folder_to_dataframe followed by
+    write_dataframes_to_parquet, the whole dataset is never held in memory.
+    A parquet writer is kept open per type of data, and each xml file's
+    rows are written as a row group as soon as the file is extracted, so
+    memory stays constant however many files there are. Files are written
+    in order of batch index, and have the same names as with
+    write_dataframes_to_parquet.
+
+    Row groups share a fixed schema per type of data (see arrow_schema).
+    Unlike DataFrames, int columns with missing values stay ints, with
+    nulls for the missing values.
+
+    Args:
+        dir_path (str): Location of the folder of xml files.
+        save_dir_path (str): Folder where files will be written.
+        save_file_prefix (str): Prefix for the file paths.
+        get_general_data (bool, optional): Write general data.
+            Defaults to True.
+        get_link_data (bool, optional): Write data relating boardgames to
+            other types of items.
+            Defaults to True.
+        get_poll_data (bool, optional): Write poll data for each boardgame.
+            Defaults to True.
+        workers (int, optional): Number of processes extracting files in
+            parallel. Defaults to 1, i.e. extract in this process.
+        descriptions (str of 'unescape'|'raw'|'skip', optional): Extract
+            game descriptions html unescaped, raw (i.e. still escaped once,
+            see unescape_descriptions), or not at all.
+            Defaults to 'unescape'.
+        split_descriptions (bool, optional): Put descriptions in their own
+            table, keyed by KEY_DESCRIPTION_DATA, rather than in general
+            data. Defaults to False.
+        columns (list[str], optional): General data columns to extract,
+            e.g. ['id', 'year_published', 'ratings_mean'], in the order of
+            COLUMNS[KEY_GENERAL_DATA]. Other fields aren't looked up at
+            all. Defaults to None, i.e. all columns.
+        link_types (list[str], optional): Only extract links of these
+            types, e.g. ['boardgamemechanic']. Defaults to None, i.e. all
+            links.
+        poll_names (list[str], optional): Only extract polls with these
+            names, e.g. ['suggested_numplayers']. Defaults to None, i.e. all
+            polls.
+
+    Raises:
+        NotADirectoryError: If the xml or save directory doesn't exist or
+            isn't a directory.
+        ValueError: if workers is less than 1, if descriptions is not
+            accepted, if columns has unknown columns, or if the data has
+            columns not in the schema.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    _check_descriptions(descriptions)
+    _check_columns(columns)
+    p = Path(dir_path)
+    if not p.is_dir():
+        raise NotADirectoryError(f"{dir_path} is not a directory.")
+    save_p = Path(save_dir_path)
+    if not save_p.is_dir():
+        raise NotADirectoryError(f"{save_dir_path} is not a directory.")
+    xml_paths = [xml_path for glob in XML_GLOBS for xml_path in p.glob(glob)]
+    xml_paths.sort(key=_file_index)
+    keys = _requested_keys(get_general_data, get_link_data, get_poll_data,
+                           descriptions, split_descriptions, columns)
+    general_columns = _general_columns(columns, descriptions, keys)
+    schemas = _schemas(keys, general_columns)
+
+    writers = {}
+    total_len = len(xml_paths)
+    extract = partial(_extract_file_buffers, keys=keys,
+                      descriptions=descriptions,
+                      general_columns=general_columns,
+                      link_types=link_types, poll_names=poll_names)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 \
+        else None
+    try:
+        for key in keys:
+            writers[key] = pq.ParquetWriter(
+                save_p / f"{save_file_prefix}_{key}.parquet", schemas[key])
+        for i, buffers in enumerate(
+                _map_in_order(executor, extract, xml_paths, workers * 2)):
+            print(f"Extracting file {i+1} of {total_len}")
+            for key, table in _buffers_to_tables(buffers, schemas).items():
+                if table.num_rows:
+                    writers[key].write_table(table)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        for writer in writers.values():
+            writer.close()
+
+
+def update_xml_folder_parquet_dataset(
+        dir_path: str,
+        save_dir_path: str,
+        save_file_prefix: str,
+        get_general_data: bool = True,
+        get_link_data: bool = True,
+        get_poll_data: bool = True,
+        workers: int = 1,
+        descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape',
+        split_descriptions: bool = False,
+        columns: list[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None
+        ) -> None:
+    """Extract new or changed xml files into partitioned parquet datasets.
+
+    Each type of data is written to its own folder, e.g.
+    '{save_file_prefix}_general_data', holding a parquet partition per xml
+    file, e.g. '12.xml.gz.parquet'. A manifest
+    ('{save_file_prefix}_manifest.json', see EtlManifest) records what was
+    extracted from each xml file. On reruns, e.g. after more batches are
+    downloaded, only new or changed xml files are extracted, replacing
+    their partitions, and partitions of xml files no longer in dir_path are
+    removed. Each folder reads as one table with pd.read_parquet or
+    pyarrow.dataset, though not necessarily in order of batch index.
+
+    Args:
+        dir_path (str): Location of the folder of xml files.
+        save_dir_path (str): Folder where datasets and manifest are written.
+        save_file_prefix (str): Prefix for the dataset folders and manifest.
+        get_general_data (bool, optional): Write general data.
+            Defaults to True.
+        get_link_data (bool, optional): Write data relating boardgames to
+            other types of items.
+            Defaults to True.
+        get_poll_data (bool, optional): Write poll data for each boardgame.
+            Defaults to True.
+        workers (int, optional): Number of processes extracting files in
+            parallel. Defaults to 1, i.e. extract in this process.
+        descriptions (str of 'unescape'|'raw'|'skip', optional): Extract
+            game descriptions html unescaped, raw (i.e. still escaped once,
+            see unescape_descriptions), or not at all.
+            Defaults to 'unescape'.
+        split_descriptions (bool, optional): Put descriptions in their own
+            table, keyed by KEY_DESCRIPTION_DATA, rather than in general
+            data. Defaults to False.
+        columns (list[str], optional): General data columns to extract,
+            e.g. ['id', 'year_published', 'ratings_mean'], in the order of
+            COLUMNS[KEY_GENERAL_DATA]. Other fields aren't looked up at
+            all. Defaults to None, i.e. all columns.
+        link_types (list[str], optional): Only extract links of these
+            types, e.g. ['boardgamemechanic']. Defaults to None, i.e. all
+            links.
+        poll_names (list[str], optional): Only extract polls with these
+            names, e.g. ['suggested_numplayers']. Defaults to None, i.e. all
+            polls.
+
+    Raises:
+        NotADirectoryError: If the xml or save directory doesn't exist or
+            isn't a directory.
+        ValueError: if workers is less than 1, if descriptions is not
+            accepted, if columns has unknown columns, or if the data has
+            columns not in the schema.
+    """
+    if workers < 1:
+        raise ValueError("workers must be at least 1.")
+    _check_descriptions(descriptions)
+    _check_columns(columns)
+    p = Path(dir_path)
+    if not p.is_dir():
+        raise NotADirectoryError(f"{dir_path} is not a directory.")
+    save_p = Path(save_dir_path)
+    if not save_p.is_dir():
+        raise NotADirectoryError(f"{save_dir_path} is not a directory.")
+    xml_paths = [xml_path for glob in XML_GLOBS for xml_path in p.glob(glob)]
+    xml_paths.sort(key=_file_index)
+    keys = _requested_keys(get_general_data, get_link_data, get_poll_data,
+                           descriptions, split_descriptions, columns)
+    general_columns = _general_columns(columns, descriptions, keys)
+    schemas = _schemas(keys, general_columns)
+    dataset_paths = {key: save_p / f"{save_file_prefix}_{key}"
+                     for key in EtlManifest.KEYS}
+    for key in keys:
+        dataset_paths[key].mkdir(exist_ok=True)
+    manifest_path = save_p / f"{save_file_prefix}_manifest.json"
+    manifest = EtlManifest.load(manifest_path)
+    # Files extracted with other options are all extracted again. Their
+    # partitions are dropped up front, and the manifest saved, so a run
+    # failing partway never leaves partitions of the old options around.
+    options = {'descriptions': descriptions,
+               'split_descriptions': split_descriptions,
+               'columns': None if columns is None else list(general_columns),
+               'link_types': None if link_types is None
+               else sorted(link_types),
+               'poll_names': None if poll_names is None
+               else sorted(poll_names)}
+    if manifest.options != options:
+        manifest.options = options
+        for entry in manifest.entries.values():
+            entry['rows'] = {}
+            for dataset_path in dataset_paths.values():
+                (dataset_path / entry['partition']).unlink(missing_ok=True)
+        manifest.save(manifest_path)
+
+    # Drop partitions of xml files that have gone
+    xml_names = {xml_path.name for xml_path in xml_paths}
+    for name in [name for name in manifest.entries if name not in xml_names]:
+        partition = manifest.entries.pop(name)['partition']
+        for dataset_path in dataset_paths.values():
+            (dataset_path / partition).unlink(missing_ok=True)
+
+    changed_paths = [xml_path for xml_path in xml_paths
+                     if not manifest.is_unchanged(xml_path, keys)]
+    print(f"Skipping {len(xml_paths) - len(changed_paths)} unchanged files")
+    total_len = len(changed_paths)
+    extract = partial(_extract_file_buffers, keys=keys,
+                      descriptions=descriptions,
+                      general_columns=general_columns,
+                      link_types=link_types, poll_names=poll_names)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 \
+        else None
+    try:
+        # Stat and hash are taken before extraction, so a file written to
+        # meanwhile is seen as changed on the next run.
+        stats = [(xml_path.stat(), _file_sha256(xml_path))
+                 for xml_path in changed_paths]
+        for i, (xml_path, (stat, sha256), buffers) in enumerate(zip(
+                changed_paths, stats,
+                _map_in_order(executor, extract, changed_paths,
+                              workers * 2))):
+            print(f"Extracting file {i+1} of {total_len}")
+            partition = f"{xml_path.name}.parquet"
+            tables = _buffers_to_tables(buffers, schemas)
+            for key, table in tables.items():
+                out_path = dataset_paths[key] / partition
+                tmp_path = out_path.with_name(out_path.name + '.tmp')
+                pq.write_table(table, tmp_path)
+                os.replace(tmp_path, out_path)
+            manifest.record(
+                xml_path, stat, sha256, partition,
+                {key: table.num_rows for key, table in tables.items()})
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        manifest.save(manifest_path)
+
+
+def arrow_schema(key: str) -> pa.Schema:
+    """Return the fixed arrow schema for a type of data.
+
+    Args:
+        key (str): KEY_GENERAL_DATA, KEY_LINK_DATA, or KEY_POLL_DATA.
+
+    Returns:
+        pa.Schema: Int32 for ID_COLUMNS, int64 for other INT_COLUMNS,
+            float64 for FLOAT_COLUMNS, bool for BOOL_COLUMNS, string
+            dictionaries for CATEGORY_COLUMNS, and strings for the other
+            COLUMNS.
+    """
+    fields = []
+    for column in COLUMNS[key]:
+        if column in ID_COLUMNS.get(key, ()):
+            fields.append((column, pa.int32()))
+        elif column in CATEGORY_COLUMNS.get(key, ()):
+            fields.append((column, pa.dictionary(pa.int32(), pa.string())))
+        elif column in INT_COLUMNS.get(key, ()):
+            fields.append((column, pa.int64()))
+        elif column in FLOAT_COLUMNS.get(key, ()):
+            fields.append((column, pa.float64()))
+        elif column in BOOL_COLUMNS.get(key, ()):
+            fields.append((column, pa.bool_()))
+        else:
+            fields.append((column, pa.string()))
+    return pa.schema(fields)
+
+
+def split_link_entities(link_data: pd.DataFrame) -> dict[pd.DataFrame]:
+    """Normalize link data into links and a lookup table of linked entities.
+
+    Linked entities (categories, mechanics, designers, publishers, etc.) are
+    identified by type and link_id. Rather than repeating an entity's value
+    (i.e. its name) on every link to it, links keep boardgame_id, type and
+    link_id, and values go in a lookup table with a row per entity.
+
+    Args:
+        link_data (pd.DataFrame): Link data, e.g. from
+            flatten_xml_folder_to_dataframe.
+
+    Returns:
+        dict[pd.DataFrame]: Links keyed by KEY_LINK_DATA, and the lookup
+            table of type, link_id and value, in order of type and link_id,
+            keyed by KEY_LINK_ENTITIES. Can be written with
+            write_dataframes_to_parquet or write_dataframes_to_csv.
+    """
+    entities = link_data[['type', 'link_id', 'value']]\
+        .drop_duplicates(['type', 'link_id'])\
+        .sort_values(['type', 'link_id'], ignore_index=True)
+    return {KEY_LINK_DATA: link_data.drop(columns='value'),
+            KEY_LINK_ENTITIES: entities}
+
+
+def type_poll_data(poll_data: pd.DataFrame) -> pd.DataFrame:
+    """Convert poll data with all values as strings to typed columns.
+
+    Poll data used to be extracted with every value but the boardgame id as
+    a string, e.g. 'data/parquet/2022-09-19_poll_data.parquet'. Its columns
+    are converted, vectorized, to the types ItemExtractor.extract_poll_data
+    now gives, as in flatten_xml_folder_to_dataframe.
+
+    Args:
+        poll_data (pd.DataFrame): Poll data with string columns.
+
+    Returns:
+        pd.DataFrame: Poll data with typed columns.
+    """
+    out = {}
+    for column, values in poll_data.items():
+        if column == ItemExtractor.POLL_NUMPLAYERS_KEY:
+            out[column] = _str_to_int(values.str.rstrip('+'))
+            plus = values.str.endswith('+').astype('boolean')
+            plus[values.isna()] = pd.NA
+            out[ItemExtractor.POLL_NUMPLAYERS_PLUS_KEY] = plus
+        elif column in ID_COLUMNS[KEY_POLL_DATA] and \
+                values.dtype == np.int64:
+            out[column] = _to_int32(values.to_numpy())
+        elif column in INT_COLUMNS[KEY_POLL_DATA]:
+            out[column] = _str_to_int(values)
+        elif column in CATEGORY_COLUMNS[KEY_POLL_DATA]:
+            out[column] = values.astype('category')
+        else:
+            out[column] = values
+    return pd.DataFrame(out)
+
+
+def unescape_descriptions(descriptions: pd.Series) -> pd.Series:
+    """Html unescape descriptions extracted with descriptions='raw'.
+
+    Descriptions from BGG are escaped twice, e.g. '&amp;quot;' for '"'.
+    The xml parser unescapes them once, and this unescapes them again, as
+    descriptions='unescape' does when extracting. Only descriptions
+    containing '&' are unescaped, the others are unchanged.
+
+    Args:
+        descriptions (pd.Series): Raw descriptions.
+
+    Returns:
+        pd.Series: Unescaped descriptions.
+    """
+    escaped = descriptions.str.contains('&', regex=False, na=False)
+    out = descriptions.copy()
+    out[escaped] = descriptions[escaped].map(unescape)
+    return out
+
+
 def _write_dataframes(
         dict_of_dataframes: dict[pd.DataFrame],
         save_dir_path: str,
@@ -228,9 +821,273 @@ def _write_dataframes(
                 df.to_csv(fp, index=False)
 
 
+def _year_buckets(years: pa.ChunkedArray, bucket_size: int) -> pa.Array:
+    """Return the first year of each year's bucket, e.g. 1990 for 1994."""
+    buckets = pc.multiply(
+        pc.floor(pc.divide(pc.cast(years, pa.float64()), bucket_size)),
+        bucket_size)
+    return pc.cast(buckets, pa.int32())
+
+
+def _requested_keys(
+        get_general_data: bool,
+        get_link_data: bool,
+        get_poll_data: bool,
+        descriptions: str = 'unescape',
+        split_descriptions: bool = False,
+        columns: list[str] = None) -> list[str]:
+    """Return the output keys for the requested types of data."""
+    keys = []
+    if get_general_data:
+        keys.append(KEY_GENERAL_DATA)
+    if get_link_data:
+        keys.append(KEY_LINK_DATA)
+    if get_poll_data:
+        keys.append(KEY_POLL_DATA)
+    if split_descriptions and descriptions != 'skip' and (
+            columns is None or 'description' in columns):
+        keys.append(KEY_DESCRIPTION_DATA)
+    return keys
+
+
+def _check_descriptions(descriptions: str) -> None:
+    """Raise ValueError if descriptions is not accepted."""
+    if descriptions not in DESCRIPTIONS_VALUES:
+        raise ValueError(f"descriptions param not in {DESCRIPTIONS_VALUES}.")
+
+
+def _check_columns(columns: list[str] | None) -> None:
+    """Raise ValueError if columns has unknown general data columns."""
+    if columns is None:
+        return
+    unknown = [c for c in columns if c not in COLUMNS[KEY_GENERAL_DATA]]
+    if unknown:
+        raise ValueError(
+            f"Unknown columns {unknown}, general data columns are "
+            f"{list(COLUMNS[KEY_GENERAL_DATA])}.")
+
+
+def _general_columns(
+        columns: list[str] | None,
+        descriptions: str,
+        keys: list[str]) -> tuple[str]:
+    """Return the general data columns to extract, in order.
+
+    Descriptions are left out if skipped or in their own table.
+    """
+    omit_description = descriptions == 'skip' or KEY_DESCRIPTION_DATA in keys
+    return tuple(
+        column for column in COLUMNS[KEY_GENERAL_DATA]
+        if (columns is None or column in columns)
+        and not (column == 'description' and omit_description))
+
+
+def _schemas(
+        keys: list[str],
+        general_columns: tuple[str]) -> dict[pa.Schema]:
+    """Return the arrow schema for each type of data in keys.
+
+    General data only has general_columns, see _general_columns.
+    """
+    schemas = {key: arrow_schema(key) for key in keys}
+    if KEY_GENERAL_DATA in schemas:
+        schema = schemas[KEY_GENERAL_DATA]
+        schemas[KEY_GENERAL_DATA] = pa.schema(
+            [schema.field(column) for column in general_columns])
+    return schemas
+
+
+def _file_index(file_path: Path) -> tuple[int, str]:
+    """Sort key putting batch files in order of index, e.g. '2.xml.gz'.
+
+    Files not named by an index go last, in name order.
+    """
+    stem = file_path.name.split('.')[0]
+    if stem.isdigit():
+        return (int(stem), file_path.name)
+    return (float('inf'), file_path.name)
+
+
+def _map_in_order(
+        executor: Executor | None,
+        func: Callable,
+        iterable: list,
+        max_pending: int) -> Iterator:
+    """Map func over iterable, yielding results in order.
+
+    Unlike Executor.map, at most max_pending calls are submitted ahead of
+    the result being yielded, so unconsumed results can't pile up in memory.
+
+    Args:
+        executor (Executor | None): Executor to run func in, or None to run
+            it in this process.
+        func (Callable): Function of one item of iterable.
+        iterable (list): Items to map over.
+        max_pending (int): Max number of calls submitted but not yielded.
+
+    Yields:
+        Results of func, in order of iterable.
+    """
+    if executor is None:
+        yield from map(func, iterable)
+        return
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _buffers_to_tables(
+        buffers: dict[tuple],
+        schemas: dict[pa.Schema]) -> dict[pa.Table]:
+    """Return arrow tables, with fixed schemas, of a file's column buffers.
+
+    Args:
+        buffers (dict[tuple]): Output of _extract_file_buffers.
+        schemas (dict[pa.Schema]): Schema for each type of data.
+
+    Returns:
+        dict[pa.Table]: Table for each type of data in schemas.
+    """
+    tables = {}
+    for key, schema in schemas.items():
+        columns = _make_accumulators([key])[key]
+        columns.extend_buffers(*buffers[key])
+        tables[key] = columns.to_arrow(schema)
+    return tables
+
+
+def _file_sha256(file_path: Path) -> str:
+    """Return the hex sha256 hash of a file's bytes, read in chunks."""
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(partial(f.read, 1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _make_accumulators(keys: list[str]) -> dict['ColumnAccumulator']:
+    """Return empty column buffers for each type of data in keys."""
+    return {key: ColumnAccumulator(INT_COLUMNS.get(key, ()),
+                                   FLOAT_COLUMNS.get(key, ()),
+                                   ID_COLUMNS.get(key, ()),
+                                   CATEGORY_COLUMNS.get(key, ()),
+                                   BOOL_COLUMNS.get(key, ()),
+                                   ROUND_COLUMNS.get(key))
+            for key in keys}
+
+
+def _extract_file_into(
+        file_path: str | IO[bytes],
+        columns: dict['ColumnAccumulator'],
+        descriptions: str = 'unescape',
+        general_columns: tuple[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None,
+        item_ids: list[int] = None) -> None:
+    """Extract a single xml file's data into column buffers.
+
+    The file is streamed one item at a time (see _iter_xml_items), and each
+    item's data goes straight into typed column buffers rather than being
+    kept as dicts. Numeric values are left as strings by ItemExtractor,
+    and converted by the column buffers many at a time.
+
+    Args:
+        file_path (str | IO[bytes]): Location of the input xml file, or a
+            binary file object of xml.
+        columns (dict[ColumnAccumulator]): Column buffers for each requested
+            type of data, keyed by KEY_GENERAL_DATA, KEY_LINK_DATA,
+            KEY_POLL_DATA and/or KEY_DESCRIPTION_DATA.
+        descriptions (str, optional): See ItemExtractor. Defaults to
+            'unescape'.
+        general_columns (tuple[str], optional): General data columns to
+            extract, see _general_columns. Defaults to None, i.e. all
+            columns, without descriptions if they're skipped or in their
+            own table.
+        link_types (list[str], optional): Link types to extract. Defaults
+            to None, i.e. all.
+        poll_names (list[str], optional): Poll names to extract. Defaults
+            to None, i.e. all.
+        item_ids (list[int], optional): If given, the id of each item is
+            appended to it. Defaults to None.
+    """
+    general_data = columns.get(KEY_GENERAL_DATA)
+    link_data = columns.get(KEY_LINK_DATA)
+    poll_data = columns.get(KEY_POLL_DATA)
+    description_data = columns.get(KEY_DESCRIPTION_DATA)
+    if general_columns is None:
+        general_columns = _general_columns(None, descriptions, list(columns))
+    extract_general_data = ItemExtractor.general_data_extractor(
+        general_columns)
+    # Sets, as they're checked for every link and poll
+    if link_types is not None:
+        link_types = frozenset(link_types)
+    if poll_names is not None:
+        poll_names = frozenset(poll_names)
+
+    # Extract data.
+    # Link and poll data are lists of dicts themselves,
+    # hence extend not append.
+    for item in _iter_xml_items(file_path):
+        extractor = ItemExtractor(item, convert=False,
+                                  descriptions=descriptions)
+        if item_ids is not None:
+            item_ids.append(extractor._extract_id())
+        if general_data is not None:
+            general_data.append(extract_general_data(extractor))
+        if description_data is not None:
+            description_data.append(extractor.extract_description_data())
+        if link_data is not None:
+            link_data.extend(
+                extractor.extract_link_data(link_types=link_types))
+        if poll_data is not None:
+            poll_data.extend(
+                extractor.extract_poll_data(poll_names=poll_names))
+
+
+def _extract_file_buffers(
+        file_path: str | IO[bytes],
+        keys: list[str],
+        descriptions: str = 'unescape',
+        general_columns: tuple[str] = None,
+        link_types: list[str] = None,
+        poll_names: list[str] = None) -> dict[tuple]:
+    """Extract a single xml file's data, in a worker process.
+
+    Column buffers (an array of values per field) are cheaper than a list of
+    dicts to send back from worker processes.
+
+    Args:
+        file_path (str | IO[bytes]): Location of the input xml file, or a
+            binary file object of xml.
+        keys (list[str]): Requested types of data.
+        descriptions (str, optional): See ItemExtractor. Defaults to
+            'unescape'.
+        general_columns (tuple[str], optional): See _extract_file_into.
+            Defaults to None.
+        link_types (list[str], optional): See _extract_file_into.
+            Defaults to None.
+        poll_names (list[str], optional): See _extract_file_into.
+            Defaults to None.
+
+    Returns:
+        dict[tuple]: For each requested type of data, the column buffers
+            from ColumnAccumulator.to_buffers.
+    """
+    columns = _make_accumulators(keys)
+    _extract_file_into(file_path, columns, descriptions, general_columns,
+                       link_types=link_types, poll_names=poll_names)
+    return {key: columns[key].to_buffers() for key in keys}
+
+
 def _read_xml_file(file_path: str) -> etree.Element:
     """Read an xml file using lxml and get the root element.
 
+    gzip or zstd compressed files are decompressed, going by their suffix.
+
     Parameters
     ----------
     file_path : str
@@ -243,63 +1100,768 @@ def _read_xml_file(file_path: str) -> etree.Element:
     """
     # Read xml data
     # etree raises error for read_text
-    xml_data = Path(file_path).read_bytes()
+    with open_compressed(str(file_path)) as f:
+        xml_data = f.read()
     # return root element
     return etree.fromstring(xml_data)
 
 
+def _iter_xml_items(file_path: str | IO[bytes]) -> Iterator[etree.Element]:
+    """Stream the items of an xml file, i.e. the children of the root.
+
+    Built on lxml.etree.iterparse: each item is yielded once it has been
+    parsed, then cleared along with the items before it, so only one item
+    is held in memory at a time, however large the file is. Items must be
+    used before the next one is requested.
+
+    gzip or zstd compressed files are decompressed, going by their suffix.
+
+    Parameters
+    ----------
+    file_path : str or file object
+        Location of the xml file, or a binary file object of xml.
+
+    Yields
+    ------
+    etree.Element
+        Each child element of the root.
+    """
+    depth = 0
+    if hasattr(file_path, 'read'):
+        opened = nullcontext(file_path)
+    else:
+        opened = open_compressed(str(file_path))
+    with opened as f:
+        for event, elem in etree.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+                continue
+            depth -= 1
+            # Only items, i.e. children of the root
+            if depth != 1:
+                continue
+            yield elem
+            # Free the item and any already processed items before it
+            elem.clear(keep_tail=True)
+            parent = elem.getparent()
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+class EtlManifest():
+    """Record of the xml files extracted into partitioned datasets.
+
+    Entries are keyed by xml file name, holding the file's size, mtime (in
+    ns), sha256 content hash, rows written per type of data, and the name
+    of its partition in each dataset folder.
+
+    A file is unchanged if its size and mtime match its entry, or, failing
+    that, if its content hash does, e.g. if it was rewritten with the same
+    content. Files extracted without some requested type of data count as
+    changed, as do all files if the extraction options have changed.
+    """
+    KEYS = (KEY_GENERAL_DATA, KEY_LINK_DATA, KEY_POLL_DATA,
+            KEY_DESCRIPTION_DATA)
+    # Extraction options of manifests saved before options were recorded
+    DEFAULT_OPTIONS = {'descriptions': 'unescape',
+                       'split_descriptions': False,
+                       'columns': None,
+                       'link_types': None,
+                       'poll_names': None}
+
+    def __init__(self, entries: dict = None, options: dict = None):
+        self.entries = {} if entries is None else entries
+        # Extraction options the files were extracted with
+        self.options = options
+
+    @classmethod
+    def load(cls, path: str) -> 'EtlManifest':
+        """Load a manifest, or start an empty one if path doesn't exist."""
+        if not Path(path).exists():
+            return cls()
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        return cls(manifest['files'],
+                   {**cls.DEFAULT_OPTIONS, **manifest.get('options', {})})
+
+    def save(self, path: str) -> None:
+        """Save the manifest, via a temporary file moved into place."""
+        tmp_path = str(path) + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'files': self.entries, 'options': self.options}, f)
+        os.replace(tmp_path, path)
+
+    def is_unchanged(self, file_path: Path, keys: list[str]) -> bool:
+        """True if file_path was already extracted for all keys, unchanged.
+
+        Args:
+            file_path (Path): Xml file.
+            keys (list[str]): Types of data requested.
+
+        Returns:
+            bool: True if the file can be skipped.
+        """
+        entry = self.entries.get(file_path.name)
+        if entry is None or any(key not in entry['rows'] for key in keys):
+            return False
+        stat = file_path.stat()
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        if _file_sha256(file_path) != entry['sha256']:
+            return False
+        # Same content, so the mtime check will do next time
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(
+            self,
+            file_path: Path,
+            stat: os.stat_result,
+            sha256: str,
+            partition: str,
+            rows: dict[int]) -> None:
+        """Record that file_path was extracted.
+
+        Args:
+            file_path (Path): Xml file.
+            stat (os.stat_result): Stat of the file when it was hashed.
+            sha256 (str): Hex sha256 hash of the file.
+            partition (str): Name of the file's partition in the datasets.
+            rows (dict[int]): Rows written for each type of data.
+        """
+        self.entries[file_path.name] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': sha256,
+            'rows': rows,
+            'partition': partition}
+
+
+class ResponseExtractor():
+    """Background stage extracting xml responses into parquet partitions.
+
+    Passed to core.bgg.Retriever, each downloaded batch is handed over in
+    memory and extracted in a background thread while the crawl goes on,
+    rather than rereading xml files from disk after the crawl. Partitions
+    are laid out as with update_xml_folder_parquet_dataset, i.e. a folder
+    per type of data, e.g. '{save_file_prefix}_general_data', with a
+    parquet file per batch, e.g. '12.xml.parquet', so the data can be read
+    with pd.read_parquet or pyarrow.dataset as the crawl progresses.
+
+    At most max_pending responses wait to be extracted; past that, submit
+    blocks, so a slow extraction slows the crawl rather than filling
+    memory. Use as a context manager, or call close, to finish extracting
+    pending responses. An error in the background thread is raised by the
+    next call to submit, wait or close.
+
+    Each response's on_done callback, if given, is only called once its
+    partitions are written, e.g. for the crawl to record the batch as
+    complete only then.
+    """
+    def __init__(
+            self,
+            save_dir_path: str,
+            save_file_prefix: str,
+            get_general_data: bool = True,
+            get_link_data: bool = True,
+            get_poll_data: bool = True,
+            max_pending: int = 4,
+            descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape',
+            split_descriptions: bool = False,
+            columns: list[str] = None,
+            link_types: list[str] = None,
+            poll_names: list[str] = None) -> None:
+        """Start the background extraction thread.
+
+        Args:
+            save_dir_path (str): Folder where datasets are written.
+            save_file_prefix (str): Prefix for the dataset folders.
+            get_general_data (bool, optional): Write general data.
+                Defaults to True.
+            get_link_data (bool, optional): Write data relating boardgames
+                to other types of items.
+                Defaults to True.
+            get_poll_data (bool, optional): Write poll data for each
+                boardgame. Defaults to True.
+            max_pending (int, optional): Max number of responses waiting
+                to be extracted. Defaults to 4.
+            descriptions (str of 'unescape'|'raw'|'skip', optional): Extract
+                game descriptions html unescaped, raw (i.e. still escaped
+                once, see unescape_descriptions), or not at all.
+                Defaults to 'unescape'.
+            split_descriptions (bool, optional): Put descriptions in their
+                own dataset, keyed by KEY_DESCRIPTION_DATA, rather than in
+                general data. Defaults to False.
+            columns (list[str], optional): General data columns to
+                extract, in the order of COLUMNS[KEY_GENERAL_DATA].
+                Defaults to None, i.e. all columns.
+            link_types (list[str], optional): Only extract links of these
+                types. Defaults to None, i.e. all links.
+            poll_names (list[str], optional): Only extract polls with these
+                names. Defaults to None, i.e. all polls.
+
+        Raises:
+            NotADirectoryError: If the save directory doesn't exist or isn't
+                a directory.
+            ValueError: If descriptions is not accepted, or columns has
+                unknown columns.
+        """
+        save_p = Path(save_dir_path)
+        if not save_p.is_dir():
+            raise NotADirectoryError(f"{save_dir_path} is not a directory.")
+        _check_descriptions(descriptions)
+        _check_columns(columns)
+        keys = _requested_keys(get_general_data, get_link_data, get_poll_data,
+                               descriptions, split_descriptions, columns)
+        self.keys = keys
+        self.descriptions = descriptions
+        self.general_columns = _general_columns(columns, descriptions, keys)
+        self.schemas = _schemas(keys, self.general_columns)
+        self.link_types = link_types
+        self.poll_names = poll_names
+        self.dataset_paths = {key: save_p / f"{save_file_prefix}_{key}"
+                              for key in keys}
+        for dataset_path in self.dataset_paths.values():
+            dataset_path.mkdir(exist_ok=True)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'ResponseExtractor':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def submit(
+            self,
+            name: str,
+            content: bytes,
+            on_done: Callable[[list[int]], None] = None) -> None:
+        """Queue xml content to be extracted to partitions named after name.
+
+        Args:
+            name (str): Name of the batch, e.g. '12.xml'.
+            content (bytes): Uncompressed xml of the batch.
+            on_done (Callable[[list[int]], None], optional): Called from
+                the background thread with the ids of the batch's items,
+                once its partitions are written. Not called if extraction
+                fails. Defaults to None.
+
+        Raises:
+            RuntimeError: If the extractor is closed.
+        """
+        self._raise_error()
+        if not self._thread.is_alive():
+            raise RuntimeError("ResponseExtractor is closed.")
+        self._queue.put((name, content, on_done))
+
+    def wait(self) -> None:
+        """Block until all submitted responses have been extracted.
+
+        Raises:
+            Exception: An error from extracting a response, if any.
+        """
+        self._queue.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """Extract pending responses, then stop the background thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise_error()
+
+    def _raise_error(self) -> None:
+        """Raise an error from the background thread, once."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self) -> None:
+        """Extract queued responses until close puts None on the queue."""
+        while (job := self._queue.get()) is not None:
+            name, content, on_done = job
+            try:
+                item_ids = self._write_partitions(name, content)
+                if on_done is not None:
+                    on_done(item_ids)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+
+    def _write_partitions(self, name: str, content: bytes) -> list[int]:
+        """Extract xml content and write it as a partition per dataset.
+
+        Returns:
+            list[int]: Ids of the items in the content.
+        """
+        columns = _make_accumulators(self.keys)
+        item_ids = []
+        _extract_file_into(
+            io.BytesIO(content), columns, self.descriptions,
+            self.general_columns, link_types=self.link_types,
+            poll_names=self.poll_names, item_ids=item_ids)
+        for key in self.keys:
+            table = columns.pop(key).to_arrow(self.schemas[key])
+            out_path = self.dataset_paths[key] / f"{name}.parquet"
+            tmp_path = out_path.with_name(out_path.name + '.tmp')
+            pq.write_table(table, tmp_path)
+            os.replace(tmp_path, out_path)
+        return item_ids
+
+
+class ColumnAccumulator():
+    """
+    Accumulates rows of data into a buffer per column.
+
+    Int and float columns are kept in typed arrays, which become numpy
+    arrays without copying. Missing ints are tracked with a mask, and
+    missing floats stored as NaN. Their values can be numbers or strings
+    of numbers, which are parsed (and floats rounded) a column at a time
+    with arrow and numpy rather than per value. Other columns are kept in
+    lists. Columns are in order of first appearance, and rows missing a
+    column get None, as with pd.DataFrame(list_of_dicts).
+
+    Rows are held as dicts only until FLUSH_ROWS of them are pending, then
+    moved into the buffers a column at a time.
+
+    Tables can narrow some int columns to int32, keep some columns as
+    categories (dictionaries in arrow), and keep some columns of bools or
+    None as nullable bools.
+    """
+    FLUSH_ROWS = 1024
+
+    def __init__(
+            self,
+            int_columns: tuple[str] = (),
+            float_columns: tuple[str] = (),
+            int32_columns: tuple[str] = (),
+            category_columns: tuple[str] = (),
+            bool_columns: tuple[str] = (),
+            round_columns: dict[int] = None):
+        """Initialize with no rows, and the names of typed columns.
+
+        Args:
+            int_columns (tuple[str], optional): Columns of ints or None.
+                Defaults to ().
+            float_columns (tuple[str], optional): Columns of floats or None.
+                Defaults to ().
+            int32_columns (tuple[str], optional): Int columns narrowed to
+                int32 in tables. Defaults to ().
+            category_columns (tuple[str], optional): Columns kept as
+                categories in tables. Defaults to ().
+            bool_columns (tuple[str], optional): Columns of bools or None,
+                kept as nullable bools in tables. Defaults to ().
+            round_columns (dict[int], optional): Float columns to round, to
+                a number of decimal places, as with round(). Defaults to
+                None, i.e. no rounding.
+        """
+        self.int_columns = set(int_columns)
+        self.float_columns = set(float_columns)
+        self.int32_columns = set(int32_columns)
+        self.category_columns = set(category_columns)
+        self.bool_columns = set(bool_columns)
+        self.round_columns = round_columns or {}
+        # Rows in the buffers, and rows waiting to be moved into them
+        self._n_flushed = 0
+        self._pending = []
+        # Column name -> values, and for int columns, a mask of missing rows
+        self._values = {}
+        self._masks = {}
+        # Column name -> function extending the column with a list of values
+        self._extenders = {}
+
+    @property
+    def n_rows(self) -> int:
+        """Number of rows added."""
+        return self._n_flushed + len(self._pending)
+
+    def append(self, row: dict) -> None:
+        """Add a row, a dict of column name to value."""
+        self._pending.append(row)
+        if len(self._pending) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def extend(self, rows: list[dict]) -> None:
+        """Add several rows."""
+        self._pending.extend(rows)
+        if len(self._pending) >= self.FLUSH_ROWS:
+            self._flush()
+
+    def to_columns(self) -> dict[np.ndarray | list]:
+        """Return the column values.
+
+        Int columns with missing values become floats, with missing values
+        as NaN, as pandas would do. Numeric arrays are read-only views of the
+        buffers, so no more rows should be added after.
+
+        Returns:
+            dict[np.ndarray | list]: Column name to values.
+        """
+        self._flush()
+        out = {}
+        for column, values in self._values.items():
+            if column in self._masks:
+                values = np.frombuffer(values, dtype=np.int64)
+                mask = np.frombuffer(self._masks[column], dtype=np.bool_)
+                if mask.any():
+                    values = values.astype(np.float64)
+                    values[mask] = np.nan
+            elif column in self.float_columns:
+                values = np.frombuffer(values, dtype=np.float64)
+            out[column] = values
+        return out
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Return the rows as a DataFrame.
+
+        int32_columns without missing values are int32, category_columns
+        are categories, and bool_columns are pandas' nullable 'boolean'.
+
+        Raises:
+            ValueError: If an int32 column has values out of int32 range.
+        """
+        columns = self.to_columns()
+        for column, values in columns.items():
+            if column in self.category_columns:
+                columns[column] = pd.Categorical(values)
+            elif column in self.bool_columns:
+                columns[column] = pd.array(values, dtype='boolean')
+            elif column in self.int32_columns and values.dtype == np.int64:
+                columns[column] = _to_int32(values)
+        return pd.DataFrame(columns, copy=False)
+
+    def to_arrow(self, schema: pa.Schema = None) -> pa.Table:
+        """Return the rows as a pyarrow Table, with missing values as nulls.
+
+        Int columns stay ints, with nulls where values are missing.
+
+        Args:
+            schema (pa.Schema, optional): Schema of the table. Columns in
+                the schema but not in the rows are all nulls. Defaults to
+                None, i.e. the columns of the rows, with int32 for
+                int32_columns, string dictionaries for category_columns,
+                and inferred types otherwise.
+
+        Raises:
+            ValueError: If the rows have columns not in the schema.
+
+        Returns:
+            pa.Table: Table of the rows.
+        """
+        self._flush()
+        if schema is None:
+            return pa.table({column: self._arrow_array(column)
+                             for column in self._values})
+        extra_columns = self._values.keys() - set(schema.names)
+        if extra_columns:
+            raise ValueError(
+                f"Columns {sorted(extra_columns)} are not in the schema.")
+        return pa.Table.from_arrays(
+            [self._arrow_array(field.name, field.type)
+             if field.name in self._values
+             else pa.nulls(self._n_flushed, field.type)
+             for field in schema],
+            schema=schema)
+
+    def to_buffers(self) -> tuple[int, dict[tuple]]:
+        """Return the number of rows and the raw column buffers.
+
+        For adding to another ColumnAccumulator with extend_buffers, e.g.
+        from a worker process.
+
+        Returns:
+            tuple[int, dict[tuple]]: Number of rows, and column name to a
+                tuple of the values and the mask of missing values (None
+                for columns other than ints).
+        """
+        self._flush()
+        return self._n_flushed, {
+            column: (values, self._masks.get(column))
+            for column, values in self._values.items()}
+
+    def extend_buffers(self, n_rows: int, buffers: dict[tuple]) -> None:
+        """Add the rows of another ColumnAccumulator's buffers.
+
+        Args:
+            n_rows (int): Number of rows in the buffers.
+            buffers (dict[tuple]): Column buffers from to_buffers.
+        """
+        self._flush()
+        for column in buffers:
+            if column not in self._values:
+                self._add_column(column)
+        for column, values in self._values.items():
+            if column in buffers:
+                new_values, new_mask = buffers[column]
+                values.extend(new_values)
+                if new_mask is not None:
+                    self._masks[column].extend(new_mask)
+            else:
+                self._extenders[column]([None] * n_rows)
+        self._n_flushed += n_rows
+
+    def _arrow_array(
+            self,
+            column: str,
+            type: pa.DataType = None) -> pa.Array:
+        """Return a column as a pyarrow Array, missing values as nulls."""
+        if type is None:
+            if column in self.int32_columns:
+                type = pa.int32()
+            elif column in self.category_columns:
+                type = pa.dictionary(pa.int32(), pa.string())
+            elif column in self.bool_columns:
+                type = pa.bool_()
+        values = self._values[column]
+        if column in self._masks:
+            return pa.array(
+                np.frombuffer(values, dtype=np.int64),
+                mask=np.frombuffer(self._masks[column], dtype=np.bool_),
+                type=type)
+        if column in self.float_columns:
+            return pa.array(np.frombuffer(values, dtype=np.float64),
+                            from_pandas=True, type=type)
+        return pa.array(values, type=type)
+
+    def _flush(self) -> None:
+        """Move pending rows into the column buffers."""
+        rows = self._pending
+        if not rows:
+            return
+        known = self._extenders.keys()
+        for row in rows:
+            if not row.keys() <= known:
+                for column in row:
+                    if column not in self._values:
+                        self._add_column(column)
+        for column, extend in self._extenders.items():
+            extend([row.get(column) for row in rows])
+        self._n_flushed += len(rows)
+        self._pending = []
+
+    def _add_column(self, column: str) -> None:
+        """Add a column, with missing values for the rows so far."""
+        n_rows = self._n_flushed
+        if column in self.int_columns:
+            values = array('q', bytes(8 * n_rows))
+            mask = bytearray(b'\x01' * n_rows)
+            self._masks[column] = mask
+
+            def extend(new_values: list) -> None:
+                parsed = _parse_numbers(new_values, pa.int64())
+                mask.extend(
+                    parsed.is_null().to_numpy(zero_copy_only=False).tobytes())
+                values.frombytes(
+                    parsed.fill_null(0).to_numpy(zero_copy_only=False)
+                    .tobytes())
+        elif column in self.float_columns:
+            values = array('d', [np.nan] * n_rows)
+            ndigits = self.round_columns.get(column)
+
+            def extend(new_values: list) -> None:
+                parsed = _parse_numbers(new_values, pa.float64())\
+                    .to_numpy(zero_copy_only=False)
+                if ndigits is not None:
+                    parsed = _round(parsed, ndigits)
+                values.frombytes(parsed.tobytes())
+        else:
+            values = [None] * n_rows
+            extend = values.extend
+        self._values[column] = values
+        self._extenders[column] = extend
+
+
+def _parse_numbers(values: list, type: pa.DataType) -> pa.Array:
+    """Return numbers, strings of numbers, or None, as an arrow array.
+
+    Strings are parsed by arrow in one pass, as int() or float() would.
+
+    Raises:
+        pa.ArrowInvalid: If a string isn't a number of the type.
+    """
+    parsed = pa.array(values)
+    return parsed if parsed.type == type else parsed.cast(type)
+
+
+def _round(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """Round floats to ndigits decimal places, as round() does, vectorized.
+
+    np.round scales values by 10**ndigits and rounds half to even, which
+    can round differently from round() when the scaled value is at or near
+    a half. Those few values are rounded again with round().
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    out = np.round(scaled) / scale
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        out[i] = round(float(values[i]), ndigits)
+    return out
+
+
+def _to_int32(values: np.ndarray) -> np.ndarray:
+    """Return int64 values as int32, raising ValueError if out of range."""
+    info = np.iinfo(np.int32)
+    if values.size and (values.min() < info.min or values.max() > info.max):
+        raise ValueError("Values out of int32 range.")
+    return values.astype(np.int32)
+
+
+def _str_to_int(values: pd.Series) -> pd.Series:
+    """Convert strings of ints to ints, or floats if values are missing.
+
+    As with ColumnAccumulator.to_columns, missing values become NaN.
+    """
+    return values.astype(np.float64 if values.isna().any() else np.int64)
+
+
+def _rounded(ndigits: int) -> Callable[[str], float]:
+    """Return a converter of a str to a float rounded to ndigits."""
+    return lambda value: round(float(value), ndigits)
+
+
 class ItemExtractor():
     """
     Handles extracting various XML attributes and values
     in a bespoke manner for each value from BGG data.
-    """
 
-    def __init__(self, item):
+    The item's children are walked once, collecting each by tag, and the
+    values of the ratings under <statistics> likewise. Extraction methods
+    then look values up by tag, rather than searching the item per field.
+    """
+    # Children of <item> of which there can be several, all are kept.
+    # Otherwise, only the first child with a tag is kept.
+    REPEATED_TAGS = ('link', 'poll')
+    # Converters for poll data, by output key. Other poll attributes are
+    # kept as str's.
+    POLL_VALUE_CONVERTERS = {
+        'poll_totalvotes': int,
+        'result_numvotes': int,
+        'result_level': int,
+        }
+    # Player counts, e.g. '3' or '3+', are split into an int and a flag
+    # for the '+'.
+    POLL_NUMPLAYERS_KEY = 'results_numplayers'
+    POLL_NUMPLAYERS_PLUS_KEY = 'results_numplayers_plus'
+    # Converters for the 'value' attribute of tags with general data,
+    # either children of <item>, or of <statistics> -> <ratings>.
+    VALUE_CONVERTERS = {
+        'name': str,
+        'yearpublished': int,
+        'minplayers': int,
+        'maxplayers': int,
+        'playingtime': int,
+        'minplaytime': int,
+        'maxplaytime': int,
+        'minage': int,
+        }
+    RATINGS_VALUE_CONVERTERS = {
+        'usersrated': int,
+        'average': _rounded(3),
+        'bayesaverage': _rounded(3),
+        'stddev': _rounded(4),
+        'median': _rounded(1),
+        'owned': int,
+        'trading': int,
+        'wanting': int,
+        'wishing': int,
+        'numcomments': int,
+        'numweights': int,
+        'averageweight': _rounded(3),
+        }
+    # How each general data column, by its default key, is extracted: its
+    # xml name (giving the '{name}_key' arg of extract_general_data), the
+    # method and the method's args. Also see general_data_extractor.
+    GENERAL_DATA_FIELDS = {
+        'id': ('id', '_extract_id'),
+        'type': ('type', '_extract_type'),
+        'name': ('name', '_extract_value', 'name'),
+        'description': ('description', '_extract_description'),
+        'year_published': (
+            'yearpublished', '_extract_value', 'yearpublished'),
+        'players_min': ('minplayers', '_extract_value', 'minplayers'),
+        'players_max': ('maxplayers', '_extract_value', 'maxplayers'),
+        'playtime': ('playingtime', '_extract_value', 'playingtime'),
+        'playtime_min': ('minplaytime', '_extract_value', 'minplaytime'),
+        'playtime_max': ('maxplaytime', '_extract_value', 'maxplaytime'),
+        'age_min': ('minage', '_extract_value', 'minage'),
+        'ratings_n': (
+            'usersrated', '_extract_ratings_value', 'usersrated'),
+        'ratings_mean': ('average', '_extract_ratings_value', 'average'),
+        'ratings_bayes_average': (
+            'bayesaverage', '_extract_ratings_value', 'bayesaverage'),
+        'ratings_stddev': ('stddev', '_extract_ratings_value', 'stddev'),
+        'ratings_median': ('median', '_extract_ratings_value', 'median'),
+        'ratings_owned': ('owned', '_extract_ratings_value', 'owned'),
+        'ratings_trading': ('trading', '_extract_ratings_value', 'trading'),
+        'ratings_wanting': ('wanting', '_extract_ratings_value', 'wanting'),
+        'ratings_wishing': ('wishing', '_extract_ratings_value', 'wishing'),
+        'ratings_comments_n': (
+            'numcomments', '_extract_ratings_value', 'numcomments'),
+        'ratings_weights_n': (
+            'numweights', '_extract_ratings_value', 'numweights'),
+        'ratings_weights_average': (
+            'averageweight', '_extract_ratings_value', 'averageweight'),
+        }
+
+    def __init__(
+            self,
+            item,
+            convert: bool = True,
+            descriptions: Literal['unescape', 'raw', 'skip'] = 'unescape'):
         """Initalize with an item (i.e. a boardgame).
 
         Parameters
         ----------
         item : lxml.etree Element
             An element tagged item, corresponding to a board game entry.
+        convert : bool, optional
+            Convert numeric values from strings, by default True. Otherwise
+            they are left as strings, except for ids, e.g. for
+            ColumnAccumulator to convert many at a time.
+        descriptions : str of 'unescape'|'raw'|'skip', optional
+            Extract the description html unescaped, raw (i.e. still escaped
+            once), or leave it out of general data, by default 'unescape'.
         """
         self.item = item
+        self.convert = convert
+        self.descriptions = descriptions
+        self._id = None
+        # Single pass over the item's children
+        self._children = {}
+        self._repeated = {tag: [] for tag in self.REPEATED_TAGS}
+        for child in item:
+            tag = child.tag
+            if tag in self._repeated:
+                self._repeated[tag].append(child)
+            elif tag not in self._children:
+                self._children[tag] = child
+        # <statistics> -> <ratings> is walked on first use
+        self._ratings = None
 
     def extract_general_data(
             self,
             raise_missing_id: bool = True,
-            id_key: str = 'id',
-            type_key: str = 'type',
-            name_key: str = 'name',
-            description_key: str = 'description',
-            yearpublished_key: str = 'year_published',
-            minplayers_key: str = 'players_min',
-            maxplayers_key: str = 'players_max',
-            playingtime_key: str = 'playtime',
-            minplaytime_key: str = 'playtime_min',
-            maxplaytime_key: str = 'playtime_max',
-            minage_key: str = 'age_min',
-            usersrated_key: str = 'ratings_n',
-            average_key: str = 'ratings_mean',
-            bayesaverage_key: str = 'ratings_bayes_average',
-            stddev_key: str = 'ratings_stddev',
-            median_key: str = 'ratings_median',
-            owned_key: str = 'ratings_owned',
-            trading_key: str = 'ratings_trading',
-            wanting_key: str = 'ratings_wanting',
-            wishing_key: str = 'ratings_wishing',
-            numcomments_key: str = 'ratings_comments_n',
-            numweights_key: str = 'ratings_weights_n',
-            averageweight_key: str = 'ratings_weights_average') -> dict:
+            **keys: str) -> dict:
         """Extract data from an xml item, excluding 'poll' and 'link' tags.
 
+        Fields are extracted as listed in GENERAL_DATA_FIELDS.
+
         Args:
             raise_missing_id (bool, optional): Raise on missing id instead of
                 setting to None. Defaults to True.
-
-            The following args correspond to what the key should be in the
-            returned dictionary for each data field. The names of the args
-            correspond to the original xml tags. Default key names do some
-            tidying and categorizing of the field names.
+            **keys (str): What the key should be in the returned dictionary
+                for a data field, as '{name}_key', e.g.
+                yearpublished_key='year'. The names correspond to the
+                original xml tags. Default key names do some tidying and
+                categorizing of the field names:
 
             id (str, optional): Id should be present for all boardgames.
                 Defaults to 'id'.
@@ -355,40 +1917,67 @@ class ItemExtractor():
 
         Returns:
             dict: containing above keys, with their values coerced to an
-            appropriate type or None if the value is missing.
+            appropriate type or None if the value is missing. The
+            description is left out if self.descriptions is 'skip'.
+
+        Raises:
+            TypeError: If a key arg doesn't match a field.
         """
         # Uncertain if tags/data will change in future, but this
-        # should decouple data keys from xml data, and let each
-        # extraction of each tag be independent of each other.
+        # should decouple data keys from xml data.
+        fields = self.GENERAL_DATA_FIELDS
+        unknown = set(keys) - {f'{name}_key' for name, *_ in fields.values()}
+        if unknown:
+            raise TypeError(f"Unexpected keyword arguments {sorted(unknown)}.")
         out = {}
-        out[id_key] = self._extract_id(raise_missing_id=raise_missing_id)
-        out[type_key] = self._extract_type()
-        out[name_key] = self._extract_name()
-        out[description_key] = self._extract_description()
-        out[yearpublished_key] = self._extract_year_published()
-        out[minplayers_key] = self._extract_min_players()
-        out[maxplayers_key] = self._extract_max_players()
-        out[playingtime_key] = self._extract_playing_time()
-        out[minplaytime_key] = self._extract_min_playtime()
-        out[maxplaytime_key] = self._extract_max_playtime()
-        out[minage_key] = self._extract_min_age()
-        out[usersrated_key] = self._extract_users_rated()
-        out[average_key] = self._extract_ratings_average()
-        out[bayesaverage_key] = self._extract_bayes_average()
-        out[stddev_key] = self._extract_ratings_stddev()
-        out[median_key] = self._extract_ratings_median()
-        out[owned_key] = self._extract_ratings_owned()
-        out[trading_key] = self._extract_ratings_trading()
-        out[wanting_key] = self._extract_ratings_wanting()
-        out[wishing_key] = self._extract_ratings_wishing()
-        out[numcomments_key] = self._extract_ratings_num_comments()
-        out[numweights_key] = self._extract_ratings_num_weights()
-        out[averageweight_key] = self._extract_ratings_average_weight()
+        for column, (name, method, *args) in fields.items():
+            if column == 'description' and self.descriptions == 'skip':
+                continue
+            key = keys.get(f'{name}_key', column)
+            if column == 'id':
+                out[key] = self._extract_id(raise_missing_id=raise_missing_id)
+            else:
+                out[key] = getattr(self, method)(*args)
         return out
 
+    @classmethod
+    def general_data_extractor(
+            cls,
+            columns: list[str]) -> Callable[['ItemExtractor'], dict]:
+        """Compile a function extracting only some general data columns.
+
+        The function returns what extract_general_data does with default
+        keys, restricted to columns. Other fields are never looked up or
+        converted, e.g. ratings aren't walked unless a ratings column is
+        requested.
+
+        Args:
+            columns (list[str]): Columns to extract, keys of
+                GENERAL_DATA_FIELDS, in their output order.
+
+        Raises:
+            ValueError: If a column isn't a general data column.
+
+        Returns:
+            Callable[[ItemExtractor], dict]: Takes an ItemExtractor, returns
+                the columns of its item.
+        """
+        fields = []
+        for column in columns:
+            if column not in cls.GENERAL_DATA_FIELDS:
+                raise ValueError(f"{column} is not a general data column.")
+            _, method, *args = cls.GENERAL_DATA_FIELDS[column]
+            fields.append((column, getattr(cls, method), args))
+
+        def extract(extractor: 'ItemExtractor') -> dict:
+            return {column: method(extractor, *args)
+                    for column, method, args in fields}
+        return extract
+
     def extract_poll_data(
             self,
-            boardgame_id_key: str = 'boardgame_id'
+            boardgame_id_key: str = 'boardgame_id',
+            poll_names: list[str] = None
             ) -> list[dict]:
         """Extract poll tags for the xml item.
 
@@ -400,11 +1989,17 @@ class ItemExtractor():
          and <poll> tag.
 
          The originating boardgame id is included, which its value as an int.
-         All other values are str's.
+         Vote counts and levels are ints (see POLL_VALUE_CONVERTERS), and
+         player counts such as '3+' are split into the int 3 and True for
+         'results_numplayers_plus'. All other values are str's.
 
         Args:
             boardgame_id_key (str, optional): Output key for boardgame id.
                 Defaults to 'boardgame_id'.
+            poll_names (list[str], optional): Only extract polls with these
+                names, e.g. ['suggested_numplayers']. Other polls are
+                skipped before their results are looked at. Defaults to
+                None, i.e. all polls.
 
         Returns:
             list[dict]: Each dict corresponding to a <result> tag. Keys for
@@ -412,43 +2007,82 @@ class ItemExtractor():
             for the parent <results> and <poll> tag attributes are prefixed
             with 'results_' and 'poll_', respectively.
         """
-        polls = self.item.findall('poll')
+        polls = self._repeated['poll']
         boardgame_id = self._extract_id()
         out = []
         for poll in polls:
-            # Convert to dict to avoid unexpected behaviour
-            poll_attributes = dict(poll.attrib)
-            # Prefix keys
-            poll_attributes = {
-                f'poll_{k}': v for k, v in poll_attributes.items()
-                }
+            if poll_names is not None and poll.get('name') not in poll_names:
+                continue
+            poll_attributes = self._poll_attributes('poll_', poll.attrib)
             # Each poll may have multiple <results> tags
             # with nested <result> tags.
             results_tags = poll.findall('results')
             for results_tag in results_tags:
-                results_attributes = dict(results_tag.attrib)
-                results_attributes = {
-                    f'results_{k}': v for k, v in results_attributes.items()
-                    }
+                results_attributes = self._poll_attributes(
+                    'results_', results_tag.attrib)
                 inner_result_tags = results_tag.findall('result')
+                # Attributes shared by each <result>, built once
+                row_prefix = {boardgame_id_key: boardgame_id,
+                              **poll_attributes,
+                              **results_attributes}
                 for inner_result_tag in inner_result_tags:
-                    inner_result_attributes = dict(inner_result_tag.attrib)
-                    inner_result_attributes = {
-                        f'result_{k}': v
-                        for k, v in inner_result_attributes.items()
-                        }
-                    # Collapse all attributes using Py3.9+ notation
-                    out.append(
-                        {boardgame_id_key: boardgame_id} |
-                        poll_attributes |
-                        results_attributes |
-                        inner_result_attributes)
+                    # Collapse all attributes into one new dict per row
+                    row = row_prefix.copy()
+                    row.update(self._poll_attributes(
+                        'result_', inner_result_tag.attrib))
+                    out.append(row)
         return out
 
+    def _poll_attributes(self, prefix: str, attrib) -> dict:
+        """Return a poll tag's attributes, with prefixed keys, converted.
+
+        Args:
+            prefix (str): 'poll_', 'results_' or 'result_'.
+            attrib (lxml attrib): Attributes of the tag.
+
+        Returns:
+            dict: Attributes, converted as in extract_poll_data.
+        """
+        out = {}
+        for k, v in attrib.items():
+            key = prefix + k
+            if key == self.POLL_NUMPLAYERS_KEY:
+                numplayers = v.rstrip('+')
+                out[key] = int(numplayers) if self.convert else numplayers
+                out[self.POLL_NUMPLAYERS_PLUS_KEY] = v.endswith('+')
+            elif self.convert and key in self.POLL_VALUE_CONVERTERS:
+                out[key] = self.POLL_VALUE_CONVERTERS[key](v)
+            else:
+                out[key] = v
+        return out
+
+    def extract_description_data(
+            self,
+            boardgame_id_key: str = 'boardgame_id',
+            description_key: str = 'description') -> dict:
+        """Extract the description of the item, with its boardgame id.
+
+        For keeping descriptions, by far the largest field, in their own
+        table.
+
+        Args:
+            boardgame_id_key (str, optional): Output key for boardgame id.
+                Defaults to 'boardgame_id'.
+            description_key (str, optional): Output key for the description.
+                Defaults to 'description'.
+
+        Returns:
+            dict: The boardgame id and description, as in
+                extract_general_data.
+        """
+        return {boardgame_id_key: self._extract_id(),
+                description_key: self._extract_description()}
+
     def extract_link_data(
             self,
             boardgame_id_key: str = 'boardgame_id',
-            link_id_key: str = 'link_id') -> list[dict]:
+            link_id_key: str = 'link_id',
+            link_types: list[str] = None) -> list[dict]:
         """Extract all link tags for the item.
 
         Args:
@@ -456,21 +2090,28 @@ class ItemExtractor():
                 Defaults to 'boardgame_id'.
             link_id_key (str, optional): Output key for the id associated with
                 the link. Defaults to 'link_id'.
+            link_types (list[str], optional): Only extract links of these
+                types, e.g. ['boardgamemechanic']. Other links are skipped
+                before being copied into dicts. Defaults to None, i.e. all
+                links.
 
         Returns:
             list[dict]: Each dict containing the originating board game, the
                 type of link, the link id, and the value of the link.
         """
-        links = self.item.findall('link')
+        links = self._repeated['link']
         # For binding the boardgame id to the links
         boardgame_id = self._extract_id()
         out = []
         for link in links:
+            if link_types is not None and link.get('type') not in link_types:
+                continue
             # .attrib is not quite an actual dict, has unexpected behaviour
             # when int-ing and assigning value
             link = dict(link.attrib)
             # Rename the 'id' key from the <link> tag, and int the value
-            link[link_id_key] = int(link.pop('id'))
+            link_id = link.pop('id')
+            link[link_id_key] = int(link_id) if self.convert else link_id
             # Put 'boardgame_id_key' in the front as client code will
             # probably want that in the first column of a pandas DataFrame.
             # Note: Python 3.7+ should have dict orders preserved.
@@ -481,6 +2122,9 @@ class ItemExtractor():
     def _extract_id(self, raise_missing_id=True) -> int | None:
         """Return board game id
 
+        The id is converted once and reused, e.g. by link and poll
+        extraction.
+
         Args:
             raise_missing_id (bool, optional): raises if the item has no id
                 attrib. Otherwise, ignore it and return None. Defaults to True.
@@ -491,14 +2135,16 @@ class ItemExtractor():
         Returns:
             int | None: id | None if ignoring missing ids
         """
-        try:
-            # Access the attrib dict
-            return int(self.item.attrib['id'])
-        except KeyError:
-            if raise_missing_id:
-                raise KeyError("Missing id attribute.")
-            else:
-                return None
+        if self._id is None:
+            try:
+                # Access the attrib dict
+                self._id = int(self.item.attrib['id'])
+            except KeyError:
+                if raise_missing_id:
+                    raise KeyError("Missing id attribute.")
+                else:
+                    return None
+        return self._id
 
     def _extract_type(self) -> str | None:
         """Return 'thing' type e.g. boardgame."""
@@ -507,139 +2153,57 @@ class ItemExtractor():
         except KeyError:
             return
 
-    def _extract_name(self) -> str | None:
-        """Return boardgame name."""
-        # Return None if can't find the name tag.
-        tag = self.item.find("name")
-        return None if tag is None else tag.attrib['value']
-
     def _extract_description(self) -> str | None:
-        """Return boardgame description."""
-        tag = self.item.find("description")
+        """Return boardgame description, unescaped unless self is raw."""
+        tag = self._children.get("description")
         # Note: input text is actually doubly escaped
         # e.g. '&amp;quot;' for '"'
         # the xml parser handles one of the unescapes automatically,
         # but need to unescape a second time here.
         # Note 2: it's possible for the tag to exist, but not the text.
         # unescape() can't handle when tag.text is None.
-        return None if (tag is None) or (tag.text) is None \
-            else unescape(tag.text)
-
-    def _extract_year_published(self) -> int | None:
-        """Return boardgame year published."""
-        tag = self.item.find("yearpublished")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_min_players(self) -> int | None:
-        """Return minimum number of players."""
-        tag = self.item.find("minplayers")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_max_players(self) -> int | None:
-        """Return maximum number of players"""
-        tag = self.item.find("maxplayers")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_playing_time(self) -> int | None:
-        """Return playing time."""
-        tag = self.item.find("playingtime")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_min_playtime(self) -> int | None:
-        """Return minimum playing time."""
-        tag = self.item.find("minplaytime")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_max_playtime(self) -> int | None:
-        """Return maximum playing time."""
-        tag = self.item.find("maxplaytime")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_min_age(self) -> int | None:
-        """Return minimum recommended age."""
-        tag = self.item.find("minage")
-        return None if tag is None else int(tag.attrib['value'])
-
-    def _extract_ratings_subtag_helper(
-            self,
-            subtag: str,
-            attrib: str = 'value') -> str | None:
-        """Helper func to get values for subtags under "statistics -> ratings".
+        if (tag is None) or (tag.text) is None:
+            return None
+        return tag.text if self.descriptions == 'raw' else unescape(tag.text)
+
+    def _extract_value(self, tag: str) -> int | str | None:
+        """Return the converted 'value' attribute of a child of the item.
 
         Args:
-            subtag (str): Subtag name.
-            attrib (str, optional): Subtag attribute to retrieve.
-                Defaults to 'value'.
+            tag (str): Tag name, a key of VALUE_CONVERTERS.
 
         Returns:
-            str | None: Value of the subtag, otherwise None if it's missing.
+            int | str | None: Value of the tag, otherwise None if it's
+                missing.
         """
-        # if statistics or ratings tag doesn't exist, .find() return None,
-        # so further .find() or .attrib() should raise AttributeError
-        try:
-            return self.item.find("statistics")\
-                            .find("ratings")\
-                            .find(subtag)\
-                            .attrib[attrib]
-        except AttributeError:
-            return
+        child = self._children.get(tag)
+        if child is None:
+            return None
+        value = child.attrib['value']
+        return self.VALUE_CONVERTERS[tag](value) if self.convert else value
+
+    def _extract_ratings_value(self, subtag: str) -> int | float | None:
+        """Return the converted value of a subtag of "statistics -> ratings".
 
-    def _extract_users_rated(self) -> int | None:
-        """Return the number of user ratings."""
-        out = self._extract_ratings_subtag_helper("usersrated")
-        return None if out is None else int(out)
-
-    def _extract_ratings_average(self) -> float | None:
-        """Return mean average rating to 3 decimals."""
-        out = self._extract_ratings_subtag_helper("average")
-        return None if out is None else round(float(out), 3)
-
-    def _extract_bayes_average(self) -> float | None:
-        """Return bayes average rating to 3 decimals."""
-        out = self._extract_ratings_subtag_helper("bayesaverage")
-        return None if out is None else round(float(out), 3)
-
-    def _extract_ratings_stddev(self) -> float | None:
-        """Return rating standard deviation to 4 decimals."""
-        out = self._extract_ratings_subtag_helper("stddev")
-        return None if out is None else round(float(out), 4)
-
-    def _extract_ratings_median(self) -> float | None:
-        """Return rating median to 1 decimal."""
-        out = self._extract_ratings_subtag_helper("median")
-        return None if out is None else round(float(out), 1)
-
-    def _extract_ratings_owned(self) -> int | None:
-        """Return number of times this item is owned."""
-        out = self._extract_ratings_subtag_helper("owned")
-        return None if out is None else int(out)
-
-    def _extract_ratings_trading(self) -> int | None:
-        """Return number of times this item is up for trade."""
-        out = self._extract_ratings_subtag_helper("trading")
-        return None if out is None else int(out)
-
-    def _extract_ratings_wanting(self) -> int | None:
-        """Return number of times this item is wanted."""
-        out = self._extract_ratings_subtag_helper("wanting")
-        return None if out is None else int(out)
-
-    def _extract_ratings_wishing(self) -> int | None:
-        """Return number of times this item is wishlisted."""
-        out = self._extract_ratings_subtag_helper("wishing")
-        return None if out is None else int(out)
-
-    def _extract_ratings_num_comments(self) -> int | None:
-        """Return number of comments."""
-        out = self._extract_ratings_subtag_helper("numcomments")
-        return None if out is None else int(out)
-
-    def _extract_ratings_num_weights(self) -> int | None:
-        """Return number of weight (complexity) ratings this item has."""
-        out = self._extract_ratings_subtag_helper("numweights")
-        return None if out is None else int(out)
-
-    def _extract_ratings_average_weight(self) -> float | None:
-        """Return mean average weight of this item to 3 decimals."""
-        out = self._extract_ratings_subtag_helper("averageweight")
-        return None if out is None else round(float(out), 3)
+        Args:
+            subtag (str): Subtag name, a key of RATINGS_VALUE_CONVERTERS.
+
+        Returns:
+            int | float | None: Value of the subtag, otherwise None if it's
+                missing.
+        """
+        if self._ratings is None:
+            self._ratings = {}
+            statistics = self._children.get('statistics')
+            ratings = None if statistics is None \
+                else statistics.find('ratings')
+            if ratings is not None:
+                for child in ratings:
+                    if child.tag not in self._ratings:
+                        self._ratings[child.tag] = child
+        child = self._ratings.get(subtag)
+        if child is None:
+            return None
+        value = child.attrib['value']
+        return self.RATINGS_VALUE_CONVERTERS[subtag](value) if self.convert \
+            else value
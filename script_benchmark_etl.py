@@ -0,0 +1,208 @@
+import argparse
+import copy
+import gc
+from html import unescape
+import tracemalloc
+from time import perf_counter
+import pandas as pd
+from core import etl
+
+
+class PerFieldItemExtractor(etl.ItemExtractor):
+    """Baseline extractor searching the item separately for every field.
+
+    This is how ItemExtractor used to work: one item.find() per field, a
+    statistics -> ratings -> subtag chain of finds per rating field, and
+    the id converted again for links and polls.
+    """
+    def __init__(self, item):
+        self.item = item
+        self.convert = True
+
+    def extract_general_data(self) -> dict:
+        out = {'id': int(self.item.attrib['id']),
+               'type': self.item.attrib.get('type'),
+               'name': self._find_value('name')}
+        tag = self.item.find('description')
+        out['description'] = None if tag is None or tag.text is None \
+            else unescape(tag.text)
+        for tag in self.VALUE_CONVERTERS:
+            if tag != 'name':
+                out[tag] = self._find_value(tag)
+        for subtag, convert in self.RATINGS_VALUE_CONVERTERS.items():
+            try:
+                value = self.item.find('statistics').find('ratings')\
+                    .find(subtag).attrib['value']
+                out[subtag] = convert(value)
+            except AttributeError:
+                out[subtag] = None
+        return out
+
+    def extract_link_data(self) -> list[dict]:
+        self._repeated = {'link': self.item.findall('link')}
+        self._id = int(self.item.attrib['id'])
+        return super().extract_link_data()
+
+    def extract_poll_data(self) -> list[dict]:
+        self._repeated = {'poll': self.item.findall('poll')}
+        self._id = int(self.item.attrib['id'])
+        return super().extract_poll_data()
+
+    def _find_value(self, tag: str):
+        found = self.item.find(tag)
+        return None if found is None \
+            else self.VALUE_CONVERTERS[tag](found.attrib['value'])
+
+
+def timed(func, repeat: int) -> tuple:
+    """Return the best time of repeat calls of func, and its output.
+
+    Garbage collection is paused while timing, as with timeit.
+    """
+    best = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = perf_counter()
+            out = func()
+            best = min(best, perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, out
+
+
+def extract_all(extractor_class, items: list) -> list[tuple]:
+    """Extract all data from items with an extractor class."""
+    out = []
+    for item in items:
+        extractor = extractor_class(item)
+        out.append((extractor.extract_general_data(),
+                    extractor.extract_link_data(),
+                    extractor.extract_poll_data()))
+    return out
+
+
+def benchmark_item_extractor(items: list, repeat: int) -> None:
+    """Compare single pass ItemExtractor against per-field lookups."""
+    baseline_time, baseline_out = timed(
+        lambda: extract_all(PerFieldItemExtractor, items), repeat)
+    single_pass_time, single_pass_out = timed(
+        lambda: extract_all(etl.ItemExtractor, items), repeat)
+    # Output of general data matches, bar the key names
+    for baseline, single_pass in zip(baseline_out, single_pass_out):
+        assert list(baseline[0].values()) == list(single_pass[0].values())
+        assert baseline[1:] == single_pass[1:]
+    print(f"ItemExtractor, {len(items)} items, best of {repeat}:")
+    print(f"  per-field lookups: {baseline_time:.3f} s")
+    print(f"  single pass:       {single_pass_time:.3f} s")
+    print(f"  speedup:           {baseline_time/single_pass_time:.2f}x")
+
+
+def benchmark_projection(items: list, repeat: int) -> None:
+    """Compare extracting all general data against a few columns."""
+    print(f"General data columns, {len(items)} items, best of {repeat}:")
+    for columns in [etl.COLUMNS[etl.KEY_GENERAL_DATA],
+                    ['id', 'year_published', 'ratings_mean'],
+                    ['id', 'name']]:
+        extract = etl.ItemExtractor.general_data_extractor(columns)
+        best, _ = timed(
+            lambda: [extract(etl.ItemExtractor(item, convert=False))
+                     for item in items], repeat)
+        print(f"  {len(columns):2} columns: {best:.3f} s")
+
+
+def build_dataframes(
+        items: list,
+        use_columns: bool,
+        convert: bool = True) -> dict:
+    """Extract items into DataFrames via lists of dicts or via columns.
+
+    Without convert, numeric strings are converted by the columns.
+    """
+    keys = [etl.KEY_GENERAL_DATA, etl.KEY_LINK_DATA, etl.KEY_POLL_DATA]
+    if use_columns:
+        out = {key: etl.ColumnAccumulator(
+                   etl.INT_COLUMNS.get(key, ()),
+                   etl.FLOAT_COLUMNS.get(key, ()),
+                   bool_columns=etl.BOOL_COLUMNS.get(key, ()),
+                   round_columns=etl.ROUND_COLUMNS.get(key))
+               for key in keys}
+    else:
+        out = {key: [] for key in keys}
+    for item in items:
+        extractor = etl.ItemExtractor(item, convert=convert)
+        out[etl.KEY_GENERAL_DATA].append(extractor.extract_general_data())
+        out[etl.KEY_LINK_DATA].extend(extractor.extract_link_data())
+        out[etl.KEY_POLL_DATA].extend(extractor.extract_poll_data())
+    if use_columns:
+        return {key: columns.to_dataframe() for key, columns in out.items()}
+    return {key: pd.DataFrame(rows) for key, rows in out.items()}
+
+
+def benchmark_column_accumulator(items: list, repeat: int) -> None:
+    """Compare extracting to lists of dicts and to column buffers.
+
+    Column buffers either get converted values, or strings they convert a
+    column at a time.
+    """
+    print(f"Extraction to DataFrames, {len(items)} items, best of {repeat}:")
+    results = {}
+    for use_columns, convert, label in [
+            (False, True, 'list of dicts'),
+            (True, True, 'columns'),
+            (True, False, 'columns, parsed')]:
+        best, results[label] = timed(
+            lambda: build_dataframes(items, use_columns, convert), repeat)
+        # Peak memory of a separate, untimed run
+        tracemalloc.start()
+        build_dataframes(items, use_columns, convert)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"  {label + ':':17} {best:.3f} s, peak {peak/10**6:.1f} MB")
+    # Missing bools are NaN in a DataFrame from dicts, NA with columns
+    for key, df in results['columns'].items():
+        pd.testing.assert_frame_equal(
+            df, results['list of dicts'][key].astype(df.dtypes.to_dict()))
+        pd.testing.assert_frame_equal(df, results['columns, parsed'][key])
+
+
+parser = argparse.ArgumentParser(
+    description="Benchmark ETL extraction of board game xml data.",
+    formatter_class=argparse.ArgumentDefaultsHelpFormatter
+)
+
+parser.add_argument(
+    '--xml-file',
+    dest='xml_file',
+    type=str,
+    default='test/test_data_single.xml',
+    help="Xml file whose items are extracted."
+)
+
+parser.add_argument(
+    '--items',
+    dest='n_items',
+    type=int,
+    default=5000,
+    help="Number of items to extract, cycling through the file's items."
+)
+
+parser.add_argument(
+    '--repeat',
+    dest='repeat',
+    type=int,
+    default=5,
+    help="Number of timed runs, the best is reported."
+)
+
+args = parser.parse_args()
+
+root = etl._read_xml_file(args.xml_file)
+file_items = [item for item in root if 'id' in item.attrib]
+items = [copy.deepcopy(file_items[i % len(file_items)])
+         for i in range(args.n_items)]
+
+benchmark_item_extractor(items, args.repeat)
+benchmark_column_accumulator(items, args.repeat)
+benchmark_projection(items, args.repeat)
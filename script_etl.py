@@ -1,4 +1,6 @@
 import argparse
+from pathlib import Path
+import pandas as pd
 from core import etl
 
 parser = argparse.ArgumentParser(
@@ -70,25 +72,183 @@ parser.add_argument(
     help="Omit gunzip compression of csv files."
 )
 
-args = parser.parse_args()
+parser.add_argument(
+    '--workers',
+    dest='workers',
+    type=int,
+    default=1,
+    help="Number of processes extracting xml files in parallel."
+)
+
+parser.add_argument(
+    '--incremental',
+    dest='incremental',
+    action='store_true',
+    default=False,
+    help="Write a parquet dataset folder per type of data, only extracting "
+         "xml files that are new or changed since the last run."
+)
+
+parser.add_argument(
+    '--normalize-links',
+    dest='normalize_links',
+    action='store_true',
+    default=False,
+    help="Write link entity values (category, mechanic, designer names, "
+         "etc.) once, in a link_entities lookup table, instead of on every "
+         "link."
+)
 
-dict_of_dfs = etl.flatten_xml_folder_to_dataframe(
-    args.read_xml_dir,
-    get_general_data=(not args.omit_general_data),
-    get_link_data=(not args.omit_link_data),
-    get_poll_data=(not args.omit_poll_data)
+parser.add_argument(
+    '--descriptions',
+    dest='descriptions',
+    choices=etl.DESCRIPTIONS_VALUES,
+    default='unescape',
+    help="Extract game descriptions html unescaped, raw (unescape later "
+         "with etl.unescape_descriptions), or skip them."
 )
 
-if args.output_csv:
-    etl.write_dataframes_to_csv(
-        dict_of_dataframes=dict_of_dfs,
+parser.add_argument(
+    '--split-descriptions',
+    dest='split_descriptions',
+    action='store_true',
+    default=False,
+    help="Write descriptions to their own description_data file instead "
+         "of in general data."
+)
+
+parser.add_argument(
+    '--columns',
+    dest='columns',
+    type=str,
+    default=None,
+    help="Comma separated general data columns to extract, e.g. "
+         "id,year_published,ratings_mean. Other fields aren't extracted."
+)
+
+parser.add_argument(
+    '--link-types',
+    dest='link_types',
+    type=str,
+    default=None,
+    help="Comma separated link types to extract, e.g. "
+         "boardgamemechanic,boardgamecategory. Other links are skipped."
+)
+
+parser.add_argument(
+    '--poll-names',
+    dest='poll_names',
+    type=str,
+    default=None,
+    help="Comma separated poll names to extract, e.g. "
+         "suggested_numplayers. Other polls are skipped."
+)
+
+parser.add_argument(
+    '--partitioned',
+    dest='partitioned',
+    action='store_true',
+    default=False,
+    help="Write a hive partitioned parquet dataset folder per type of "
+         "data, e.g. general data by year published bucket and link data "
+         "by type, sorted by id, so queries can skip partitions and row "
+         "groups."
+)
+
+parser.add_argument(
+    '--row-group-size',
+    dest='row_group_size',
+    type=int,
+    default=100_000,
+    help="Rows per row group of --partitioned datasets."
+)
+
+args = parser.parse_args()
+columns = None if args.columns is None else args.columns.split(',')
+try:
+    etl._check_columns(columns)
+except ValueError as e:
+    parser.error(str(e))
+link_types = None if args.link_types is None \
+    else args.link_types.split(',')
+poll_names = None if args.poll_names is None \
+    else args.poll_names.split(',')
+if args.incremental and args.output_csv:
+    parser.error("--incremental only writes parquet, not csv.")
+if args.incremental and args.normalize_links:
+    parser.error("--normalize-links can't be used with --incremental.")
+if args.partitioned and (args.output_csv or args.incremental):
+    parser.error("--partitioned can't be used with --output-csv or "
+                 "--incremental.")
+
+if args.incremental:
+    etl.update_xml_folder_parquet_dataset(
+        args.read_xml_dir,
         save_dir_path=args.output_dir,
         save_file_prefix=args.output_prefix,
-        compress_csv=(not args.omit_csv_compression)
+        get_general_data=(not args.omit_general_data),
+        get_link_data=(not args.omit_link_data),
+        get_poll_data=(not args.omit_poll_data),
+        workers=args.workers,
+        descriptions=args.descriptions,
+        split_descriptions=args.split_descriptions,
+        columns=columns,
+        link_types=link_types,
+        poll_names=poll_names
     )
+elif args.output_csv or args.partitioned:
+    dict_of_dfs = etl.flatten_xml_folder_to_dataframe(
+        args.read_xml_dir,
+        get_general_data=(not args.omit_general_data),
+        get_link_data=(not args.omit_link_data),
+        get_poll_data=(not args.omit_poll_data),
+        workers=args.workers,
+        descriptions=args.descriptions,
+        split_descriptions=args.split_descriptions,
+        columns=columns,
+        link_types=link_types,
+        poll_names=poll_names
+    )
+    if args.normalize_links and etl.KEY_LINK_DATA in dict_of_dfs:
+        dict_of_dfs.update(
+            etl.split_link_entities(dict_of_dfs[etl.KEY_LINK_DATA]))
+    if args.partitioned:
+        etl.write_dataframes_to_parquet_dataset(
+            dict_of_dataframes=dict_of_dfs,
+            save_dir_path=args.output_dir,
+            save_file_prefix=args.output_prefix,
+            row_group_size=args.row_group_size
+        )
+    else:
+        etl.write_dataframes_to_csv(
+            dict_of_dataframes=dict_of_dfs,
+            save_dir_path=args.output_dir,
+            save_file_prefix=args.output_prefix,
+            compress_csv=(not args.omit_csv_compression)
+        )
 else:
-    etl.write_dataframes_to_parquet(
-        dict_of_dataframes=dict_of_dfs,
+    # Parquet is written file by file, in constant memory
+    etl.write_xml_folder_to_parquet(
+        args.read_xml_dir,
         save_dir_path=args.output_dir,
-        save_file_prefix=args.output_prefix
+        save_file_prefix=args.output_prefix,
+        get_general_data=(not args.omit_general_data),
+        get_link_data=(not args.omit_link_data),
+        get_poll_data=(not args.omit_poll_data),
+        workers=args.workers,
+        descriptions=args.descriptions,
+        split_descriptions=args.split_descriptions,
+        columns=columns,
+        link_types=link_types,
+        poll_names=poll_names
     )
+    if args.normalize_links and not args.omit_link_data:
+        # Link data is small enough to split in memory, as its strings
+        # are categories.
+        link_path = Path(args.output_dir) / \
+            f"{args.output_prefix}_{etl.KEY_LINK_DATA}.parquet"
+        etl.write_dataframes_to_parquet(
+            etl.split_link_entities(pd.read_parquet(link_path)),
+            save_dir_path=args.output_dir,
+            save_file_prefix=args.output_prefix
+        )
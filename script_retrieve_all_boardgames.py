@@ -1,5 +1,7 @@
 import argparse
+from contextlib import nullcontext
 from core.bgg import Retriever
+from core.etl import ResponseExtractor
 
 
 # Use command line args to set retrieve_all() params
@@ -30,7 +32,16 @@ parser.add_argument(
     dest='batch_cooldown',
     type=int,
     default=5*60,
-    help="Number of seconds to cooldown wait between batches.")
+    help="Initial number of seconds to cooldown wait between batches."
+         " Shrinks towards --min-cooldown while batches succeed.")
+
+parser.add_argument(
+    '--min-cooldown',
+    metavar='',
+    dest='min_cooldown',
+    type=float,
+    default=1,
+    help="Min number of seconds to cooldown wait between batches.")
 
 parser.add_argument(
     '--server-cooldown',
@@ -38,8 +49,25 @@ parser.add_argument(
     dest='server_cooldown',
     type=int,
     default=3*60*60,
-    help="Number of seconds to cooldown wait"
-         " when encountering a server error.")
+    help="Max number of seconds to cooldown wait"
+         " when backing off from server errors.")
+
+parser.add_argument(
+    '--queued-retry-delay',
+    metavar='',
+    dest='queued_retry_delay',
+    type=float,
+    default=60,
+    help="Number of seconds to wait before requesting a batch"
+         " queued by the server again.")
+
+parser.add_argument(
+    '--queued-max-polls',
+    metavar='',
+    dest='queued_max_polls',
+    type=int,
+    default=5,
+    help="Max number of times to request a queued batch again in one run.")
 
 parser.add_argument(
     '--max-id',
@@ -47,7 +75,8 @@ parser.add_argument(
     dest='max_id',
     type=int,
     default=None,
-    help="Max 'thing' id to download up to."
+    help="Max 'thing' id to download up to. By default, the current max id "
+         "is discovered by probing the API."
 )
 
 parser.add_argument(
@@ -66,6 +95,110 @@ parser.add_argument(
     default=None,
     help="Random seed for id shuffling.")
 
+parser.add_argument(
+    '--workers',
+    metavar='',
+    dest='workers',
+    type=int,
+    default=1,
+    help="Number of batches to download concurrently."
+         " Values above 1 replace batch cooldowns with a rate limit."
+         " Without --rate, the limit is one request per batch cooldown,"
+         " so extra workers give no speed-up.")
+
+parser.add_argument(
+    '--rate',
+    metavar='',
+    dest='rate',
+    type=float,
+    default=None,
+    help="Max batch requests per second when downloading concurrently."
+         " Defaults to one request per batch cooldown.")
+
+parser.add_argument(
+    '--burst',
+    metavar='',
+    dest='burst',
+    type=int,
+    default=1,
+    help="Max number of batch requests in a burst above the rate.")
+
+parser.add_argument(
+    '--pool-size',
+    metavar='',
+    dest='pool_size',
+    type=int,
+    default=10,
+    help="Max number of keep-alive connections kept open to the server.")
+
+parser.add_argument(
+    '--timeout',
+    metavar='',
+    dest='read_timeout',
+    type=float,
+    default=120,
+    help="Seconds to wait for the server to send data.")
+
+parser.add_argument(
+    '--compression',
+    metavar='',
+    dest='compression',
+    choices=['gzip', 'zstd'],
+    default=None,
+    help="Store downloaded xml files compressed, with gzip or zstd "
+         "(zstd requires the zstandard package).")
+
+parser.add_argument(
+    '--id-index',
+    metavar='',
+    dest='id_index',
+    type=str,
+    default=None,
+    help="Id index (id_index.bin) from the save dir of a previous crawl. "
+         "Ids it knows to be empty are not requested.")
+
+parser.add_argument(
+    '--refresh-from',
+    metavar='',
+    dest='refresh_from',
+    type=str,
+    default=None,
+    help="Refresh a previous crawl: general data parquet file extracted from "
+         "it. Only its base games and ids above its max id are requested.")
+
+parser.add_argument(
+    '--previous-save-dir',
+    metavar='',
+    dest='previous_save_dir',
+    type=str,
+    default=None,
+    help="With --refresh-from, save dir of the previous crawl, used to "
+         "request the stalest games first.")
+
+parser.add_argument(
+    '--extract-to',
+    metavar='',
+    dest='extract_to',
+    type=str,
+    default=None,
+    help="Extract batches to parquet datasets in this folder as they are "
+         "downloaded, instead of running script_etl.py afterwards.")
+
+parser.add_argument(
+    '--extract-prefix',
+    metavar='',
+    dest='extract_prefix',
+    type=str,
+    default='bgg',
+    help="With --extract-to, prefix for the dataset folders.")
+
+parser.add_argument(
+    '--no-archive-xml',
+    dest='archive_xml',
+    action='store_false',
+    default=True,
+    help="With --extract-to, don't save the downloaded xml files.")
+
 parser.add_argument(
     '--clear-progress',
     dest='clear_progress',
@@ -76,16 +209,51 @@ parser.add_argument(
 
 args = parser.parse_args()
 
-retriever = Retriever(args.save_dir)
+if args.extract_to is None and not args.archive_xml:
+    parser.error("--no-archive-xml requires --extract-to.")
+extractor = None
+if args.extract_to is not None:
+    extractor = ResponseExtractor(args.extract_to, args.extract_prefix)
+
+retriever = Retriever(
+    args.save_dir,
+    pool_size=args.pool_size,
+    read_timeout=args.read_timeout,
+    compression=args.compression,
+    extractor=extractor,
+    archive_xml=args.archive_xml
+)
 
 if args.clear_progress:
     retriever.remove_progress_file()
 
-retriever.retrieve_all(
+retrieve_kwargs = dict(
     batch_size=args.batch_size,
     batch_cooldown=args.batch_cooldown,
     server_cooldown=args.server_cooldown,
-    max_id=args.max_id,
-    shuffle=not args.shuffle,
-    random_seed=args.random_seed
+    min_cooldown=args.min_cooldown,
+    queued_retry_delay=args.queued_retry_delay,
+    queued_max_polls=args.queued_max_polls,
+    workers=args.workers,
+    rate=args.rate,
+    burst=args.burst
 )
+
+# Extraction of downloaded batches is finished before exiting,
+# even if the crawl is interrupted.
+with extractor or nullcontext():
+    if args.refresh_from is not None:
+        retriever.refresh(
+            args.refresh_from,
+            previous_save_dir=args.previous_save_dir,
+            max_id=args.max_id,
+            **retrieve_kwargs
+        )
+    else:
+        retriever.retrieve_all(
+            max_id=args.max_id,
+            shuffle=not args.shuffle,
+            random_seed=args.random_seed,
+            id_index_path=args.id_index,
+            **retrieve_kwargs
+        )
@@ -1,5 +1,9 @@
+import gzip
 import core.etl as etl
 import lxml.etree as etree
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
 from pathlib import Path
 from html import unescape
 
@@ -53,6 +57,34 @@ def test_read_xml_file(file_path=GLOBAL_TEST_DATA_FILEPATH):
     assert root.attrib.keys()[0] == 'termsofuse'
 
 
+def test_read_compressed_xml_file(tmp_path):
+    xml_data = Path(GLOBAL_TEST_DATA_FILEPATH).read_bytes()
+    gz_path = tmp_path / 'test_data.xml.gz'
+    gz_path.write_bytes(gzip.compress(xml_data))
+    assert etree.tostring(etl._read_xml_file(gz_path)) == \
+        etree.tostring(etl._read_xml_file(GLOBAL_TEST_DATA_FILEPATH))
+    # Compressed files in a folder are picked up too
+    gz_path.unlink()
+    single_gz_path = tmp_path / 'test_data_single.xml.gz'
+    single_gz_path.write_bytes(gzip.compress(
+        Path(GLOBAL_TEST_DATA_SINGLE_FILEPATH).read_bytes()))
+    out = etl.flatten_xml_folder_to_dataframe(tmp_path)
+    assert out[etl.KEY_GENERAL_DATA]['id'].tolist() == \
+        [GLOBAL_TEST_DATA_SINGLE_VALUES['id']]
+
+
+# Test etl._iter_xml_items
+def test_iter_xml_items(file_path=GLOBAL_TEST_DATA_FILEPATH):
+    root = etl._read_xml_file(file_path)
+    expected = [etree.tostring(item) for item in root]
+    items = []
+    for item in etl._iter_xml_items(file_path):
+        items.append(etree.tostring(item))
+        # Items already yielded have been freed, bar the last (cleared) one
+        assert len(item.getparent()) <= 2
+    assert items == expected
+
+
 # Test etl.ItemExtractor.extract_general_data()
 def test_item_extractor_general_data():
     """Given a single item from an xml file, test field extraction."""
@@ -65,6 +97,159 @@ def test_item_extractor_general_data():
     out = ex.extract_general_data()
     for key in GLOBAL_TEST_DATA_SINGLE_VALUES.keys():
         assert out[key] == GLOBAL_TEST_DATA_SINGLE_VALUES[key]
+    # Fields come from the one table, also giving the column schema
+    assert tuple(out) == tuple(etl.ItemExtractor.GENERAL_DATA_FIELDS) == \
+        etl.COLUMNS[etl.KEY_GENERAL_DATA]
+    out = ex.extract_general_data(yearpublished_key='year')
+    assert out['year'] == GLOBAL_TEST_DATA_SINGLE_VALUES['year_published']
+    assert 'year_published' not in out
+    with pytest.raises(TypeError):
+        ex.extract_general_data(year_published_key='year')
+
+
+# Test deferred and split descriptions
+def test_descriptions(tmp_path, file_path=GLOBAL_TEST_DATA_SINGLE_FILEPATH):
+    item = etree.fromstring(Path(file_path).read_bytes())[0]
+    raw = etl.ItemExtractor(item, descriptions='raw')\
+        .extract_general_data()['description']
+    assert raw != GLOBAL_TEST_DATA_SINGLE_DESC
+    assert unescape(raw) == GLOBAL_TEST_DATA_SINGLE_DESC
+    assert 'description' not in etl.ItemExtractor(
+        item, descriptions='skip').extract_general_data()
+    with pytest.raises(ValueError):
+        etl.flatten_xml_file_to_dataframes(file_path, descriptions='html')
+
+    # Raw descriptions unescaped a column at a time
+    raw_dfs = etl.flatten_xml_file_to_dataframes(
+        file_path, descriptions='raw')
+    descriptions = pd.concat([raw_dfs[etl.KEY_GENERAL_DATA]['description'],
+                              pd.Series(['no escapes', None])])
+    unescaped = etl.unescape_descriptions(descriptions)
+    assert unescaped.iloc[:2].tolist() == \
+        [GLOBAL_TEST_DATA_SINGLE_DESC, 'no escapes']
+    assert pd.isna(unescaped.iloc[2])
+
+    # Split into their own table
+    split = etl.flatten_xml_file_to_dataframes(
+        file_path, split_descriptions=True)
+    assert 'description' not in split[etl.KEY_GENERAL_DATA]
+    assert split[etl.KEY_DESCRIPTION_DATA].to_dict('records') == [
+        {'boardgame_id': GLOBAL_TEST_DATA_SINGLE_VALUES['id'],
+         'description': GLOBAL_TEST_DATA_SINGLE_DESC}]
+    assert etl.KEY_DESCRIPTION_DATA not in etl.flatten_xml_file_to_dataframes(
+        file_path, descriptions='skip', split_descriptions=True)
+
+    # Parquet schemas follow, and changed options are extracted again
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    Path(xml_dir / '0.xml').write_bytes(Path(file_path).read_bytes())
+    etl.write_xml_folder_to_parquet(
+        xml_dir, tmp_path, 'test', descriptions='skip')
+    assert 'description' not in pq.read_schema(
+        tmp_path / f'test_{etl.KEY_GENERAL_DATA}.parquet').names
+    description_path = \
+        tmp_path / f'test_{etl.KEY_DESCRIPTION_DATA}' / '0.xml.parquet'
+    etl.update_xml_folder_parquet_dataset(xml_dir, tmp_path, 'test')
+    assert not description_path.exists()
+    etl.update_xml_folder_parquet_dataset(
+        xml_dir, tmp_path, 'test', split_descriptions=True)
+    assert pd.read_parquet(description_path)['description'].tolist() == \
+        [GLOBAL_TEST_DATA_SINGLE_DESC]
+    etl.update_xml_folder_parquet_dataset(xml_dir, tmp_path, 'test')
+    assert not description_path.exists()
+    assert pd.read_parquet(
+        tmp_path / f'test_{etl.KEY_GENERAL_DATA}')['description'].tolist() \
+        == [GLOBAL_TEST_DATA_SINGLE_DESC]
+
+
+# Test extracting only some general data columns
+def test_general_data_columns(
+        tmp_path, file_path=GLOBAL_TEST_DATA_SINGLE_FILEPATH):
+    item = etree.fromstring(Path(file_path).read_bytes())[0]
+    extract = etl.ItemExtractor.general_data_extractor(
+        etl.COLUMNS[etl.KEY_GENERAL_DATA])
+    assert extract(etl.ItemExtractor(item)) == \
+        etl.ItemExtractor(item).extract_general_data()
+    # Ratings aren't walked unless requested
+    extractor = etl.ItemExtractor(item)
+    extract = etl.ItemExtractor.general_data_extractor(['id', 'name'])
+    assert extract(extractor) == {'id': 28192, 'name': '1812: Caspara'}
+    assert extractor._ratings is None
+    with pytest.raises(ValueError):
+        etl.ItemExtractor.general_data_extractor(['id', 'rank'])
+
+    columns = ['ratings_mean', 'id', 'description']
+    df = etl.flatten_xml_file_to_dataframes(file_path, columns=columns)[
+        etl.KEY_GENERAL_DATA]
+    full_df = etl.flatten_xml_file_to_dataframes(file_path)[
+        etl.KEY_GENERAL_DATA]
+    pd.testing.assert_frame_equal(
+        df, full_df[['id', 'description', 'ratings_mean']])
+    with pytest.raises(ValueError):
+        etl.flatten_xml_file_to_dataframes(file_path, columns=['rank'])
+    # No description table without the description column
+    assert etl.KEY_DESCRIPTION_DATA not in etl.flatten_xml_file_to_dataframes(
+        file_path, split_descriptions=True, columns=['id'])
+
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    Path(xml_dir / '0.xml').write_bytes(Path(file_path).read_bytes())
+    etl.write_xml_folder_to_parquet(
+        xml_dir, tmp_path, 'test', split_descriptions=True, columns=columns)
+    assert pq.read_schema(
+        tmp_path / f'test_{etl.KEY_GENERAL_DATA}.parquet').names == \
+        ['id', 'ratings_mean']
+    # Changed columns are extracted again
+    etl.update_xml_folder_parquet_dataset(
+        xml_dir, tmp_path, 'test', columns=['id'])
+    dataset_path = tmp_path / f'test_{etl.KEY_GENERAL_DATA}'
+    assert pd.read_parquet(dataset_path).columns.tolist() == ['id']
+    etl.update_xml_folder_parquet_dataset(
+        xml_dir, tmp_path, 'test', columns=columns)
+    assert pd.read_parquet(dataset_path).columns.tolist() == \
+        ['id', 'description', 'ratings_mean']
+
+
+# Test filtering links and polls while extracting
+def test_link_and_poll_filters(
+        tmp_path, file_path=GLOBAL_TEST_DATA_SINGLE_FILEPATH):
+    item = etree.fromstring(Path(file_path).read_bytes())[0]
+    ex = etl.ItemExtractor(item)
+    links = ex.extract_link_data(
+        link_types=['boardgamecategory', 'boardgamemechanic'])
+    assert [link['value'] for link in links] == \
+        ['Napoleonic', 'Wargame', 'Hexagon Grid']
+    assert ex.extract_link_data(link_types=[]) == []
+    polls = ex.extract_poll_data(poll_names=['language_dependence'])
+    assert polls and polls == [
+        row for row in ex.extract_poll_data()
+        if row['poll_name'] == 'language_dependence']
+
+    link_types = ['boardgamefamily']
+    poll_names = ['suggested_numplayers']
+    full = etl.flatten_xml_file_to_dataframes(file_path)
+    filtered = etl.flatten_xml_file_to_dataframes(
+        file_path, link_types=link_types, poll_names=poll_names)
+    for key, column, values in [
+            (etl.KEY_LINK_DATA, 'type', link_types),
+            (etl.KEY_POLL_DATA, 'poll_name', poll_names)]:
+        # Columns only found in rows filtered out, e.g. result_level, go
+        expected = full[key][full[key][column].isin(values)]\
+            .dropna(axis=1, how='all').reset_index(drop=True)
+        pd.testing.assert_frame_equal(
+            filtered[key], expected, check_dtype=False,
+            check_categorical=False)
+
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    Path(xml_dir / '0.xml').write_bytes(Path(file_path).read_bytes())
+    etl.write_xml_folder_to_parquet(
+        xml_dir, tmp_path, 'test', link_types=link_types,
+        poll_names=poll_names)
+    assert pd.read_parquet(tmp_path / f'test_{etl.KEY_LINK_DATA}.parquet')[
+        'type'].astype(str).unique().tolist() == link_types
+    assert pd.read_parquet(tmp_path / f'test_{etl.KEY_POLL_DATA}.parquet')[
+        'poll_name'].astype(str).unique().tolist() == poll_names
 
 
 # Test etl.ItemExtract.extract_link_data()
@@ -108,19 +293,20 @@ def test_item_extraction_poll_data():
         'boardgame_id': 28192,
         'poll_name': "suggested_numplayers",
         'poll_title': "User Suggested Number of Players",
-        'poll_totalvotes': "3",
-        'results_numplayers': "1",
+        'poll_totalvotes': 3,
+        'results_numplayers': 1,
+        'results_numplayers_plus': False,
         'result_value': "Best",
-        'result_numvotes': "0"
+        'result_numvotes': 0
         }
     TEST_LAST_ENTRY = {
         'boardgame_id': 28192,
         'poll_name': "language_dependence",
         'poll_title': "Language Dependence",
-        'poll_totalvotes': "3",
-        'result_level': "5",
+        'poll_totalvotes': 3,
+        'result_level': 5,
         'result_value': "Unplayable in another language",
-        'result_numvotes': "0"
+        'result_numvotes': 0
         }
 
     # Single item
@@ -134,3 +320,318 @@ def test_item_extraction_poll_data():
     assert len(poll_results) == TEST_RESULTS_LENGTH
     assert poll_results[0] == TEST_FIRST_ENTRY  # compare dicts
     assert poll_results[-1] == TEST_LAST_ENTRY
+    # '2+' players
+    assert (poll_results[6]['results_numplayers'],
+            poll_results[6]['results_numplayers_plus']) == (2, True)
+
+
+# Test etl.type_poll_data
+def test_type_poll_data(file_path=GLOBAL_TEST_DATA_SINGLE_FILEPATH):
+    poll_data = etl.flatten_xml_file_to_dataframes(
+        file_path, get_general_data=False,
+        get_link_data=False)[etl.KEY_POLL_DATA]
+    # As poll data used to be extracted, all str's but the boardgame id
+    plus = poll_data.pop('results_numplayers_plus')
+    legacy = pd.DataFrame({
+        column: values.astype('int64') if column == 'boardgame_id'
+        else values.astype('Int64').astype(str).where(values.notna())
+        if column in etl.INT_COLUMNS[etl.KEY_POLL_DATA]
+        else values.astype(str)
+        for column, values in poll_data.items()})
+    legacy['results_numplayers'] += plus.map({True: '+', False: ''})
+    poll_data.insert(5, 'results_numplayers_plus', plus)
+
+    pd.testing.assert_frame_equal(etl.type_poll_data(legacy), poll_data,
+                                  check_categorical=False)
+
+
+# Test etl.flatten_xml_folder_to_dataframe() with worker processes
+def test_flatten_xml_folder_workers(tmp_path):
+    TEST_FILE_INDICES = [10, 2, 0, 1]
+    TEST_SINGLE_ID = GLOBAL_TEST_DATA_SINGLE_VALUES['id']
+
+    # Copies of the single item file, with the item id set to the file index
+    xml_data = Path(GLOBAL_TEST_DATA_SINGLE_FILEPATH).read_text()
+    for i in TEST_FILE_INDICES:
+        Path(tmp_path / f'{i}.xml').write_text(
+            xml_data.replace(f'id="{TEST_SINGLE_ID}"', f'id="{i}"', 1))
+
+    serial = etl.flatten_xml_folder_to_dataframe(tmp_path)
+    parallel = etl.flatten_xml_folder_to_dataframe(tmp_path, workers=2)
+    # Files are extracted in order of index
+    assert serial[etl.KEY_GENERAL_DATA]['id'].tolist() == \
+        sorted(TEST_FILE_INDICES)
+    for key in serial:
+        pd.testing.assert_frame_equal(serial[key], parallel[key])
+
+    # Omitted data is left out
+    out = etl.flatten_xml_folder_to_dataframe(
+        tmp_path, get_link_data=False, workers=2)
+    assert list(out) == [etl.KEY_GENERAL_DATA, etl.KEY_POLL_DATA]
+
+    # Datasets are only read when asked
+    datasets = etl.flatten_xml_folder_to_dataframe(tmp_path, as_dataset=True)
+    general_data = datasets[etl.KEY_GENERAL_DATA].to_table(
+        columns=['id', 'ratings_mean']).to_pandas()
+    pd.testing.assert_frame_equal(
+        general_data, serial[etl.KEY_GENERAL_DATA][['id', 'ratings_mean']])
+    assert datasets[etl.KEY_POLL_DATA].count_rows() == \
+        len(serial[etl.KEY_POLL_DATA])
+
+
+# Test dtypes of extracted DataFrames, and etl.split_link_entities
+def test_dtypes_and_link_entities(file_path=GLOBAL_TEST_DATA_SINGLE_FILEPATH):
+    out = etl.flatten_xml_file_to_dataframes(file_path)
+    link_data = out[etl.KEY_LINK_DATA]
+    poll_data = out[etl.KEY_POLL_DATA]
+    assert out[etl.KEY_GENERAL_DATA]['id'].dtype == 'int32'
+    assert link_data['boardgame_id'].dtype == 'int32'
+    assert link_data['link_id'].dtype == 'int32'
+    assert link_data['type'].dtype == 'category'
+    assert poll_data['result_value'].dtype == 'category'
+
+    # Links to the same entity share a lookup table row
+    link_data = pd.concat([link_data, link_data.assign(boardgame_id=1)],
+                          ignore_index=True)
+    split = etl.split_link_entities(link_data)
+    links = split[etl.KEY_LINK_DATA]
+    entities = split[etl.KEY_LINK_ENTITIES]
+    assert list(links.columns) == ['boardgame_id', 'type', 'link_id']
+    assert len(entities) == len(link_data) // 2
+    assert not entities.duplicated(['type', 'link_id']).any()
+    joined = links.merge(entities, on=['type', 'link_id'], how='left')
+    pd.testing.assert_frame_equal(
+        joined[list(link_data.columns)], link_data, check_categorical=False)
+
+
+# Test etl.ColumnAccumulator with numeric strings
+def test_column_accumulator_parses_strings():
+    # Values at or near a half once scaled, where np.round and round() can
+    # disagree
+    TEST_FLOATS = ['6.6375', '0.0005', '2.675', '1.0015', '7.12345', '0.15',
+                   '8.999999', '3', '5.55555']
+    columns = etl.ColumnAccumulator(
+        int_columns=('n',), float_columns=('mean', 'median'),
+        round_columns={'mean': 3, 'median': 1})
+    columns.extend([{'n': str(i), 'mean': v, 'median': v}
+                    for i, v in enumerate(TEST_FLOATS)])
+    columns.append({'n': None, 'mean': None})
+    out = columns.to_columns()
+    assert out['n'][:-1].tolist() == list(range(len(TEST_FLOATS)))
+    assert out['mean'][:-1].tolist() == [round(float(v), 3)
+                                         for v in TEST_FLOATS]
+    assert out['median'][:-1].tolist() == [round(float(v), 1)
+                                           for v in TEST_FLOATS]
+    assert pd.isna(out['n'][-1]) and pd.isna(out['mean'][-1])
+
+    # Extracting strings and converting them as columns gives the same data
+    root = etl._read_xml_file(GLOBAL_TEST_DATA_SINGLE_FILEPATH)
+    for key, method in [(etl.KEY_GENERAL_DATA, 'extract_general_data'),
+                        (etl.KEY_LINK_DATA, 'extract_link_data'),
+                        (etl.KEY_POLL_DATA, 'extract_poll_data')]:
+        converted = etl._make_accumulators([key])[key]
+        parsed = etl._make_accumulators([key])[key]
+        for columns, extractor in [
+                (converted, etl.ItemExtractor(root[0])),
+                (parsed, etl.ItemExtractor(root[0], convert=False))]:
+            data = getattr(extractor, method)()
+            if isinstance(data, dict):
+                columns.append(data)
+            else:
+                columns.extend(data)
+        pd.testing.assert_frame_equal(parsed.to_dataframe(),
+                                      converted.to_dataframe())
+
+
+# Test etl.write_xml_folder_to_parquet
+def test_write_xml_folder_to_parquet(tmp_path):
+    TEST_FILE_INDICES = [2, 0, 1]
+    TEST_SINGLE_ID = GLOBAL_TEST_DATA_SINGLE_VALUES['id']
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    xml_data = Path(GLOBAL_TEST_DATA_SINGLE_FILEPATH).read_text()
+    for i in TEST_FILE_INDICES:
+        Path(xml_dir / f'{i}.xml').write_text(
+            xml_data.replace(f'id="{TEST_SINGLE_ID}"', f'id="{i}"', 1))
+
+    expected = etl.flatten_xml_folder_to_dataframe(xml_dir)
+    for workers in [1, 2]:
+        etl.write_xml_folder_to_parquet(
+            xml_dir, tmp_path, 'test', workers=workers)
+        for key, df in expected.items():
+            parquet_path = tmp_path / f'test_{key}.parquet'
+            # One row group per xml file
+            assert pq.ParquetFile(parquet_path).num_row_groups == \
+                len(TEST_FILE_INDICES)
+            # Nullable bools are read back as objects
+            out = pd.read_parquet(parquet_path).astype(df.dtypes.to_dict())
+            pd.testing.assert_frame_equal(out, df, check_categorical=False)
+
+    # Schema is fixed, and extra columns aren't silently dropped
+    columns = etl.ColumnAccumulator(etl.INT_COLUMNS[etl.KEY_LINK_DATA], ())
+    columns.append({'boardgame_id': 1, 'inbound': 'true'})
+    with pytest.raises(ValueError):
+        columns.to_arrow(etl.arrow_schema(etl.KEY_LINK_DATA))
+    columns = etl.ColumnAccumulator(etl.INT_COLUMNS[etl.KEY_LINK_DATA], ())
+    columns.append({'boardgame_id': 1})
+    table = columns.to_arrow(etl.arrow_schema(etl.KEY_LINK_DATA))
+    assert table.schema == etl.arrow_schema(etl.KEY_LINK_DATA)
+    assert table.column('link_id').null_count == 1
+
+
+# Test etl.write_dataframes_to_parquet_dataset
+def test_write_dataframes_to_parquet_dataset(tmp_path):
+    TEST_IDS_YEARS = [(5, 1989), (3, 1995), (9, 2001), (1, 1990)]
+    TEST_SINGLE_ID = GLOBAL_TEST_DATA_SINGLE_VALUES['id']
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    xml_data = Path(GLOBAL_TEST_DATA_SINGLE_FILEPATH).read_text()
+    for i, (id, year) in enumerate(TEST_IDS_YEARS):
+        Path(xml_dir / f'{i}.xml').write_text(
+            xml_data.replace(f'id="{TEST_SINGLE_ID}"', f'id="{id}"', 1)
+            .replace('yearpublished value="1989"',
+                     f'yearpublished value="{year}"'))
+    dfs = etl.flatten_xml_folder_to_dataframe(xml_dir)
+    # Rewriting replaces the partitions
+    for _ in range(2):
+        etl.write_dataframes_to_parquet_dataset(
+            dfs, tmp_path, 'test', row_group_size=2)
+
+    general_path = tmp_path / f'test_{etl.KEY_GENERAL_DATA}'
+    assert sorted(path.name for path in general_path.iterdir()) == [
+        'year_published_bucket=1980', 'year_published_bucket=1990',
+        'year_published_bucket=2000']
+    general_data = pd.read_parquet(general_path)
+    assert general_data['id'].tolist() == [5, 1, 3, 9]
+    pd.testing.assert_frame_equal(
+        general_data.drop(columns=etl.YEAR_BUCKET_COLUMN)
+        .sort_values('id').reset_index(drop=True),
+        dfs[etl.KEY_GENERAL_DATA].sort_values('id').reset_index(drop=True),
+        check_like=True, check_dtype=False)
+    # Sorted by id, with statistics, in row groups of 2
+    metadata = pq.ParquetFile(
+        general_path / 'year_published_bucket=1990' / 'part-0.parquet')\
+        .metadata
+    assert metadata.num_row_groups == 1
+    statistics = metadata.row_group(0).column(0).statistics
+    assert (statistics.min, statistics.max) == (1, 3)
+    metadata = pq.ParquetFile(
+        tmp_path / f'test_{etl.KEY_POLL_DATA}'
+        / 'poll_name=suggested_numplayers' / 'part-0.parquet').metadata
+    assert metadata.num_row_groups == len(TEST_IDS_YEARS) * 9 // 2
+
+    # Partitions are pruned by filters
+    links = pd.read_parquet(
+        tmp_path / f'test_{etl.KEY_LINK_DATA}',
+        filters=[('type', '==', 'boardgamemechanic')])
+    assert links['boardgame_id'].tolist() == [1, 3, 5, 9]
+    assert links['value'].astype(str).unique().tolist() == ['Hexagon Grid']
+
+    with pytest.raises(ValueError):
+        etl.write_dataframes_to_parquet_dataset(
+            dfs, tmp_path, 'test', row_group_size=0)
+
+
+# Test etl.update_xml_folder_parquet_dataset
+def test_update_xml_folder_parquet_dataset(tmp_path, monkeypatch):
+    TEST_SINGLE_ID = GLOBAL_TEST_DATA_SINGLE_VALUES['id']
+    xml_dir = tmp_path / 'xml'
+    xml_dir.mkdir()
+    xml_data = Path(GLOBAL_TEST_DATA_SINGLE_FILEPATH).read_text()
+
+    def write_xml(i, id):
+        Path(xml_dir / f'{i}.xml').write_text(
+            xml_data.replace(f'id="{TEST_SINGLE_ID}"', f'id="{id}"', 1))
+
+    def read_ids():
+        return sorted(pd.read_parquet(
+            tmp_path / f'test_{etl.KEY_GENERAL_DATA}')['id'].tolist())
+
+    extracted = []
+    extract = etl._extract_file_buffers
+    monkeypatch.setattr(
+        etl, '_extract_file_buffers',
+        lambda file_path, keys, **kwargs: extracted.append(file_path.name)
+        or extract(file_path, keys, **kwargs))
+
+    for i in range(3):
+        write_xml(i, i)
+    etl.update_xml_folder_parquet_dataset(xml_dir, tmp_path, 'test')
+    assert sorted(extracted) == ['0.xml', '1.xml', '2.xml']
+    assert read_ids() == [0, 1, 2]
+    expected = etl.flatten_xml_file_to_dataframes(xml_dir / '0.xml')
+    for key, df in expected.items():
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(tmp_path / f'test_{key}' / '0.xml.parquet')
+            .astype(df.dtypes.to_dict()), df,
+            check_dtype=False, check_categorical=False)
+
+    # Only new or changed files are extracted, and gone files are dropped
+    extracted.clear()
+    write_xml(1, 10)
+    write_xml(3, 3)
+    (xml_dir / '2.xml').unlink()
+    # Rewritten with the same content
+    write_xml(0, 0)
+    etl.update_xml_folder_parquet_dataset(xml_dir, tmp_path, 'test')
+    assert sorted(extracted) == ['1.xml', '3.xml']
+    assert read_ids() == [0, 3, 10]
+
+    extracted.clear()
+    etl.update_xml_folder_parquet_dataset(xml_dir, tmp_path, 'test')
+    assert extracted == []
+    manifest = etl.EtlManifest.load(tmp_path / 'test_manifest.json')
+    assert sorted(manifest.entries) == ['0.xml', '1.xml', '3.xml']
+    assert manifest.entries['3.xml']['rows'][etl.KEY_GENERAL_DATA] == 1
+
+    # A run with new options failing partway leaves no partitions from the
+    # old options, and the next run extracts the rest
+    def fail_on_3(file_path, keys, **kwargs):
+        if file_path.name == '3.xml':
+            raise RuntimeError
+        return extract(file_path, keys, **kwargs)
+    monkeypatch.setattr(etl, '_extract_file_buffers', fail_on_3)
+    with pytest.raises(RuntimeError):
+        etl.update_xml_folder_parquet_dataset(
+            xml_dir, tmp_path, 'test', columns=['id'])
+    for key in [etl.KEY_GENERAL_DATA, etl.KEY_LINK_DATA, etl.KEY_POLL_DATA]:
+        assert sorted(p.name for p in (tmp_path / f'test_{key}').iterdir()) \
+            == ['0.xml.parquet', '1.xml.parquet']
+    assert pd.read_parquet(
+        tmp_path / f'test_{etl.KEY_GENERAL_DATA}').columns.tolist() == ['id']
+    monkeypatch.setattr(etl, '_extract_file_buffers', extract)
+    etl.update_xml_folder_parquet_dataset(
+        xml_dir, tmp_path, 'test', columns=['id'])
+    assert read_ids() == [0, 3, 10]
+
+
+# Test etl.ColumnAccumulator
+def test_column_accumulator():
+    columns = etl.ColumnAccumulator(int_columns=('id', 'year'),
+                                    float_columns=('rating',))
+    columns.append({'id': 1, 'year': 2000, 'rating': 7.5})
+    columns.append({'id': 2, 'name': 'Game'})
+    columns.extend([{'id': 3, 'year': 2010, 'rating': None}])
+
+    df = columns.to_dataframe()
+    expected = pd.DataFrame({'id': [1, 2, 3],
+                             'year': [2000, None, 2010],
+                             'rating': [7.5, None, None],
+                             'name': [None, 'Game', None]})
+    # Same as making a DataFrame from a list of dicts
+    pd.testing.assert_frame_equal(df, expected)
+    assert df['id'].dtype == 'int64'
+
+    # Merging buffers of another accumulator, with different columns
+    other = etl.ColumnAccumulator(int_columns=('id', 'year'))
+    other.append({'id': 4, 'year': 2020, 'designer': 'Someone'})
+    columns = etl.ColumnAccumulator(int_columns=('id', 'year'),
+                                    float_columns=('rating',))
+    columns.append({'id': 1, 'year': 2000, 'rating': 7.5})
+    columns.extend_buffers(*other.to_buffers())
+    pd.testing.assert_frame_equal(
+        columns.to_dataframe(),
+        pd.DataFrame({'id': [1, 4],
+                      'year': [2000, 2020],
+                      'rating': [7.5, None],
+                      'designer': [None, 'Someone']}))
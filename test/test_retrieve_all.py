@@ -1,29 +1,84 @@
 import requests
 import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from math import ceil
 from pathlib import Path
 from itertools import cycle
+from time import monotonic, sleep
+import threading
 
-from core.bgg import Retriever
+import lxml.etree as etree
+import pandas as pd
+import pytest
+
+import core.etl as etl
+from core.compression import open_compressed
+from core.bgg import (
+    AdaptiveCooldown, BatchQueue, IdIndex, ItemIdParser, Retriever,
+    TokenBucket, _permute)
 
 
 class MockResponse:
     """Mock of requests.Response"""
-    def __init__(self, status_code: int, text: str):
+    def __init__(self, status_code: int, text: str, headers: dict = None):
         """Init MockResponse with desired values.
 
         Args:
             status_code (int): mocking requests.Response.status_code.
             text (str): mocking requests.Response.text. Will also be
                 converted to a bytes object mocking requests.Response.content.
+            headers (dict, optional): mocking requests.Response.headers.
+                Defaults to None, i.e. no headers.
         """
         self.status_code = status_code
         self.text = text
         self.content = bytes(text, encoding='utf-8')
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size: int = 1):
+        """Mock requests.Response.iter_content, yielding self.content."""
+        for i in range(0, len(self.content), chunk_size):
+            yield self.content[i:i + chunk_size]
+
+    def close(self) -> None:
+        pass
+
+
+def patch_session_get(monkeypatch, get_response) -> None:
+    """Patch requests.Session.get to return get_response(uri)."""
+    monkeypatch.setattr(
+        requests.Session, 'get',
+        lambda session, uri, **kwargs: get_response(uri))
+
+
+class ConcurrencyTrackingServer:
+    """Mock server that tracks calls in flight at the same time.
+
+    Responds with the given status codes in order, then 200 for the rest.
+    Each response takes `latency` seconds.
+    """
+    def __init__(self, status_codes: list = None, latency: float = 0.1):
+        self.status_codes = list(status_codes or [])
+        self.latency = latency
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.call_times = []
+        self._lock = threading.Lock()
+
+    def get_response(self, uri) -> MockResponse:
+        with self._lock:
+            self.call_times.append(monotonic())
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            code = self.status_codes.pop(0) if self.status_codes else 200
+        sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return MockResponse(code, 'RESPONSE')
 
 
 class MockServer:
-    """Use MockServer.get_response as monkeypatch for requests.get"""
+    """Use MockServer.get_response with patch_session_get"""
     def __init__(self) -> None:
         # This is a cyclic iterator that will
         # yield items in a loop when calling next() on it
@@ -59,7 +114,7 @@ def test_retrieve_all_progress(monkeypatch, tmp_path):
 
     # Patch out requests.get
     server = MockServer()
-    monkeypatch.setattr(requests, 'get', server.get_response)
+    patch_session_get(monkeypatch, server.get_response)
 
     # Run retrieve all, but with a smaller max id,
     # so a smaller amount of items are returned.
@@ -70,24 +125,719 @@ def test_retrieve_all_progress(monkeypatch, tmp_path):
         random_seed=TEST_RANDOM_SEED,
         max_id=TEST_MAX_ID,
         batch_cooldown=TEST_BATCH_COOLDOWN,
-        server_cooldown=TEST_SERVER_COOLDOWN
+        server_cooldown=TEST_SERVER_COOLDOWN,
+        # Leave queued batches queued
+        queued_max_polls=0
     )
 
     # Reload from the progress file for testing
     progress_path = Path(retriever.progress_path)
     progress = json.loads(progress_path.read_text())
+    batches = progress[retriever.PROGRESS_KEY_BATCHES]
     # Test the number of batches
-    assert len(progress) == ceil(TEST_MAX_ID/TEST_BATCH_SIZE)
+    assert len(batches) == ceil(TEST_MAX_ID/TEST_BATCH_SIZE)
     # Test the first batch ids
-    assert progress[0][retriever.PROGRESS_KEY_IDS] == [4, 11]
+    assert retriever._batch_ids(progress, 0) == [8, 5]
     # Test the last batch ids
-    assert progress[-1][retriever.PROGRESS_KEY_IDS] == [6]
+    assert retriever._batch_ids(progress, len(batches) - 1) == [12]
     # Test all status are correct
     correct_statuses = [
         'complete', 'queued', 'incomplete',
         'incomplete', 'incomplete', 'incomplete', 'complete']
-    test_statuses = [e[retriever.PROGRESS_KEY_STATUS] for e in progress]
+    test_statuses = [e[retriever.PROGRESS_KEY_STATUS] for e in batches]
     assert test_statuses == correct_statuses
 
     # Print the progress object for convenience in inspection
     print(progress)
+
+
+def test_retrieve_all_concurrent(monkeypatch, tmp_path):
+    TEST_BATCH_SIZE = 2
+    TEST_MAX_ID = 13
+    TEST_WORKERS = 3
+    TEST_RATE = 50
+    TEST_BURST = 3
+
+    # Every request succeeds
+    server = ConcurrencyTrackingServer()
+    patch_session_get(monkeypatch, server.get_response)
+
+    retriever = Retriever(save_dir=tmp_path)
+    retriever.retrieve_all(
+        batch_size=TEST_BATCH_SIZE,
+        max_id=TEST_MAX_ID,
+        workers=TEST_WORKERS,
+        rate=TEST_RATE,
+        burst=TEST_BURST
+    )
+
+    progress = json.loads(Path(retriever.progress_path).read_text())
+    batches = progress[retriever.PROGRESS_KEY_BATCHES]
+    n_batches = ceil(TEST_MAX_ID/TEST_BATCH_SIZE)
+    # All batches should be complete, with every id present once.
+    assert len(batches) == n_batches
+    assert all(
+        e[retriever.PROGRESS_KEY_STATUS] == 'complete' for e in batches)
+    ids = sorted(i for idx in range(n_batches)
+                 for i in retriever._batch_ids(progress, idx))
+    assert ids == list(range(1, TEST_MAX_ID + 1))
+    # One xml file per batch
+    assert len(list(Path(retriever.xml_dir).glob('*.xml'))) == n_batches
+    # Batches were actually in flight at the same time
+    assert server.peak_in_flight > 1
+
+
+def test_retrieve_all_concurrent_server_error_pauses(monkeypatch, tmp_path):
+    TEST_BATCH_SIZE = 2
+    TEST_MAX_ID = 12
+    TEST_WORKERS = 3
+    TEST_RATE = 50
+    TEST_SERVER_COOLDOWN = 1
+
+    # First request gets a server error, the rest succeed
+    server = ConcurrencyTrackingServer(status_codes=[503])
+    patch_session_get(monkeypatch, server.get_response)
+    # Record when the limiter gets paused
+    pauses = []
+    original_pause = TokenBucket.pause
+
+    def recording_pause(self, seconds):
+        pauses.append((monotonic(), seconds))
+        original_pause(self, seconds)
+    monkeypatch.setattr(TokenBucket, 'pause', recording_pause)
+
+    retriever = Retriever(save_dir=tmp_path)
+    retriever.retrieve_all(
+        batch_size=TEST_BATCH_SIZE,
+        max_id=TEST_MAX_ID,
+        workers=TEST_WORKERS,
+        rate=TEST_RATE,
+        server_cooldown=TEST_SERVER_COOLDOWN
+    )
+
+    assert len(pauses) == 1
+    pause_time, seconds = pauses[0]
+    assert seconds == TEST_SERVER_COOLDOWN
+    # No worker starts a request during the pause,
+    # and requests do resume afterwards.
+    later_calls = [t for t in server.call_times if t > pause_time]
+    assert later_calls
+    assert all(t >= pause_time + TEST_SERVER_COOLDOWN * 0.95
+               for t in later_calls)
+
+
+def test_retrieve_all_concurrent_interrupt(monkeypatch, tmp_path):
+    TEST_BATCH_SIZE = 2
+    TEST_MAX_ID = 12
+    TEST_WORKERS = 3
+    # Slow enough that waiting workers would block for a long time
+    TEST_RATE = 0.1
+    TEST_BURST = 2
+    TEST_MAX_SHUTDOWN_TIME = 5
+
+    calls = []
+
+    def interrupting_get(uri):
+        calls.append(uri)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        return MockResponse(200, 'DOWNLOADED')
+    patch_session_get(monkeypatch, interrupting_get)
+
+    retriever = Retriever(save_dir=tmp_path)
+    start = monotonic()
+    with pytest.raises(KeyboardInterrupt):
+        retriever.retrieve_all(
+            batch_size=TEST_BATCH_SIZE,
+            max_id=TEST_MAX_ID,
+            workers=TEST_WORKERS,
+            rate=TEST_RATE,
+            burst=TEST_BURST
+        )
+    # Workers waiting on the limiter are cancelled, not left to wait
+    assert monotonic() - start < TEST_MAX_SHUTDOWN_TIME
+    assert len(calls) == TEST_BURST
+    # The progress file is left readable and resumable
+    progress = json.loads(Path(retriever.progress_path).read_text())
+    statuses = [e[retriever.PROGRESS_KEY_STATUS]
+                for e in progress[retriever.PROGRESS_KEY_BATCHES]]
+    assert statuses.count('complete') == 1
+
+
+def test_token_bucket_rate():
+    TEST_RATE = 20
+    TEST_BURST = 5
+    TEST_REQUESTS = 15
+
+    bucket = TokenBucket(TEST_RATE, TEST_BURST)
+    start = monotonic()
+    for _ in range(TEST_REQUESTS):
+        assert bucket.acquire()
+    elapsed = monotonic() - start
+    # The burst is free, the remainder is limited by the rate.
+    assert elapsed >= (TEST_REQUESTS - TEST_BURST) / TEST_RATE * 0.9
+
+
+def test_token_bucket_pause_does_not_refill():
+    TEST_RATE = 20
+    TEST_BURST = 5
+    TEST_PAUSE = 0.5
+
+    bucket = TokenBucket(TEST_RATE, TEST_BURST)
+    bucket.pause(TEST_PAUSE)
+    start = monotonic()
+    assert bucket.acquire()
+    assert bucket.acquire()
+    elapsed = monotonic() - start
+    # The first token arrives one refill after the pause ends, and the
+    # second one refill later, rather than both at once as a burst.
+    assert elapsed >= TEST_PAUSE + 2 / TEST_RATE * 0.9
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """Serves a fixed body over HTTP/1.1 so connections are kept alive."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'<items></items>'
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_keep_alive_server() -> ThreadingHTTPServer:
+    """Start a local keep-alive server in a background thread."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop_server(server: ThreadingHTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+
+
+def test_session_reuses_connections(tmp_path):
+    TEST_REQUESTS = 3
+
+    server = start_keep_alive_server()
+    try:
+        retriever = Retriever(save_dir=tmp_path)
+        uri = f"http://127.0.0.1:{server.server_port}/"
+        for _ in range(TEST_REQUESTS):
+            r = retriever.api_request(uri)
+            assert r.status_code == 200
+            # Reading the streamed body releases the connection
+            assert r.content == b'<items></items>'
+    finally:
+        stop_server(server)
+
+    # One handshake, reused for the remaining requests
+    expected = {'requests': TEST_REQUESTS,
+                'connections': 1,
+                'reused': TEST_REQUESTS - 1}
+    assert retriever.connection_stats() == expected
+    # Counts are kept after the session's pools are closed
+    retriever.session.close()
+    assert retriever.connection_stats() == expected
+
+
+def test_connection_stats_after_pool_eviction(tmp_path):
+    server_a = start_keep_alive_server()
+    server_b = start_keep_alive_server()
+    try:
+        retriever = Retriever(save_dir=tmp_path)
+        # Only one per-host pool is kept, so requesting the second
+        # server evicts the first server's pool.
+        for port in [server_a.server_port,
+                     server_a.server_port,
+                     server_b.server_port]:
+            uri = f"http://127.0.0.1:{port}/"
+            r = retriever.api_request(uri)
+            assert r.status_code == 200
+            # Reading the streamed body releases the connection
+            assert r.content == b'<items></items>'
+    finally:
+        stop_server(server_a)
+        stop_server(server_b)
+
+    assert retriever.connection_stats() == {'requests': 3,
+                                            'connections': 2,
+                                            'reused': 1}
+
+
+@pytest.mark.parametrize('compression', [None, 'gzip', 'zstd'])
+def test_write_response_compressed(tmp_path, compression):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    TEST_TEXT = '<items>' + '<item id="1"></item>' * 10**4 + '</items>'
+
+    retriever = Retriever(save_dir=tmp_path, compression=compression)
+    retriever.WRITE_CHUNK_SIZE = 1000
+    suffix = {None: '', 'gzip': '.gz', 'zstd': '.zst'}[compression]
+    out_path = f"{retriever.xml_dir}/0.xml{suffix}"
+    n_bytes = retriever._write_response(
+        MockResponse(200, TEST_TEXT), out_path)
+
+    assert n_bytes == len(TEST_TEXT)
+    # Only the finished file is left behind
+    assert [p.name for p in Path(retriever.xml_dir).iterdir()] == \
+        [f"0.xml{suffix}"]
+    with open_compressed(out_path) as f:
+        assert f.read() == bytes(TEST_TEXT, encoding='utf-8')
+    if compression is not None:
+        assert Path(out_path).stat().st_size < n_bytes
+
+
+def test_item_id_parser(tmp_path):
+    TEST_TEXT = ('<items>' + '<item id="3"><link id="9"/></item>'
+                 + '<item id="5"></item>' * 10**4 + '</items>')
+    retriever = Retriever(save_dir=tmp_path)
+    retriever.WRITE_CHUNK_SIZE = 1000
+    item_id_parser = ItemIdParser()
+    retriever._write_response(
+        MockResponse(200, TEST_TEXT), f"{retriever.xml_dir}/0.xml",
+        item_id_parser)
+    # Ids of items only, collected from the chunks as they're written
+    assert item_id_parser.close() == [3] + [5] * 10**4
+
+    item_id_parser = ItemIdParser()
+    item_id_parser.feed(b'<items><item id="1"></items>')
+    assert item_id_parser.close() is None
+
+
+def test_adaptive_cooldown():
+    TEST_INITIAL = 10
+    TEST_MIN = 1
+    TEST_MAX = 100
+    TEST_RETRY_AFTER = 60
+
+    cooldown = AdaptiveCooldown(
+        initial_delay=TEST_INITIAL,
+        min_delay=TEST_MIN,
+        max_delay=TEST_MAX,
+        rate_increase=0.1,
+        jitter=0.1,
+        random_seed=7)
+    # Additive increase in rate while batches succeed, down to the min
+    assert cooldown.record(200) == 1 / (1 / TEST_INITIAL + 0.1)
+    for _ in range(100):
+        delay = cooldown.record(200)
+    assert delay == TEST_MIN
+    # Queued batches leave the cooldown alone
+    assert cooldown.record(202) == TEST_MIN
+    # Exponential backoff with jitter on errors
+    delays = [cooldown.record(code) for code in [429, 503, 500]]
+    for i, delay in enumerate(delays):
+        assert TEST_MIN * 2**(i + 1) * 0.9**(i + 1) <= delay
+        assert delay <= TEST_MIN * 2**(i + 1) * 1.1**(i + 1)
+    # Retry-After is honored if longer, but capped by the max
+    assert cooldown.record(429, TEST_RETRY_AFTER) == TEST_RETRY_AFTER
+    assert cooldown.record(429, TEST_MAX * 2) == TEST_MAX
+
+
+def test_retry_after(tmp_path):
+    retriever = Retriever(save_dir=tmp_path)
+    func = retriever._retry_after
+    assert func(MockResponse(429, '', {'Retry-After': '120'})) == 120
+    # HTTP dates in the past mean no wait
+    assert func(MockResponse(
+        503, '', {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0
+    assert func(MockResponse(502, 'try again in 30 seconds')) == 30
+    assert func(MockResponse(502, 'OTHER ERROR')) is None
+    assert func(MockResponse(503, '', {'Retry-After': 'soon'})) is None
+
+
+class QueueFirstServer:
+    """Mock server that queues each distinct request once, then serves it."""
+    def __init__(self) -> None:
+        self.seen = set()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def get_response(self, uri) -> MockResponse:
+        with self._lock:
+            self.calls.append(uri)
+            if uri in self.seen:
+                return MockResponse(200, 'DOWNLOADED')
+            self.seen.add(uri)
+            return MockResponse(202, 'QUEUED')
+
+
+def test_retrieve_all_repolls_queued(monkeypatch, tmp_path):
+    TEST_BATCH_SIZE = 2
+    TEST_MAX_ID = 4
+    TEST_COOLDOWN = 0.05
+    TEST_RETRY_DELAY = 0.2
+
+    server = QueueFirstServer()
+    patch_session_get(monkeypatch, server.get_response)
+
+    retriever = Retriever(save_dir=tmp_path)
+    retriever.retrieve_all(
+        batch_size=TEST_BATCH_SIZE,
+        max_id=TEST_MAX_ID,
+        shuffle=False,
+        batch_cooldown=TEST_COOLDOWN,
+        min_cooldown=TEST_COOLDOWN,
+        server_cooldown=TEST_COOLDOWN,
+        queued_retry_delay=TEST_RETRY_DELAY
+    )
+
+    # One run converges, with each batch requested twice.
+    batches = json.loads(Path(retriever.progress_path).read_text())[
+        retriever.PROGRESS_KEY_BATCHES]
+    assert [e[retriever.PROGRESS_KEY_STATUS] for e in batches] == \
+        ['complete', 'complete']
+    assert len(server.calls) == 2 * len(batches)
+
+
+def test_batch_queue_interleaves_repolls():
+    TEST_RETRY_DELAY = 0.2
+
+    batches = BatchQueue([0, 1, 2], retry_delay=TEST_RETRY_DELAY, max_polls=1)
+    assert batches.next() == 0
+    assert batches.requeue(0)
+    assert batches.next() == 1
+    # Ready re-polls go before fresh batches
+    sleep(TEST_RETRY_DELAY)
+    assert batches.next() == 0
+    # Used up its re-polls
+    assert not batches.requeue(0)
+    assert batches.next() == 2
+    assert batches.requeue(2)
+    # Blocks until the last re-poll is ready
+    start = monotonic()
+    assert batches.next() == 2
+    assert monotonic() - start >= TEST_RETRY_DELAY * 0.9
+    assert batches.next() is None
+
+
+def test_progress_journal_replay(tmp_path):
+    TEST_MAX_ID = 10
+    TEST_BATCH_SIZE = 2
+
+    retriever = Retriever(save_dir=tmp_path)
+    progress = retriever._create_progress_object(
+        {'kind': 'range', 'max_id': TEST_MAX_ID},
+        batch_size=TEST_BATCH_SIZE)
+    retriever._save_progress_file(progress)
+    snapshot = Path(retriever.progress_path).read_text()
+
+    # Batch updates are appended to the journal,
+    # leaving the progress file untouched.
+    for idx, status in [(0, 'complete'), (3, 'queued'), (3, 'complete')]:
+        progress['batches'][idx][retriever.PROGRESS_KEY_STATUS] = status
+        retriever._record_batch_progress(progress, idx)
+    assert Path(retriever.progress_path).read_text() == snapshot
+    journal_path = Path(retriever.journal_path)
+    assert len(journal_path.read_text().splitlines()) == 3
+
+    # A crash mid-append leaves a torn last line, which is ignored.
+    with open(journal_path, 'a') as f:
+        f.write('{"idx": 4, "sta')
+    loaded = retriever._load_progress_file()
+    assert [e[retriever.PROGRESS_KEY_STATUS] for e in loaded['batches']] == \
+        ['complete', 'incomplete', 'incomplete', 'complete', 'incomplete']
+
+    # Compacting rewrites the progress file and clears the journal.
+    retriever._save_progress_file(loaded)
+    assert not journal_path.exists()
+    assert retriever._load_progress_file() == loaded
+
+
+def test_progress_id_sources(tmp_path):
+    TEST_MAX_ID = 2_000_003
+    TEST_BATCH_SIZE = 500
+    TEST_SEED = 7
+
+    retriever = Retriever(save_dir=tmp_path)
+    n_batches = ceil(TEST_MAX_ID/TEST_BATCH_SIZE)
+    # Unshuffled batches are contiguous ranges
+    progress = retriever._create_progress_object(
+        {'kind': 'range', 'max_id': TEST_MAX_ID}, batch_size=TEST_BATCH_SIZE)
+    assert retriever._batch_ids(progress, 1) == list(range(501, 1001))
+    assert retriever._batch_ids(progress, n_batches - 1) == \
+        list(range(2_000_001, TEST_MAX_ID + 1))
+    # Shuffled batches are reproducible from the seed alone,
+    # and the progress file stays small.
+    progress = retriever._create_progress_object(
+        {'kind': 'shuffled', 'max_id': TEST_MAX_ID, 'seed': TEST_SEED},
+        batch_size=TEST_BATCH_SIZE)
+    retriever._save_progress_file(progress)
+    assert Path(retriever.progress_path).stat().st_size < 200_000
+    loaded = retriever._load_progress_file()
+    assert retriever._batch_ids(loaded, 3) == \
+        [_permute(i, TEST_MAX_ID, TEST_SEED) + 1
+         for i in range(3 * TEST_BATCH_SIZE, 4 * TEST_BATCH_SIZE)]
+
+
+def test_permute_is_a_permutation():
+    for n in [1, 2, 3, 13, 1000, 4097]:
+        assert sorted(_permute(i, n, 3) for i in range(n)) == list(range(n))
+    # Different seeds, different orders
+    assert [_permute(i, 1000, 1) for i in range(10)] != \
+        [_permute(i, 1000, 2) for i in range(10)]
+
+
+def test_refresh(monkeypatch, tmp_path):
+    TEST_PREVIOUS_MAX_ID = 8
+    TEST_MAX_ID = 10
+
+    # A previous crawl where batch 1 (ids 4-6) was accessed first,
+    # and batch 0 (ids 1-3) wasn't accessed at all.
+    previous_dir = tmp_path / 'previous'
+    previous_dir.mkdir()
+    previous = Retriever(save_dir=previous_dir)
+    progress = previous._create_progress_object(
+        {'kind': 'range', 'max_id': TEST_PREVIOUS_MAX_ID}, batch_size=3)
+    for idx, last_accessed in [(1, '2022-Sep-01 00:00:00.000000'),
+                               (2, '2022-Sep-02 00:00:00.000000')]:
+        progress['batches'][idx]['last_accessed'] = last_accessed
+    previous._save_progress_file(progress)
+    general_data_path = tmp_path / 'general_data.parquet'
+    pd.DataFrame({
+        'id': [1, 2, 4, 7, 8],
+        'type': ['boardgame', 'boardgameexpansion',
+                 'boardgame', 'boardgame', 'boardgame']
+        }).to_parquet(general_data_path)
+
+    patch_session_get(monkeypatch, lambda uri: MockResponse(200, 'DONE'))
+    refresh_dir = tmp_path / 'refresh'
+    refresh_dir.mkdir()
+    retriever = Retriever(save_dir=refresh_dir)
+    retriever.refresh(
+        general_data_path,
+        previous_save_dir=previous_dir,
+        max_id=TEST_MAX_ID,
+        batch_size=2,
+        batch_cooldown=0.01,
+        min_cooldown=0.01)
+
+    progress = retriever._load_progress_file()
+    ids = [i for idx in range(len(progress['batches']))
+           for i in retriever._batch_ids(progress, idx)]
+    # New ids first, then known base games, stalest first
+    assert ids == [9, 10, 1, 4, 7, 8]
+    assert all(batch['status'] == 'complete'
+               for batch in progress['batches'])
+
+
+def test_discover_max_id(monkeypatch, tmp_path):
+    TEST_MAX_ID = 400123
+    TEST_PROBE_SIZE = 50
+    # Unused ids, shorter than the probe size
+    TEST_GAP = range(390000, 390040)
+
+    requests_made = []
+
+    def get_response(uri):
+        requests_made.append(uri)
+        # The server queues the very first request
+        if len(requests_made) == 1:
+            return MockResponse(202, '')
+        ids = [int(i) for i in uri.split('id=')[1].split(',')]
+        items = ''.join(f'<item type="boardgame" id="{i}"/>' for i in ids
+                        if i <= TEST_MAX_ID and i not in TEST_GAP)
+        return MockResponse(200, f'<items>{items}</items>')
+    patch_session_get(monkeypatch, get_response)
+
+    retriever = Retriever(save_dir=tmp_path)
+    retriever.PROBE_COOLDOWN = 0
+    assert retriever.discover_max_id(probe_size=TEST_PROBE_SIZE) == \
+        TEST_MAX_ID
+    assert len(requests_made) < 40
+    # The result is cached
+    n_requests = len(requests_made)
+    assert retriever.discover_max_id(probe_size=TEST_PROBE_SIZE) == \
+        TEST_MAX_ID
+    assert len(requests_made) == n_requests
+
+
+def test_id_index_skips_known_empty_ids(monkeypatch, tmp_path):
+    TEST_FIRST_MAX_ID = 20
+    TEST_SECOND_MAX_ID = 24
+    requested = []
+
+    # Only even ids are board games
+    def get_response(uri):
+        ids = [int(i) for i in uri.split('id=')[1].split(',')]
+        requested.append(ids)
+        items = ''.join(f'<item type="boardgame" id="{i}"/>'
+                        for i in ids if i % 2 == 0)
+        return MockResponse(200, f'<items>{items}</items>')
+    patch_session_get(monkeypatch, get_response)
+    run_kwargs = dict(batch_size=5, batch_cooldown=0.01, min_cooldown=0.01)
+
+    first_dir = tmp_path / 'first'
+    first_dir.mkdir()
+    first = Retriever(save_dir=first_dir, compression='gzip')
+    first.retrieve_all(max_id=TEST_FIRST_MAX_ID, **run_kwargs)
+    index = IdIndex.load(first.id_index_path)
+    assert [i for i in range(1, TEST_SECOND_MAX_ID + 1)
+            if index.is_known_empty(i)] == list(range(1, 21, 2))
+
+    second_dir = tmp_path / 'second'
+    second_dir.mkdir()
+    second = Retriever(save_dir=second_dir)
+    requested.clear()
+    second.retrieve_all(
+        max_id=TEST_SECOND_MAX_ID,
+        id_index_path=first.id_index_path,
+        random_seed=7,
+        **run_kwargs)
+    # Known empty ids are skipped, ids never requested are kept
+    assert sorted(i for ids in requested for i in ids) == \
+        list(range(2, 21, 2)) + [21, 22, 23, 24]
+    assert [len(ids) for ids in requested] == [5, 5, 4]
+    # The seeded order is kept in the progress file, not the ids
+    progress = second._load_progress_file()
+    assert progress['id_source'] == {
+        'kind': 'shuffled', 'max_id': TEST_SECOND_MAX_ID, 'seed': 7}
+    assert len(progress['batch_bounds']) == 4
+    assert all(b['status'] == 'complete' for b in progress['batches'])
+
+    # Without a seed, the one used is recorded
+    third_dir = tmp_path / 'third'
+    third_dir.mkdir()
+    third = Retriever(save_dir=third_dir)
+    requested.clear()
+    third.retrieve_all(
+        max_id=TEST_SECOND_MAX_ID,
+        id_index_path=first.id_index_path,
+        **run_kwargs)
+    progress = third._load_progress_file()
+    assert isinstance(progress['id_source']['seed'], int)
+    # So the batches can be reproduced from the index they were made with
+    ids = [i for idx in range(len(progress['batches']))
+           for i in third._batch_ids(progress, idx, index)]
+    assert ids == [i for ids in requested for i in ids]
+
+
+def sorted_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """Sort a DataFrame by all its columns, categories as strings."""
+    # Categories sort in order of their categories, so as strings
+    df = df.astype({column: str for column in
+                    df.select_dtypes('category').columns})
+    return df.sort_values(list(df.columns), ignore_index=True)
+
+
+@pytest.mark.parametrize('archive_xml', [True, False])
+def test_retrieve_all_extractor(monkeypatch, tmp_path, archive_xml):
+    TEST_MAX_ID = 12
+    # An item per batch, with the id of the batch's first id
+    xml_data = Path('test/test_data_single.xml').read_text()
+    test_id = etree.fromstring(xml_data.encode())[0].get('id')
+
+    def get_response(uri):
+        first_id = uri.split('id=')[1].split(',')[0]
+        return MockResponse(200, xml_data.replace(
+            f'id="{test_id}"', f'id="{first_id}"', 1))
+    patch_session_get(monkeypatch, get_response)
+
+    out_dir = tmp_path / 'parquet'
+    out_dir.mkdir()
+    with etl.ResponseExtractor(out_dir, 'test') as extractor:
+        retriever = Retriever(
+            save_dir=tmp_path, compression='gzip',
+            extractor=extractor, archive_xml=archive_xml)
+        retriever.retrieve_all(
+            max_id=TEST_MAX_ID, batch_size=5, shuffle=False,
+            batch_cooldown=0.01, min_cooldown=0.01)
+
+    general_data = pd.read_parquet(out_dir / f'test_{etl.KEY_GENERAL_DATA}')
+    assert sorted(general_data['id']) == [1, 6, 11]
+    assert sorted(p.name for p in (out_dir / 'test_poll_data').iterdir()) \
+        == ['0.xml.parquet', '1.xml.parquet', '2.xml.parquet']
+    # The id index is still kept up to date
+    assert retriever.id_index.is_known_empty(2)
+    assert not retriever.id_index.is_known_empty(6)
+    xml_paths = sorted(Path(retriever.xml_dir).iterdir())
+    if not archive_xml:
+        assert xml_paths == []
+        return
+    # Same data as extracting the archived xml files
+    assert [p.name for p in xml_paths] == \
+        ['0.xml.gz', '1.xml.gz', '2.xml.gz']
+    expected = etl.flatten_xml_folder_to_dataframe(retriever.xml_dir)
+    for key, df in expected.items():
+        out = pd.read_parquet(out_dir / f'test_{key}')\
+            .astype(df.dtypes.to_dict())
+        pd.testing.assert_frame_equal(
+            sorted_rows(out), sorted_rows(df), check_dtype=False)
+
+
+def test_retrieve_all_extractor_resume(monkeypatch, tmp_path):
+    xml_data = Path('test/test_data_single.xml').read_text()
+    test_id = etree.fromstring(xml_data.encode())[0].get('id')
+    requested = []
+    broken = {'6'}
+
+    def get_response(uri):
+        first_id = uri.split('id=')[1].split(',')[0]
+        requested.append(int(first_id))
+        if first_id in broken:
+            # The first response for batch 1 can't be extracted
+            broken.remove(first_id)
+            return MockResponse(200, '<items><item id="6"></items>')
+        return MockResponse(200, xml_data.replace(
+            f'id="{test_id}"', f'id="{first_id}"', 1))
+    patch_session_get(monkeypatch, get_response)
+
+    out_dir = tmp_path / 'parquet'
+    out_dir.mkdir()
+    with etl.ResponseExtractor(out_dir, 'test') as extractor:
+        retriever = Retriever(
+            save_dir=tmp_path, extractor=extractor, archive_xml=False)
+        with pytest.raises(etree.XMLSyntaxError):
+            retriever.retrieve_all(
+                max_id=12, batch_size=5, shuffle=False,
+                batch_cooldown=0.01, min_cooldown=0.01)
+    progress = retriever._load_progress_file()
+    assert progress['batches'][1]['status'] != 'complete'
+    assert not retriever.id_index.is_known_empty(7)
+
+    # Resuming requests the batch that failed extraction again
+    requested.clear()
+    with etl.ResponseExtractor(out_dir, 'test') as extractor:
+        retriever = Retriever(
+            save_dir=tmp_path, extractor=extractor, archive_xml=False)
+        retriever.retrieve_all(
+            max_id=12, batch_size=5, shuffle=False,
+            batch_cooldown=0.01, min_cooldown=0.01)
+    assert 6 in requested
+    progress = retriever._load_progress_file()
+    assert all(b['status'] == 'complete' for b in progress['batches'])
+    general_data = pd.read_parquet(out_dir / f'test_{etl.KEY_GENERAL_DATA}')
+    assert sorted(general_data['id']) == [1, 6, 11]
+
+
+def test_response_extractor_errors(tmp_path):
+    with pytest.raises(ValueError):
+        Retriever(save_dir=tmp_path, archive_xml=False)
+    extractor = etl.ResponseExtractor(tmp_path, 'test')
+    # A batch that can't be parsed is raised from the background thread
+    extractor.submit('0.xml', b'<items><item id="1"></items>')
+    with pytest.raises(etree.XMLSyntaxError):
+        extractor.close()
+    with pytest.raises(RuntimeError):
+        extractor.submit('1.xml', b'<items></items>')
+
+
+def test_legacy_progress_file(tmp_path):
+    retriever = Retriever(save_dir=tmp_path)
+    legacy = [
+        {'ids': [4, 11], 'status': 'complete', 'last_accessed': 'x'},
+        {'ids': [2, 7], 'status': 'queued', 'last_accessed': 'y'},
+        {'ids': [6], 'status': 'incomplete', 'last_accessed': ''}]
+    Path(retriever.progress_path).write_text(json.dumps(legacy))
+
+    progress = retriever._load_progress_file()
+    assert [retriever._batch_ids(progress, i) for i in range(3)] == \
+        [[4, 11], [2, 7], [6]]
+    assert [e['status'] for e in progress['batches']] == \
+        ['complete', 'queued', 'incomplete']